@@ -0,0 +1,59 @@
+"""Add chat_sessions table and chat_history session index"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3f9a1c2d7b84"
+down_revision: Union[str, None] = "a1b2c3d4e5f6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "idx_clerk_session_created",
+        "chat_history",
+        ["clerk_id", "session_id", "created_at"],
+    )
+    op.create_table(
+        "chat_sessions",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False, comment="Internal session row ID"),
+        sa.Column("clerk_id", sa.String(length=255), nullable=False, comment="User who owns the session"),
+        sa.Column("session_id", sa.String(length=255), nullable=False, comment="Matches chat_history.session_id"),
+        sa.Column("title", sa.String(length=120), nullable=True, comment="First user message of the session, truncated"),
+        sa.Column("message_count", sa.Integer(), nullable=False),
+        sa.Column("started_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("last_message_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.ForeignKeyConstraint(["clerk_id"], ["users.clerk_id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("clerk_id", "session_id", name="unique_user_session"),
+    )
+    op.create_index("idx_clerk_last_message", "chat_sessions", ["clerk_id", "last_message_at"])
+
+    # Backfill from existing history (uses idx_clerk_session_created)
+    op.execute(
+        """
+        INSERT INTO chat_sessions (clerk_id, session_id, title, message_count, started_at, last_message_at)
+        SELECT DISTINCT ON (clerk_id, session_id)
+            clerk_id,
+            session_id,
+            left(user_message, 120),
+            count(*) OVER w,
+            min(created_at) OVER w,
+            max(created_at) OVER w
+        FROM chat_history
+        WHERE session_id IS NOT NULL
+        WINDOW w AS (PARTITION BY clerk_id, session_id)
+        ORDER BY clerk_id, session_id, created_at
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_clerk_last_message", table_name="chat_sessions")
+    op.drop_table("chat_sessions")
+    op.drop_index("idx_clerk_session_created", table_name="chat_history")
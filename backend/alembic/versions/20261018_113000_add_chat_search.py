@@ -0,0 +1,48 @@
+"""Add full-text search over chat_history"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8c2e5d41a9f0"
+down_revision: Union[str, None] = "3f9a1c2d7b84"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Generated tsvector, questions weighted above answers; kept out of the ORM
+    # model so SQLite (tests/local dev) can still create the table
+    op.execute(
+        """
+        ALTER TABLE chat_history
+        ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(user_message, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(ai_response, '')), 'B')
+        ) STORED
+        """
+    )
+    op.execute("CREATE INDEX idx_chat_history_search ON chat_history USING GIN (search_vector)")
+
+    # Fallback inverted index used on non-Postgres databases; stays empty here
+    op.create_table(
+        "chat_search_terms",
+        sa.Column("term", sa.String(length=64), nullable=False),
+        sa.Column("message_id", sa.Integer(), nullable=False),
+        sa.Column("clerk_id", sa.String(length=255), nullable=False),
+        sa.Column("weight", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["message_id"], ["chat_history.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("term", "message_id"),
+    )
+    op.create_index("idx_search_clerk_term", "chat_search_terms", ["clerk_id", "term"])
+
+
+def downgrade() -> None:
+    op.drop_index("idx_search_clerk_term", table_name="chat_search_terms")
+    op.drop_table("chat_search_terms")
+    op.execute("DROP INDEX IF EXISTS idx_chat_history_search")
+    op.drop_column("chat_history", "search_vector")
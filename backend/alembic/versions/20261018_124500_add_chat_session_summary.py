@@ -0,0 +1,30 @@
+"""Add rolling summary columns to chat_sessions"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d47b90e3c215"
+down_revision: Union[str, None] = "8c2e5d41a9f0"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing sessions start with an empty summary; it fills in on the next turn
+    op.add_column(
+        "chat_sessions",
+        sa.Column("summary", sa.Text(), nullable=True, comment="Extractive summary of earlier turns"),
+    )
+    op.add_column(
+        "chat_sessions",
+        sa.Column("summary_tokens", sa.Integer(), server_default="0", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("chat_sessions", "summary_tokens")
+    op.drop_column("chat_sessions", "summary")
@@ -0,0 +1,30 @@
+"""Add recommendations cache table"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5e81c3a0f6d2"
+down_revision: Union[str, None] = "d47b90e3c215"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "recommendations",
+        sa.Column("clerk_id", sa.String(length=255), nullable=False, comment="One cached recommendation set per user"),
+        sa.Column("fingerprint", sa.String(length=64), nullable=False, comment="SHA-256 of the material inputs"),
+        sa.Column("inputs", sa.JSON(), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("generated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.ForeignKeyConstraint(["clerk_id"], ["users.clerk_id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("clerk_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("recommendations")
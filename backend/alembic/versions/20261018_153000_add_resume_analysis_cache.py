@@ -0,0 +1,46 @@
+"""Add resume text and analysis cache tables"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b93f0d6e2a17"
+down_revision: Union[str, None] = "5e81c3a0f6d2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "resume_texts",
+        sa.Column("pdf_sha256", sa.String(length=64), nullable=False),
+        sa.Column("text", sa.Text(), nullable=False),
+        sa.Column("page_count", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("last_used_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("pdf_sha256"),
+    )
+    op.create_index(op.f("ix_resume_texts_last_used_at"), "resume_texts", ["last_used_at"])
+
+    op.create_table(
+        "resume_analyses",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("pdf_sha256", sa.String(length=64), nullable=False),
+        sa.Column("jd_sha256", sa.String(length=64), nullable=False, comment="Hash of the normalized job description ('' when none was given)"),
+        sa.Column("analysis", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("last_used_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("pdf_sha256", "jd_sha256", name="unique_resume_jd"),
+    )
+    op.create_index(op.f("ix_resume_analyses_last_used_at"), "resume_analyses", ["last_used_at"])
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_resume_analyses_last_used_at"), table_name="resume_analyses")
+    op.drop_table("resume_analyses")
+    op.drop_index(op.f("ix_resume_texts_last_used_at"), table_name="resume_texts")
+    op.drop_table("resume_texts")
@@ -0,0 +1,30 @@
+"""Add OCR page cache table"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e2c7a95f1b08"
+down_revision: Union[str, None] = "b93f0d6e2a17"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ocr_pages",
+        sa.Column("page_sha256", sa.String(length=64), nullable=False),
+        sa.Column("text", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("last_used_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("page_sha256"),
+    )
+    op.create_index(op.f("ix_ocr_pages_last_used_at"), "ocr_pages", ["last_used_at"])
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_ocr_pages_last_used_at"), table_name="ocr_pages")
+    op.drop_table("ocr_pages")
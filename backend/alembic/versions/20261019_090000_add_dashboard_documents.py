@@ -0,0 +1,30 @@
+"""Add materialized dashboard documents"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "7a4d19c3e5b2"
+down_revision: Union[str, None] = "e2c7a95f1b08"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "dashboard_documents",
+        sa.Column("clerk_id", sa.String(length=255), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False, comment="Incremented whenever the body changes"),
+        sa.Column("etag", sa.String(length=64), nullable=False, comment="SHA-256 of the body"),
+        sa.Column("body", sa.Text(), nullable=False, comment="Pre-serialized JSON response"),
+        sa.Column("built_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.ForeignKeyConstraint(["clerk_id"], ["users.clerk_id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("clerk_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("dashboard_documents")
@@ -0,0 +1,33 @@
+"""Add profile snapshot history"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c41f8a2d6b93"
+down_revision: Union[str, None] = "7a4d19c3e5b2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "profile_snapshots",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("clerk_id", sa.String(length=255), nullable=False),
+        sa.Column("platform", sa.String(length=20), nullable=False),
+        sa.Column("taken_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("seq", sa.Integer(), nullable=False, comment="Snapshots since the last keyframe (0 = keyframe)"),
+        sa.Column("metrics", sa.JSON(), nullable=False, comment="Full values on keyframes, changed metrics as deltas otherwise"),
+        sa.ForeignKeyConstraint(["clerk_id"], ["users.clerk_id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("idx_snapshot_profile_time", "profile_snapshots", ["clerk_id", "platform", "taken_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("idx_snapshot_profile_time", table_name="profile_snapshots")
+    op.drop_table("profile_snapshots")
@@ -0,0 +1,31 @@
+"""Add packed Codeforces rating history"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f5b27e90c4d1"
+down_revision: Union[str, None] = "c41f8a2d6b93"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "codeforces_rating_history",
+        sa.Column("handle", sa.String(length=24), nullable=False, comment="Lowercased Codeforces handle"),
+        sa.Column("series", sa.LargeBinary(), nullable=False, comment="Packed (contest id, update time, new rating) records"),
+        sa.Column("contest_count", sa.Integer(), nullable=False),
+        sa.Column("last_update_time", sa.Integer(), nullable=False, comment="ratingUpdateTimeSeconds of the newest stored contest"),
+        sa.Column("last_rating", sa.Integer(), nullable=True),
+        sa.Column("max_rating", sa.Integer(), nullable=True),
+        sa.Column("checked_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False, comment="Last time user.rating was fetched"),
+        sa.PrimaryKeyConstraint("handle"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("codeforces_rating_history")
@@ -0,0 +1,29 @@
+"""Add packed GitHub contribution calendars"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0d8c3b6f7a24"
+down_revision: Union[str, None] = "f5b27e90c4d1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "github_contribution_years",
+        sa.Column("handle", sa.String(length=39), nullable=False, comment="Lowercased GitHub login"),
+        sa.Column("year", sa.Integer(), nullable=False),
+        sa.Column("counts", sa.LargeBinary(), nullable=False, comment="Packed uint16 count per day of the year"),
+        sa.Column("fetched", sa.LargeBinary(), nullable=False, comment="Bitmap of the days of the year that have been fetched"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("handle", "year"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("github_contribution_years")
@@ -0,0 +1,63 @@
+# Conversation-memory prompt size: legacy "last 5 raw turns" vs rolling summary.
+#
+# Usage (from backend/):
+#   python benchmarks/bench_chat_prompt.py --turns 20 --answer-chars 3000
+#   CHAT_MEMORY_TOKEN_BUDGET=400 python benchmarks/bench_chat_prompt.py
+#
+# No database or API key needed; replays a synthetic session through the same
+# helpers chat_endpoint uses and prints the estimated conversation-context
+# tokens per turn.
+
+import argparse
+import os
+import random
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chat_memory import CHAT_MEMORY_TOKEN_BUDGET, build_memory_context, estimate_tokens, fold_turn
+
+TOPICS = ["dynamic programming", "graphs", "system design", "React hooks", "SQL indexes", "binary search"]
+
+def fake_answer(rng: random.Random, chars: int) -> str:
+    """Roughly the shape of a formatted chat reply: greeting, titles, bullet lists"""
+    parts = [f"Hi there! Great question about {rng.choice(TOPICS)}."]
+    while sum(len(p) for p in parts) < chars:
+        parts.append(f"\n\n\n{rng.choice(TOPICS).upper()}\n\n")
+        parts.append(f"Start with the fundamentals of {rng.choice(TOPICS)} and practice daily. ")
+        parts.extend(f"\n\n• Solve problem {rng.randint(1, 2000)} - focus on {rng.choice(TOPICS)}" for _ in range(4))
+    return "".join(parts)[:chars]
+
+def legacy_context(turns) -> str:
+    context = "\n\nRECENT CONVERSATION HISTORY:\n"
+    for question, answer in turns[-5:]:
+        context += f"User: {question}\nAssistant: {answer}\n\n"
+    return context
+
+def main():
+    parser = argparse.ArgumentParser(description="Chat prompt size, legacy vs rolling memory")
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--answer-chars", type=int, default=3000)
+    parser.add_argument("--budget", type=int, default=CHAT_MEMORY_TOKEN_BUDGET)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    turns, summary = [], None
+    legacy_total = rolling_total = 0
+    print(f"{'turn':>4}  {'legacy':>8}  {'rolling':>8}")
+    for i in range(args.turns):
+        legacy = estimate_tokens(legacy_context(turns)) if turns else 0
+        rolling = 0
+        if turns:
+            rolling = estimate_tokens(build_memory_context(summary, *turns[-1], budget=args.budget))
+            summary = fold_turn(summary, *turns[-1], budget=args.budget)
+        legacy_total += legacy
+        rolling_total += rolling
+        print(f"{i + 1:>4}  {legacy:>8}  {rolling:>8}")
+        turns.append((f"Question {i + 1}: how should I approach {rng.choice(TOPICS)}?", fake_answer(rng, args.answer_chars)))
+
+    saved = 1 - rolling_total / legacy_total if legacy_total else 0
+    print(f"\ntotal context tokens: legacy {legacy_total}, rolling {rolling_total} ({saved:.0%} fewer)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# Chat search latency for a user with many messages.
+#
+# Usage (from backend/, against a scratch database):
+#   DATABASE_URL=sqlite:///./bench.db SCHEMA_CHECK=create_all python benchmarks/bench_chat_search.py --messages 20000
+#   DATABASE_URL=postgresql://... python benchmarks/bench_chat_search.py   # after `alembic upgrade head`
+#
+# Seeds one synthetic user (skipped if already seeded), then times each query
+# for the first page and a deep page (via the keyset cursor).
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, select
+
+from chat_search import index_chat_message, search_chat_history
+from database import AsyncSessionLocal, Base, engine
+from models import ChatHistory, User
+
+CLERK_ID = "bench_search_user"
+WORDS = (
+    "python java rust golang dynamic programming graph tree heap binary search array "
+    "string hashing recursion backtracking greedy sorting interview leetcode codeforces "
+    "rating contest streak github repository docker kubernetes react fastapi database "
+    "index query latency cache async await thread process memory complexity"
+).split()
+QUERIES = ["dynamic programming", "binary search tree", "docker", "async cache latency", "rust"]
+
+def sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)) + "."
+
+async def seed(count: int) -> None:
+    rng = random.Random(42)
+    async with AsyncSessionLocal() as db:
+        existing = (await db.execute(
+            select(func.count()).select_from(ChatHistory).where(ChatHistory.clerk_id == CLERK_ID)
+        )).scalar()
+        if existing >= count:
+            return
+        if not await db.get(User, CLERK_ID):
+            db.add(User(clerk_id=CLERK_ID))
+        for start in range(existing, count, 500):
+            records = [
+                ChatHistory(
+                    clerk_id=CLERK_ID,
+                    user_message=sentence(rng, 12),
+                    ai_response=" ".join(sentence(rng, 20) for _ in range(15)),
+                    session_id=f"bench_{i // 20}",
+                )
+                for i in range(start, min(start + 500, count))
+            ]
+            db.add_all(records)
+            await db.flush()
+            for record in records:
+                await index_chat_message(db, record)
+            await db.commit()
+
+async def time_queries(runs: int, limit: int) -> None:
+    async with AsyncSessionLocal() as db:
+        for query in QUERIES:
+            first, deep = [], []
+            for _ in range(runs):
+                start = time.perf_counter()
+                rows, cursor = await search_chat_history(db, CLERK_ID, query, limit)
+                first.append(time.perf_counter() - start)
+                for _ in range(4):
+                    if not cursor:
+                        break
+                    start = time.perf_counter()
+                    rows, cursor = await search_chat_history(db, CLERK_ID, query, limit, cursor)
+                    deep.append(time.perf_counter() - start)
+            deep_ms = f"{statistics.median(deep) * 1000:.1f}ms" if deep else "n/a"
+            print(f"{query!r:28} first page p50 {statistics.median(first) * 1000:.1f}ms  next pages p50 {deep_ms}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Chat history search latency")
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    if engine.dialect.name != "postgresql":
+        Base.metadata.create_all(bind=engine)
+    asyncio.run(seed(args.messages))
+    asyncio.run(time_queries(args.runs, args.limit))
+
+if __name__ == "__main__":
+    main()
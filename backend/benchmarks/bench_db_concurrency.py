@@ -0,0 +1,95 @@
+# Concurrent-request throughput: sync Session vs AsyncSession inside async routes
+#
+# Usage (from backend/):
+#   DATABASE_URL=postgresql://... python benchmarks/bench_db_concurrency.py
+#   DATABASE_URL=sqlite:///./bench.db python benchmarks/bench_db_concurrency.py --requests 200
+#
+# Every request runs one query that takes --query-delay seconds (pg_sleep on
+# Postgres, a registered sleep function on SQLite). The "sync" route mirrors the
+# old handlers: an async def that calls a blocking Session, so requests are
+# serialized on the event loop. The "async" route uses get_async_db.
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from database import async_engine, engine, get_async_db, get_db
+
+SLEEP_SQL = text("SELECT pg_sleep(:delay)")
+
+def _register_sqlite_sleep(dbapi_connection, connection_record):
+    dbapi_connection.create_function("pg_sleep", 1, time.sleep)
+
+if engine.dialect.name == "sqlite":
+    event.listen(engine, "connect", _register_sqlite_sleep)
+    event.listen(async_engine.sync_engine, "connect", _register_sqlite_sleep)
+    engine.dispose()  # drop the connection opened by the import-time check
+
+def build_app(delay: float) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/sync")
+    async def sync_route(db: Session = Depends(get_db)):
+        db.execute(SLEEP_SQL, {"delay": delay})
+        return {"ok": True}
+
+    @app.get("/async")
+    async def async_route(db: AsyncSession = Depends(get_async_db)):
+        await db.execute(SLEEP_SQL, {"delay": delay})
+        return {"ok": True}
+
+    return app
+
+async def run(app: FastAPI, path: str, total: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(client: httpx.AsyncClient):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.get(path)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await one(client)  # warm the pool
+        latencies.clear()
+        start = time.perf_counter()
+        await asyncio.gather(*[one(client) for _ in range(total)])
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "path": path,
+        "requests": total,
+        "elapsed_s": round(elapsed, 3),
+        "req_per_s": round(total / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 1),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync vs async DB session throughput")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("DB_POOL_SIZE", "5")))
+    parser.add_argument("--query-delay", type=float, default=0.05)
+    args = parser.parse_args()
+
+    app = build_app(args.query_delay)
+    for path in ("/sync", "/async"):
+        result = asyncio.run(run(app, path, args.requests, args.concurrency))
+        print(result)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# format_ai_response: compiled formatter vs the original regex chain.
+#
+# Usage (from backend/):
+#   python benchmarks/bench_formatting.py
+#   python benchmarks/bench_formatting.py --fuzz 20000 --size 200000
+#
+# First checks that formatting.format_ai_response produces byte-identical
+# output to the original implementation (copied below as legacy_format) on a
+# golden corpus plus random markdown-ish documents, then times both on large
+# responses. Exits non-zero on any mismatch.
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from formatting import StreamingFormatter, format_ai_response
+
+def legacy_format(response_text):
+    """format_ai_response as it was in main.py, kept verbatim for comparison"""
+    def link_to_text(match):
+        link_text = match.group(1)
+        link_url = match.group(2)
+        if 'leetcode.com/problems' in link_url:
+            problem_slug = link_url.split('/')[-2]
+            return f"{link_text} (LeetCode: {problem_slug})"
+        elif 'github.com' in link_url:
+            return f"{link_text} (GitHub)"
+        else:
+            return f"{link_text}"
+
+    processed_text = re.sub(r'\[([^\]]+)\]\(([^)]+)\)', link_to_text, response_text)
+
+    def heading_replacer(match):
+        level = len(match.group(1))
+        title = match.group(2).strip().upper() if level <= 2 else match.group(2).strip()
+        return f"\n\n\n{title}\n\n"
+
+    formatted_text = re.sub(r'^(#{1,6})\s+(.*?)$', heading_replacer, processed_text, flags=re.MULTILINE)
+    formatted_text = re.sub(r'^(\s*)(\*|-)\s+', r'\1• ', formatted_text, flags=re.MULTILINE)
+    formatted_text = re.sub(r'(\*{1,2})([^*]+?)(\*{1,2})', r'\2', formatted_text)
+
+    def list_item_replacer(match):
+        indent = match.group(1)
+        number = match.group(2)
+        return f"\n\n{indent}{number}. "
+
+    formatted_text = re.sub(r'^(\s*)(\d+)\.\s+', list_item_replacer, formatted_text, flags=re.MULTILINE)
+    formatted_text = re.sub(r'(?<!`)`([^`]+?)`(?!`)', r'\1', formatted_text)
+    formatted_text = re.sub(r'_(.*?)_', r'\1', formatted_text)
+    formatted_text = re.sub(r'^([\s]*)(•)(\s*)', r'\n\n\1\2 ', formatted_text, flags=re.MULTILINE)
+    formatted_text = re.sub(r'(\.\s)([A-Z])', r'.\n\n\2', formatted_text)
+    formatted_text = re.sub(r'\n{4,}', '\n\n\n', formatted_text)
+    formatted_text = re.sub(r'\s+$', '', formatted_text, flags=re.MULTILINE)
+    formatted_text = re.sub(r'(```[^`]*```)', r'\n\n\1\n\n', formatted_text)
+    formatted_text = re.sub(r'(\d+\.\s.*?)(\n)(\d+\.)', r'\1\n\n\n\3', formatted_text)
+    formatted_text = re.sub(r'([A-Z][A-Z\s]+):', r'\1:\n\n', formatted_text)
+    formatted_text = re.sub(r'\n{5,}', '\n\n\n\n', formatted_text)
+    formatted_text = formatted_text.lstrip('\n')
+    formatted_text = re.sub(r'(•.*?)(\n)(•)', r'\1\n\n\3', formatted_text)
+    return formatted_text
+
+GOLDEN = [
+    "",
+    "Plain answer with no markup at all",
+    "## Plan\n\nHello **there**. Try [Two Sum](https://leetcode.com/problems/two-sum/).\n- item one\n- item two",
+    "# Title\n### Sub heading\nSome _emphasis_ and `code` and ```\nblock\n```\n",
+    "1. First\n2. Second\n   3. Nested\n\n\n\n\nEnd.",
+    "SECTION TITLE: body text\nA:\nAB:\n  \n X:\nNOTE THIS :",
+    "* star bullet\n  - dash bullet\n• existing bullet\n•a\n•b\n•c",
+    "See [repo](https://github.com/a/b) and [docs](https://docs.python.org).",
+    "Trailing spaces   \nand tabs\t\t\n\n\n\n\n\nmany newlines",
+    "Sentence one. Sentence two. lower case. Upper Again.",
+    "Mixed **bold *italic* text** with snake_case_name and __dunder__",
+    "```python\ndef f():\n    return `x`\n```\nAfter code: DONE",
+    "Hi Alice!\n\n## SKILL DEVELOPMENT:\n\n1. Learn **Dynamic Programming** - see [Climbing Stairs](https://leetcode.com/problems/climbing-stairs/)\n2. Practice graphs\n\nPRACTICE PROBLEMS:\n\n- Two Sum - Problem 1\n- 3Sum - Problem 15",
+]
+
+ALPHABET = [
+    "#", "## ", "### ", "*", "**", "-", "- ", "•", "_", "`", "```", "[", "]", "(", ")", "](",
+    "https://leetcode.com/problems/two-sum/", "https://github.com/x/y", "http://e.com",
+    ":", ".", ". ", " ", "  ", "\t", "\n", "\n\n", "\n\n\n\n\n", "1. ", "12. ", "A", "B", "CD",
+    "HELLO WORLD", "Title", "word", "x", "é", "\u00a0",
+]
+
+def random_doc(rng: random.Random, tokens: int) -> str:
+    return "".join(rng.choice(ALPHABET) for _ in range(tokens))
+
+def large_response(rng: random.Random, size: int) -> str:
+    parts = []
+    while sum(len(p) for p in parts) < size:
+        parts.append(rng.choice(GOLDEN[2:]))
+        parts.append("\n\n")
+    return "".join(parts)[:size]
+
+def check_identical(fuzz: int) -> int:
+    rng = random.Random(1234)
+    corpus = list(GOLDEN) + [random_doc(rng, rng.randint(1, 80)) for _ in range(fuzz)]
+    mismatches = 0
+    for doc in corpus:
+        if format_ai_response(doc) != legacy_format(doc):
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"MISMATCH for {doc!r}")
+    print(f"identity: {len(corpus) - mismatches}/{len(corpus)} documents identical")
+    return mismatches
+
+def timed(fn, text: str, runs: int) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Formatter identity check and speed comparison")
+    parser.add_argument("--fuzz", type=int, default=5000)
+    parser.add_argument("--size", type=int, default=100_000, help="characters per large response")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    if check_identical(args.fuzz):
+        sys.exit(1)
+
+    rng = random.Random(99)
+    cases = {
+        "typical (4k chars)": large_response(rng, 4_000),
+        f"large ({args.size // 1000}k chars)": large_response(rng, args.size),
+        # Long capitals/whitespace runs without a colon: quadratic in the original
+        "caps-heavy (20k chars)": ("ALL CAPS WORDS AND SPACES " * 800) + "end",
+    }
+    for name, text in cases.items():
+        legacy = timed(legacy_format, text, args.runs)
+        compiled = timed(format_ai_response, text, args.runs)
+        print(f"{name:24} legacy {legacy * 1000:8.2f}ms  compiled {compiled * 1000:8.2f}ms  {legacy / compiled:5.1f}x")
+
+    # Streaming: feeding 20-char chunks, total formatting work for the response
+    text = cases["typical (4k chars)"]
+    start = time.perf_counter()
+    formatter = StreamingFormatter()
+    for i in range(0, len(text), 20):
+        formatter.feed(text[i:i + 20])
+    formatter.flush()
+    print(f"streaming typical response in 20-char chunks: {(time.perf_counter() - start) * 1000:.2f}ms")
+
+if __name__ == "__main__":
+    main()
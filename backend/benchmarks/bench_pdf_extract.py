@@ -0,0 +1,98 @@
+# Resume extraction latency under concurrent uploads: inline vs process pool
+#
+# Usage (from backend/):
+#   python benchmarks/bench_pdf_extract.py
+#   python benchmarks/bench_pdf_extract.py --uploads 64 --pages 2 12 40
+#
+# Builds multi-page text PDFs with PyMuPDF, then starts --uploads extractions
+# at once for each page count and reports p50/p99 completion latency plus the
+# worst event loop stall (measured by a 10ms ticker running alongside).
+# Latency counts from the moment all uploads arrive; the pool only wins on
+# p99 with more than one core, but never stalls the loop.
+# "inline" is the old extract_text (synchronous, text += per page, on the
+# event loop); "pool" is pdf_extract.extract_pdf_text.
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz
+
+from pdf_extract import extract_pdf_text, get_pool, shutdown_pool
+
+LINE = "Built data pipelines in Python and SQL, deployed services on Kubernetes, mentored engineers. "
+
+def make_pdf(pages: int) -> bytes:
+    doc = fitz.open()
+    for number in range(pages):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(36, 36, 560, 800), f"Page {number + 1}\n" + LINE * 40, fontsize=9)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+def legacy_extract(pdf_bytes: bytes) -> str:
+    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    text = ""
+    for page in doc:
+        text += page.get_text("text")
+    return text
+
+async def inline(pdf_bytes: bytes) -> str:
+    return legacy_extract(pdf_bytes)
+
+async def pooled(pdf_bytes: bytes) -> str:
+    return (await extract_pdf_text(pdf_bytes)).text
+
+async def run(extract, pdf_bytes: bytes, uploads: int) -> dict:
+    stalls = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            before = time.perf_counter()
+            await asyncio.sleep(0.01)
+            stalls.append(time.perf_counter() - before - 0.01)
+
+    # Latency from when all uploads arrive together, as a server would see it
+    async def one():
+        await extract(pdf_bytes)
+        return time.perf_counter() - start
+
+    tick = asyncio.create_task(ticker())
+    await asyncio.sleep(0.02)
+    start = time.perf_counter()
+    latencies = sorted(await asyncio.gather(*(one() for _ in range(uploads))))
+    wall = time.perf_counter() - start
+    done.set()
+    await tick
+    return {
+        "p50": latencies[len(latencies) // 2] * 1000,
+        "p99": latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))] * 1000,
+        "wall": wall * 1000,
+        "stall": max(stalls) * 1000,
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description="Concurrent PDF extraction benchmark")
+    parser.add_argument("--uploads", type=int, default=32)
+    parser.add_argument("--pages", type=int, nargs="+", default=[2, 12, 40])
+    args = parser.parse_args()
+
+    # Start the workers before timing so process spawn isn't counted
+    await asyncio.gather(*(asyncio.get_running_loop().run_in_executor(get_pool(), int) for _ in range(8)))
+    for pages in args.pages:
+        pdf_bytes = make_pdf(pages)
+        assert (await pooled(pdf_bytes)) == legacy_extract(pdf_bytes)
+        for name, extract in (("inline", inline), ("pool", pooled)):
+            r = await run(extract, pdf_bytes, args.uploads)
+            print(f"{pages:3} pages x{args.uploads} {name:6} p50 {r['p50']:8.1f}ms  p99 {r['p99']:8.1f}ms  "
+                  f"wall {r['wall']:8.1f}ms  max loop stall {r['stall']:7.1f}ms")
+    shutdown_pool()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,82 @@
+# Batch screening throughput (resumes per minute), without LLM reports.
+#
+# Usage (from backend/):
+#   python benchmarks/bench_screening.py
+#   python benchmarks/bench_screening.py --resumes 200 --pages 1 3
+#
+# "one at a time" mirrors calling /analyze per resume: extract inline, then
+# match against the job description (re-processed for every resume).
+# "batch" is the /analyze/batch pipeline: extraction in the PDF process pool
+# (text cache disabled) and one vectorized ranking pass. No database or API
+# key is used.
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench.db")  # imported, never queried
+
+import fitz
+
+from pdf_extract import get_pool, shutdown_pool
+from screening import ScreenedResume, extract_resumes, rank_resumes
+from skill_matcher import TAXONOMY, match_skills
+
+JOB_DESCRIPTION = (
+    "We are hiring a backend engineer with Python, FastAPI, PostgreSQL, Redis and Kafka. "
+    "Kubernetes, Docker and Terraform experience required; AWS and CI/CD a plus. "
+) * 5
+
+def make_resume(rng: random.Random, pages: int) -> bytes:
+    aliases = [rng.choice(entry[1]) for entry in rng.sample(list(TAXONOMY.values()), 12)]
+    doc = fitz.open()
+    for _ in range(pages):
+        lines = [f"Worked with {rng.choice(aliases)} and {rng.choice(aliases)} on production systems." for _ in range(45)]
+        doc.new_page().insert_textbox(fitz.Rect(36, 36, 560, 800), "\n".join(lines), fontsize=9)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+def one_at_a_time(pdfs) -> None:
+    for pdf_bytes in pdfs:
+        with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+            text = ""
+            for page in doc:
+                text += page.get_text("text")
+        match_skills(text, JOB_DESCRIPTION)
+
+async def batch(pdfs) -> None:
+    resumes = [ScreenedResume(f"r{i}.pdf", pdf_bytes) for i, pdf_bytes in enumerate(pdfs)]
+    async for _ in extract_resumes(resumes, use_cache=False):
+        pass
+    ranked = rank_resumes(resumes, JOB_DESCRIPTION)
+    assert len(ranked) == len(pdfs)
+
+async def main():
+    parser = argparse.ArgumentParser(description="Batch screening throughput")
+    parser.add_argument("--resumes", type=int, default=100)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 3])
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    # Start the workers before timing so process spawn isn't counted
+    await asyncio.gather(*(asyncio.get_running_loop().run_in_executor(get_pool(), int) for _ in range(8)))
+    match_skills("warm up", JOB_DESCRIPTION)
+    for pages in args.pages:
+        pdfs = [make_resume(rng, pages) for _ in range(args.resumes)]
+        start = time.perf_counter()
+        one_at_a_time(pdfs)
+        sequential = time.perf_counter() - start
+        start = time.perf_counter()
+        await batch(pdfs)
+        batched = time.perf_counter() - start
+        print(f"{args.resumes} resumes x {pages} pages: one at a time {args.resumes / sequential * 60:8.0f}/min  "
+              f"batch {args.resumes / batched * 60:8.0f}/min  ({os.cpu_count()} cores)")
+    shutdown_pool()
+
+if __name__ == "__main__":
+    asyncio.run(main())
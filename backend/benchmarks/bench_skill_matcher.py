@@ -0,0 +1,101 @@
+# Local skill matcher latency and /analyze prompt size.
+#
+# Usage (from backend/):
+#   python benchmarks/bench_skill_matcher.py
+#   python benchmarks/bench_skill_matcher.py --pairs 500 --resume-words 1200
+#
+# Generates resume/job description pairs from the skill taxonomy plus filler
+# text (with some misspelled skills), times match_skills per pair, and compares
+# the estimated prompt tokens of the original /analyze prompt (full resume and
+# full job description) with build_analysis_prompt.
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chat_memory import estimate_tokens
+from resume_analysis import build_analysis_prompt
+from skill_matcher import TAXONOMY, match_skills
+
+FILLER = (
+    "responsible for delivering features across the team and working closely with product managers "
+    "to improve reliability and customer experience while keeping costs under control"
+).split()
+
+def typo(word: str, rng: random.Random) -> str:
+    if len(word) < 6:
+        return word
+    i = rng.randrange(1, len(word) - 1)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+def fake_text(rng: random.Random, words: int, skills: int, typos: float = 0.0) -> str:
+    aliases = [rng.choice(entry[1]) for entry in rng.sample(list(TAXONOMY.values()), skills)]
+    parts = []
+    while len(parts) < words:
+        parts.extend(rng.sample(FILLER, 8))
+        alias = rng.choice(aliases)
+        parts.append(typo(alias, rng) if rng.random() < typos else alias)
+        if rng.random() < 0.3:
+            parts.append("\n\n   ")
+    return " ".join(parts)
+
+def legacy_prompt(resume_text: str, job_description: str) -> str:
+    return f"""
+    You are an experienced HR with technical expertise in roles such as Data Science, Data Analysis, DevOps, 
+    Machine Learning Engineering, Prompt Engineering, AI Engineering, Full Stack Web Development, 
+    Big Data Engineering, Marketing Analysis, Human Resource Management, and Software Development.
+    
+    Your task is to analyze the following resume:
+    
+    Resume:
+    {resume_text}
+    
+    Please provide a structured evaluation covering:
+    - Overall alignment with common industry roles
+    - Strengths and weaknesses of the candidate
+    - Key skills they already have
+    - Skills they should improve or acquire
+    - Recommended courses to enhance their profile
+    
+        Additionally, compare this resume with the following job description and highlight specific matches and gaps:
+        
+        Job Description:
+        {job_description}
+    """
+
+def main():
+    parser = argparse.ArgumentParser(description="Skill matcher latency and prompt size")
+    parser.add_argument("--pairs", type=int, default=200)
+    parser.add_argument("--resume-words", type=int, default=700)
+    parser.add_argument("--jd-words", type=int, default=600)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    pairs = [
+        (fake_text(rng, args.resume_words, 15, typos=0.1), fake_text(rng, args.jd_words, 10))
+        for _ in range(args.pairs)
+    ]
+    match_skills(*pairs[0])  # build the index outside the timing
+
+    latencies = []
+    legacy_tokens = condensed_tokens = 0
+    for resume_text, job_description in pairs:
+        start = time.perf_counter()
+        match = match_skills(resume_text, job_description)
+        latencies.append(time.perf_counter() - start)
+        legacy_tokens += estimate_tokens(legacy_prompt(resume_text, job_description))
+        condensed_tokens += estimate_tokens(build_analysis_prompt(resume_text, job_description, match))
+
+    latencies.sort()
+    print(f"match_skills over {args.pairs} pairs: p50 {latencies[len(latencies) // 2] * 1000:.2f}ms  "
+          f"p99 {latencies[int(0.99 * (len(latencies) - 1))] * 1000:.2f}ms")
+    print(f"prompt tokens per analysis: legacy {legacy_tokens / args.pairs:.0f}  "
+          f"condensed {condensed_tokens / args.pairs:.0f}  ({1 - condensed_tokens / legacy_tokens:.0%} smaller)")
+    print(f"example coverage {match.coverage}%  matches {len(match.matches)}  gaps {len(match.gaps)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# Cold-start benchmark: time to import main, and time from process spawn to the
+# first 200 from / and /ready under uvicorn.
+#
+# Usage (from backend/):
+#   python benchmarks/bench_startup.py --runs 5
+#
+# Set PREWARM_LLM / SCHEMA_CHECK / DB_CHECK_ON_STARTUP in the environment to
+# compare startup modes.
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = (
+    "import time; t = time.perf_counter(); import main; "
+    "print(time.perf_counter() - t)"
+)
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def measure_import() -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+def wait_for_200(url: str, timeout: float) -> float:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return time.perf_counter()
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.01)
+    raise TimeoutError(f"{url} did not return 200 within {timeout}s")
+
+def measure_first_200(timeout: float) -> dict:
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        root = wait_for_200(f"http://127.0.0.1:{port}/", timeout) - start
+        try:
+            ready = wait_for_200(f"http://127.0.0.1:{port}/ready", timeout) - start
+        except TimeoutError:
+            ready = None
+        return {"first_200_s": root, "ready_s": ready}
+    finally:
+        server.terminate()
+        server.wait()
+
+def summarize(name: str, values: list) -> None:
+    values = [v for v in values if v is not None]
+    if not values:
+        print(f"{name}: no successful runs")
+        return
+    print(f"{name}: median {statistics.median(values):.3f}s  min {min(values):.3f}s  max {max(values):.3f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time and time to first 200")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    imports, first_200, ready = [], [], []
+    for _ in range(args.runs):
+        imports.append(measure_import())
+        result = measure_first_200(args.timeout)
+        first_200.append(result["first_200_s"])
+        ready.append(result["ready_s"])
+
+    summarize("import main", imports)
+    summarize("spawn -> GET / 200", first_200)
+    summarize("spawn -> GET /ready 200", ready)
+
+if __name__ == "__main__":
+    main()
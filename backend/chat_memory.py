@@ -0,0 +1,66 @@
+import os
+import re
+from typing import Optional
+
+# Rolling conversation memory for /chat.
+#
+# Each chat_sessions row keeps an extractive summary of every turn except the
+# latest one. A prompt is built from that summary plus the latest turn verbatim
+# (trimmed to the budget), and after each reply the previous latest turn is
+# folded into the summary. Token counts are estimates (~4 chars per token),
+# which is close enough for budgeting Gemini prompts.
+
+CHAT_MEMORY_TOKEN_BUDGET = int(os.getenv("CHAT_MEMORY_TOKEN_BUDGET", "800"))
+SUMMARY_SHARE = 0.5  # fraction of the budget the stored summary may use
+QUESTION_CHARS = 200
+ANSWER_CHARS = 240
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+GREETING = re.compile(r"^(hi|hello|hey|great question|sure)\b[^.!?\n]*[.!?,]?\s*", re.IGNORECASE)
+
+def estimate_tokens(text: Optional[str]) -> int:
+    return (len(text) + 3) // 4 if text else 0
+
+def _squash(text: str) -> str:
+    return " ".join(text.split())
+
+def _clip(text: str, limit: int) -> str:
+    if len(text) <= limit:
+        return text
+    return text[:limit].rsplit(" ", 1)[0] + " …"
+
+def condense_answer(ai_response: str, limit: int = ANSWER_CHARS) -> str:
+    """First sentences of a reply, skipping the greeting line"""
+    text = GREETING.sub("", _squash(ai_response), count=1)
+    kept = ""
+    for sentence in SENTENCE_END.split(text):
+        if kept and len(kept) + len(sentence) + 1 > limit:
+            break
+        kept = f"{kept} {sentence}".strip()
+    return _clip(kept, limit)
+
+def summarize_turn(user_message: str, ai_response: str) -> str:
+    return f"- User asked: {_clip(_squash(user_message), QUESTION_CHARS)} | Assistant: {condense_answer(ai_response)}"
+
+def fold_turn(summary: Optional[str], user_message: str, ai_response: str,
+              budget: int = CHAT_MEMORY_TOKEN_BUDGET) -> str:
+    """Append a turn to the summary, dropping the oldest lines past the budget"""
+    lines = summary.splitlines() if summary else []
+    lines.append(summarize_turn(user_message, ai_response))
+    limit = int(budget * SUMMARY_SHARE)
+    while len(lines) > 1 and estimate_tokens("\n".join(lines)) > limit:
+        lines.pop(0)
+    return "\n".join(lines)
+
+def build_memory_context(summary: Optional[str], last_question: Optional[str], last_answer: Optional[str],
+                         budget: int = CHAT_MEMORY_TOKEN_BUDGET) -> str:
+    """Prompt section with the session summary and the latest turn"""
+    context = ""
+    if summary:
+        context += f"\n\nCONVERSATION SO FAR (summary):\n{summary}"
+    if last_question:
+        remaining = max(budget - estimate_tokens(summary), 0) * 4
+        question = _clip(last_question.strip(), max(remaining // 3, QUESTION_CHARS))
+        answer = _clip((last_answer or "").strip(), max(remaining - len(question), ANSWER_CHARS))
+        context += f"\n\nPREVIOUS TURN:\nUser: {question}\nAssistant: {answer}"
+    return context
@@ -0,0 +1,188 @@
+import base64
+import html
+import logging
+import re
+from collections import Counter
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import and_, func, literal_column, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import ChatHistory, ChatSearchTerm
+
+logger = logging.getLogger(__name__)
+
+# Postgres: generated tsvector column + GIN index (see the add_chat_search migration)
+SEARCH_CONFIG = "english"
+# Snippets are HTML, but the messages are not: matches are delimited with
+# private-use characters, the text is escaped, and only then do the
+# delimiters become <mark> tags (see snippet_html)
+MARK_START, MARK_STOP = "\ue000", "\ue001"
+HEADLINE_OPTIONS = (
+    f"StartSel={MARK_START}, StopSel={MARK_STOP}, MaxWords=30, MinWords=10, MaxFragments=2, FragmentDelimiter= … "
+)
+search_vector = literal_column("chat_history.search_vector")
+
+# Fallback inverted index (SQLite and other dialects without tsvector)
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#]*")
+MAX_TERM_LENGTH = 64
+USER_MESSAGE_WEIGHT = 3  # matches in the question rank above matches in the answer
+SNIPPET_WIDTH = 160
+STOP_WORDS = frozenset(
+    "a an and are as at be but by for from how i if in into is it me my no not of on or "
+    "so that the their then there these they this to was what when where which who why "
+    "will with you your".split()
+)
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased word tokens used by the fallback index and its queries"""
+    return [
+        token[:MAX_TERM_LENGTH]
+        for token in TOKEN_PATTERN.findall(text.lower())
+        if len(token) > 1 and token not in STOP_WORDS
+    ]
+
+def uses_native_search(db: AsyncSession) -> bool:
+    return db.bind.dialect.name == "postgresql"
+
+def encode_search_cursor(rank: float, message_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{rank!r}|{message_id}".encode()).decode().rstrip("=")
+
+def decode_search_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        rank, message_id = base64.urlsafe_b64decode(padded).decode().rsplit("|", 1)
+        return float(rank), int(message_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid search cursor")
+
+async def index_chat_message(db: AsyncSession, record: ChatHistory) -> None:
+    """Add a chat message to the fallback inverted index (no-op on Postgres).
+
+    Must run after the record has been flushed so its id is known.
+    """
+    if uses_native_search(db):
+        return
+    weights = Counter()
+    for token in tokenize(record.user_message):
+        weights[token] += USER_MESSAGE_WEIGHT
+    for token in tokenize(record.ai_response):
+        weights[token] += 1
+    db.add_all([
+        ChatSearchTerm(term=term, message_id=record.id, clerk_id=record.clerk_id, weight=weight)
+        for term, weight in weights.items()
+    ])
+
+def snippet_html(snippet: str) -> str:
+    """Escape a delimited snippet, then turn the match delimiters into <mark> tags"""
+    return html.escape(snippet).replace(MARK_START, "<mark>").replace(MARK_STOP, "</mark>")
+
+def highlight(text: str, terms: List[str], width: int = SNIPPET_WIDTH) -> str:
+    """Python equivalent of ts_headline for the fallback path"""
+    text = text.replace(MARK_START, "").replace(MARK_STOP, "")
+    if not terms:
+        return html.escape(text[:width])
+    pattern = re.compile(r"\b(" + "|".join(re.escape(t) for t in terms) + r")\b", re.IGNORECASE)
+    match = pattern.search(text)
+    start = max(0, match.start() - width // 3) if match else 0
+    fragment = pattern.sub(lambda m: f"{MARK_START}{m.group(0)}{MARK_STOP}", text[start:start + width])
+    return snippet_html(("… " if start else "") + fragment + (" …" if start + width < len(text) else ""))
+
+def _keyset(ranked, cursor: Optional[str]):
+    if not cursor:
+        return []
+    cursor_rank, cursor_id = decode_search_cursor(cursor)
+    return [or_(ranked.c.rank < cursor_rank, and_(ranked.c.rank == cursor_rank, ranked.c.id < cursor_id))]
+
+async def search_chat_history(
+    db: AsyncSession,
+    clerk_id: str,
+    query: str,
+    limit: int,
+    cursor: Optional[str] = None
+) -> Tuple[list, Optional[str]]:
+    """Ranked, highlighted search over a user's chat history.
+
+    Returns (rows, next_cursor). Each row has id, session_id, created_at, rank,
+    user_snippet and ai_snippet. Pages are keyset-paginated over (rank, id).
+    """
+    if uses_native_search(db):
+        tsquery = func.websearch_to_tsquery(SEARCH_CONFIG, query)
+        ranked = (
+            select(ChatHistory.id, func.ts_rank_cd(search_vector, tsquery).label("rank"))
+            .where(ChatHistory.clerk_id == clerk_id, search_vector.op("@@")(tsquery))
+            .subquery()
+        )
+        page = (
+            select(ranked.c.id, ranked.c.rank)
+            .where(*_keyset(ranked, cursor))
+            .order_by(ranked.c.rank.desc(), ranked.c.id.desc())
+            .limit(limit + 1)
+            .subquery()
+        )
+        # ts_headline is expensive, so it only runs on the page's rows
+        rows = (await db.execute(
+            select(
+                ChatHistory.id,
+                ChatHistory.session_id,
+                ChatHistory.created_at,
+                page.c.rank,
+                func.ts_headline(SEARCH_CONFIG, ChatHistory.user_message, tsquery, HEADLINE_OPTIONS).label("user_snippet"),
+                func.ts_headline(SEARCH_CONFIG, ChatHistory.ai_response, tsquery, HEADLINE_OPTIONS).label("ai_snippet"),
+            )
+            .join(page, page.c.id == ChatHistory.id)
+            .order_by(page.c.rank.desc(), ChatHistory.id.desc())
+        )).mappings().all()
+        rows = [
+            {**row, "user_snippet": snippet_html(row["user_snippet"]), "ai_snippet": snippet_html(row["ai_snippet"])}
+            for row in rows
+        ]
+    else:
+        terms = sorted(set(tokenize(query)))
+        if not terms:
+            return [], None
+        # AND semantics, like websearch_to_tsquery: every term must match
+        ranked = (
+            select(ChatSearchTerm.message_id.label("id"), func.sum(ChatSearchTerm.weight).label("rank"))
+            .where(ChatSearchTerm.clerk_id == clerk_id, ChatSearchTerm.term.in_(terms))
+            .group_by(ChatSearchTerm.message_id)
+            .having(func.count(ChatSearchTerm.term) == len(terms))
+            .subquery()
+        )
+        page = (
+            select(ranked.c.id, ranked.c.rank)
+            .where(*_keyset(ranked, cursor))
+            .order_by(ranked.c.rank.desc(), ranked.c.id.desc())
+            .limit(limit + 1)
+            .subquery()
+        )
+        results = (await db.execute(
+            select(
+                ChatHistory.id,
+                ChatHistory.session_id,
+                ChatHistory.created_at,
+                ChatHistory.user_message,
+                ChatHistory.ai_response,
+                page.c.rank,
+            )
+            .join(page, page.c.id == ChatHistory.id)
+            .order_by(page.c.rank.desc(), ChatHistory.id.desc())
+        )).all()
+        rows = [
+            {
+                "id": row.id,
+                "session_id": row.session_id,
+                "created_at": row.created_at,
+                "rank": float(row.rank),
+                "user_snippet": highlight(row.user_message, terms),
+                "ai_snippet": highlight(row.ai_response, terms),
+            }
+            for row in results
+        ]
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_search_cursor(float(rows[-1]["rank"]), rows[-1]["id"])
+    return rows, next_cursor
@@ -0,0 +1,115 @@
+import calendar
+import logging
+import struct
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from models import GitHubContributionYear
+
+logger = logging.getLogger(__name__)
+
+# Stored GitHub contribution calendars for the heatmap.
+#
+# fetch_github_data already downloads the last year of contributionDays for
+# the streaks; update_profile_in_db merges them into one row per handle and
+# calendar year, a packed array of uint16 counts indexed by day of the year.
+# Fetched days overwrite what was stored (GitHub recounts recent days) and
+# days outside the fetch window are kept. A bitmap next to the counts marks
+# every day that has been fetched, so a gap between two fetch windows reads as
+# null rather than 0. The heatmap endpoint reads at most two rows and never
+# calls GitHub.
+MAX_COUNT = 0xFFFF
+
+def days_in_year(year: int) -> int:
+    return 366 if calendar.isleap(year) else 365
+
+def pack_counts(counts: List[int]) -> bytes:
+    return struct.pack(f"<{len(counts)}H", *(min(c, MAX_COUNT) for c in counts))
+
+def unpack_counts(packed: bytes) -> List[int]:
+    return list(struct.unpack(f"<{len(packed) // 2}H", packed))
+
+def empty_bitmap(year: int) -> bytes:
+    return bytes((days_in_year(year) + 7) // 8)
+
+def is_fetched(bitmap: bytes, index: int) -> bool:
+    return bool(bitmap[index >> 3] & (1 << (index & 7)))
+
+def merge_contributions(db: Session, handle: str, days: Optional[List[Tuple[str, int]]]) -> int:
+    """Merge fetched (ISO date, count) pairs into the handle's year rows; returns how many rows changed.
+
+    Runs in the caller's transaction.
+    """
+    if not days:
+        return 0
+    by_year: Dict[int, Dict[int, int]] = {}
+    for day, count in days:
+        parsed = date.fromisoformat(day)
+        by_year.setdefault(parsed.year, {})[parsed.timetuple().tm_yday - 1] = count
+
+    key = handle.lower()
+    rows = {
+        row.year: row for row in db.execute(
+            select(GitHubContributionYear).where(
+                GitHubContributionYear.handle == key,
+                GitHubContributionYear.year.in_(list(by_year))
+            )
+        ).scalars()
+    }
+    changed = 0
+    for year, fetched in by_year.items():
+        row = rows.get(year)
+        counts = unpack_counts(row.counts) if row is not None else [0] * days_in_year(year)
+        bitmap = bytearray(row.fetched if row is not None else empty_bitmap(year))
+        for index, count in fetched.items():
+            counts[index] = count
+            bitmap[index >> 3] |= 1 << (index & 7)
+        packed = pack_counts(counts)
+        if row is None:
+            db.add(GitHubContributionYear(handle=key, year=year, counts=packed, fetched=bytes(bitmap),
+                                          updated_at=datetime.now(timezone.utc)))
+        elif packed != row.counts or bitmap != row.fetched:
+            row.counts = packed
+            row.fetched = bytes(bitmap)
+            row.updated_at = datetime.now(timezone.utc)
+        else:
+            continue
+        changed += 1
+    if changed:
+        logger.info(f"Merged GitHub contributions for {handle} into {changed} year rows")
+    return changed
+
+async def contribution_heatmap(db: AsyncSession, handle: str, start: date, end: date) -> Optional[dict]:
+    """Daily counts from start to end (inclusive) from storage; None for days never fetched"""
+    rows = (await db.execute(
+        select(GitHubContributionYear).where(
+            GitHubContributionYear.handle == handle.lower(),
+            GitHubContributionYear.year.between(start.year, end.year)
+        )
+    )).scalars().all()
+    if not rows:
+        return None
+    years = {row.year: (unpack_counts(row.counts), row.fetched) for row in rows}
+    counts: List[Optional[int]] = []
+    day = start
+    while day <= end:
+        stored = years.get(day.year)
+        index = day.timetuple().tm_yday - 1
+        if stored is not None and is_fetched(stored[1], index):
+            counts.append(stored[0][index])
+        else:
+            counts.append(None)
+        day += timedelta(days=1)
+    updated_at = max(row.updated_at for row in rows)
+    return {
+        "handle": handle,
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "total": sum(c for c in counts if c),
+        "counts": counts,
+        "updated_at": updated_at,
+    }
@@ -0,0 +1,123 @@
+import hashlib
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, mark_write
+from events import publish
+from loaders import DASHBOARD_LOADERS, select_user
+from models import DashboardDocument
+from routes.platform_routes import (
+    CodeChefResponse, CodeforcesResponse, GitHubResponse, LeetCodeResponse, validate_cached_data
+)
+from schemas import UserResponse
+
+logger = logging.getLogger(__name__)
+
+# Materialized dashboard documents.
+#
+# Everything the dashboard used to assemble from /api/users/me, the four
+# /api/platform/... calls and /api/analysis-data, built once per change and
+# stored as serialized JSON with a content hash (ETag) and a version number.
+# rebuild_dashboard_document runs after profile updates and settings/sync
+# writes; GET /api/dashboard returns the stored body as-is.
+
+PLATFORM_MODELS = {
+    "leetcode": LeetCodeResponse,
+    "github": GitHubResponse,
+    "codechef": CodeChefResponse,
+    "codeforces": CodeforcesResponse,
+}
+
+def _platform_stats(profile) -> Optional[dict]:
+    """Same body /api/platform/{platform}/{username} serves from its cache"""
+    model = PLATFORM_MODELS.get(profile.platform)
+    if model is None:
+        return None
+    try:
+        stats = validate_cached_data(profile, model, profile.platform)
+    except HTTPException:
+        return None  # incomplete data, the platform endpoint will refetch it
+    return {
+        "username": profile.username,
+        "last_updated": profile.last_updated.isoformat() if profile.last_updated else None,
+        "stats": stats,
+    }
+
+def build_dashboard_payload(db_user) -> dict:
+    profiles = sorted(db_user.coding_profiles, key=lambda p: p.platform)
+    return {
+        "user": UserResponse.model_validate(db_user).model_dump(mode="json"),
+        "platforms": {p.platform: _platform_stats(p) for p in profiles},
+        # Same shape as /api/analysis-data
+        "analysis": {
+            "username": db_user.username,
+            "email": db_user.email,
+            "profiles": [
+                {
+                    "platform": p.platform,
+                    "total_solved": p.total_problems_solved or 0,
+                    "easy_solved": p.easy_solved or 0,
+                    "medium_solved": p.medium_solved or 0,
+                    "hard_solved": p.hard_solved or 0,
+                    "current_rating": p.current_rating or 0,
+                    "stars": p.stars or 0,
+                    "languages": p.languages or {},
+                }
+                for p in profiles
+            ],
+        },
+    }
+
+def serialize_dashboard(payload: dict) -> Tuple[str, str]:
+    """(body, etag); sorted keys so identical data always gives the same ETag"""
+    body = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return body, hashlib.sha256(body.encode()).hexdigest()
+
+def rebuild_dashboard(db: Session, clerk_id: str) -> Optional[Tuple[str, str, int]]:
+    """Rebuild and store one user's document, returning (body, etag, version).
+
+    The version only moves when the body changes. Sync so it serves both the
+    sync write paths and AsyncSession.run_sync.
+    """
+    db_user = db.execute(select_user(clerk_id, DASHBOARD_LOADERS)).scalar_one_or_none()
+    if db_user is None:
+        return None
+    body, etag = serialize_dashboard(build_dashboard_payload(db_user))
+
+    document = db.get(DashboardDocument, clerk_id)
+    if document is not None and document.etag == etag:
+        return body, etag, document.version
+    now = datetime.now(timezone.utc)
+    if document is None:
+        version = 1
+        db.add(DashboardDocument(clerk_id=clerk_id, version=version, etag=etag, body=body, built_at=now))
+    else:
+        version = document.version + 1
+        document.version, document.etag, document.body, document.built_at = version, etag, body, now
+    try:
+        db.commit()
+    except IntegrityError:
+        # Built concurrently by another request from the same data
+        db.rollback()
+        return body, etag, version
+    mark_write(clerk_id)
+    publish(clerk_id, "dashboard", {"version": version, "etag": f'"{etag}"'})
+    logger.info(f"Dashboard document for {clerk_id} rebuilt (version {version})")
+    return body, etag, version
+
+def rebuild_dashboard_document(clerk_id: str) -> None:
+    """Background-task entry point: rebuild in its own session, never raise"""
+    db = SessionLocal()
+    try:
+        rebuild_dashboard(db, clerk_id)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Dashboard rebuild failed for {clerk_id}: {e}", exc_info=True)
+    finally:
+        db.close()
@@ -1,14 +1,21 @@
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, text, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession, AsyncEngine
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.exc import SQLAlchemyError, OperationalError
 import os
+import ssl
+import asyncio
+import itertools
+import threading
 from dotenv import load_dotenv
 from urllib.parse import urlparse, parse_qs
 import time
 import logging
-from typing import Generator, Optional
-from contextlib import contextmanager
+from typing import AsyncGenerator, Dict, Generator, List, Optional, Tuple
+from contextlib import contextmanager, asynccontextmanager
+from contextvars import ContextVar
 
 load_dotenv()
 
@@ -19,6 +26,7 @@ logger = logging.getLogger(__name__)
 DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL environment variable is not set")
+RAW_DATABASE_URL = DATABASE_URL
 
 # Enhanced SSL configuration
 parsed_url = urlparse(DATABASE_URL)
@@ -54,6 +62,16 @@ POOL_CONFIG = {
 MAX_RETRIES = 3
 RETRY_DELAY = 2
 
+# Startup behaviour: the connection test and schema checks are deferred to the
+# readiness probe unless explicitly requested, so importing the app stays cheap.
+DB_CHECK_ON_STARTUP = os.getenv("DB_CHECK_ON_STARTUP", "false").lower() == "true"
+
+# Read replica configuration (comma-separated URLs, optional)
+DATABASE_REPLICA_URLS = [u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip()]
+REPLICA_HEALTH_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_HEALTH_INTERVAL", "30"))
+REPLICA_HEALTH_CHECK_TIMEOUT = float(os.getenv("DB_REPLICA_HEALTH_TIMEOUT", "2"))
+READ_YOUR_WRITES_WINDOW = float(os.getenv("DB_READ_YOUR_WRITES_SECONDS", "10"))
+
 def create_db_engine():
     """Create database engine with enhanced error handling"""
     try:
@@ -63,10 +81,11 @@ def create_db_engine():
             echo=os.getenv("SQL_ECHO", "false").lower() == "true"
         )
         
-        # Test connection
-        with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
-        logger.info("Database connection successful")
+        # Test connection (otherwise left to the readiness probe)
+        if DB_CHECK_ON_STARTUP:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            logger.info("Database connection successful")
             
         return engine
     except OperationalError as e:
@@ -76,11 +95,241 @@ def create_db_engine():
         logger.error(f"Unexpected error creating database engine: {e}")
         raise
 
+def build_async_database_url(url: str) -> tuple:
+    """Translate a sync database URL into an async driver URL plus connect_args.
+
+    asyncpg does not understand libpq's sslmode/sslrootcert query parameters,
+    so they are stripped from the URL and turned into an SSL context instead.
+    """
+    parsed = urlparse(url)
+    scheme = parsed.scheme.split("+")[0]
+    params = parse_qs(parsed.query)
+
+    if scheme.startswith("sqlite"):
+        return url.replace(parsed.scheme, "sqlite+aiosqlite", 1), {}
+
+    if scheme not in ("postgres", "postgresql"):
+        raise ValueError(f"Unsupported database scheme for async engine: {parsed.scheme}")
+
+    sslmode = params.pop("sslmode", ["require"])[0]
+    sslrootcert = params.pop("sslrootcert", [ssl_config.get("sslrootcert")])[0]
+    query = "&".join(f"{k}={v[0]}" for k, v in params.items())
+
+    connect_args = {}
+    if sslmode != "disable":
+        cafile = sslrootcert if sslrootcert and os.path.exists(sslrootcert) else None
+        ssl_context = ssl.create_default_context(cafile=cafile)
+        ssl_context.check_hostname = sslmode == "verify-full"
+        if sslmode in ("allow", "prefer", "require") and cafile is None:
+            ssl_context.verify_mode = ssl.CERT_NONE
+        connect_args["ssl"] = ssl_context
+
+    async_url = f"postgresql+asyncpg://{parsed.netloc}{parsed.path}"
+    if query:
+        async_url += f"?{query}"
+    return async_url, connect_args
+
+def create_async_db_engine(url: Optional[str] = None) -> AsyncEngine:
+    """Create the asyncpg-backed engine used by AsyncSession dependencies"""
+    async_url, connect_args = build_async_database_url(url or RAW_DATABASE_URL)
+    pool_config = POOL_CONFIG if not async_url.startswith("sqlite") else {"pool_pre_ping": True}
+    try:
+        return create_async_engine(
+            async_url,
+            **pool_config,
+            connect_args=connect_args,
+            echo=os.getenv("SQL_ECHO", "false").lower() == "true"
+        )
+    except Exception as e:
+        logger.error(f"Unexpected error creating async database engine: {e}")
+        raise
+
 engine = create_db_engine()
+async_engine = create_async_db_engine()
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False: attributes must stay readable after commit because
+# lazy refreshes are not possible once the response is being serialized.
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
 Base = declarative_base()
 
+class Replica:
+    """An async read replica and its last known health"""
+
+    def __init__(self, url: str):
+        self.engine = create_async_db_engine(url)
+        self.sessionmaker = async_sessionmaker(
+            bind=self.engine,
+            class_=AsyncSession,
+            autoflush=False,
+            expire_on_commit=False
+        )
+        self.name = self.engine.url.render_as_string(hide_password=True)
+        self.healthy = True
+        self.last_checked = 0.0
+        # Connection errors take the replica out of rotation where they are
+        # raised, even if the endpoint catches them afterwards
+        event.listen(self.engine.sync_engine, "handle_error", self._on_error)
+
+    def _on_error(self, context) -> None:
+        if context.is_disconnect or isinstance(context.sqlalchemy_exception, OperationalError):
+            if self.healthy:
+                logger.error(f"Read replica {self.name} failed, marking unhealthy: {context.original_exception}")
+            self.mark_unhealthy()
+
+    def mark_unhealthy(self) -> None:
+        self.healthy = False
+        self.last_checked = time.monotonic()
+
+class ReplicaRouter:
+    """Round-robin read routing over healthy replicas, with primary fallback.
+
+    Replicas are re-probed with SELECT 1 at most every
+    REPLICA_HEALTH_CHECK_INTERVAL seconds, and marked unhealthy immediately when
+    a connection or query on them fails with a connection error. Keys (clerk IDs) that wrote within
+    READ_YOUR_WRITES_WINDOW are pinned to the primary so they see their writes.
+
+    The write pin is per process: a write handled by another worker does not
+    pin this worker's reads. Clients that must see a write served elsewhere
+    send X-Read-Your-Writes: true (see dependencies.get_read_db).
+    """
+
+    def __init__(self, urls: List[str]):
+        self.replicas = [Replica(url) for url in urls]
+        self._cycle = itertools.cycle(range(len(self.replicas))) if self.replicas else None
+        self._recent_writes: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def mark_write(self, key: Optional[str]) -> None:
+        """Record a write so reads for this key go to the primary for a while"""
+        if not key or not self.replicas:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._recent_writes[key] = now
+            # Opportunistic cleanup keeps the map bounded by active writers
+            if len(self._recent_writes) > 10000:
+                cutoff = now - READ_YOUR_WRITES_WINDOW
+                self._recent_writes = {k: t for k, t in self._recent_writes.items() if t >= cutoff}
+
+    def wrote_recently(self, key: Optional[str]) -> bool:
+        if not key:
+            return False
+        written_at = self._recent_writes.get(key)
+        return written_at is not None and time.monotonic() - written_at < READ_YOUR_WRITES_WINDOW
+
+    async def _probe(self, replica: Replica) -> bool:
+        replica.last_checked = time.monotonic()
+        try:
+            async def ping():
+                async with replica.engine.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+            await asyncio.wait_for(ping(), timeout=REPLICA_HEALTH_CHECK_TIMEOUT)
+            if not replica.healthy:
+                logger.info(f"Read replica {replica.name} is healthy again")
+            replica.healthy = True
+        except Exception as e:
+            if replica.healthy:
+                logger.warning(f"Read replica {replica.name} failed health check: {e}")
+            replica.healthy = False
+        return replica.healthy
+
+    async def pick(self) -> Optional[Replica]:
+        """Next healthy replica in round-robin order, or None to use the primary"""
+        if not self.replicas:
+            return None
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[next(self._cycle)]
+            if time.monotonic() - replica.last_checked >= REPLICA_HEALTH_CHECK_INTERVAL:
+                await self._probe(replica)
+            if replica.healthy:
+                return replica
+        logger.warning("No healthy read replicas available, reading from primary")
+        return None
+
+    def mark_unhealthy(self, replica: Replica) -> None:
+        replica.mark_unhealthy()
+
+replica_router = ReplicaRouter(DATABASE_REPLICA_URLS)
+
+def mark_write(key: Optional[str]) -> None:
+    """Pin reads for key (usually the clerk_id) to the primary after a write"""
+    replica_router.mark_write(key)
+
+@asynccontextmanager
+async def read_session(key: Optional[str] = None, force_primary: bool = False) -> AsyncGenerator[AsyncSession, None]:
+    """Async session for read-only work, routed to a replica when possible.
+
+    The replica connection is checked out up front, so a replica that can't be
+    reached is retried on the primary before any query runs.
+    """
+    replica = None
+    if not force_primary and not replica_router.wrote_recently(key):
+        replica = await replica_router.pick()
+
+    db = None
+    if replica is not None:
+        db = replica.sessionmaker()
+        try:
+            await db.connection()
+        except (OperationalError, OSError) as e:
+            logger.error(f"Read replica {replica.name} unreachable, reading from primary: {e}")
+            replica_router.mark_unhealthy(replica)
+            await db.close()
+            db = None
+
+    if db is None:
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
+
+    async with db:
+        try:
+            yield db
+        finally:
+            # Never leave a transaction open on a replica
+            await db.rollback()
+
+class QueryCount:
+    """Statements executed while a count_queries() block is active"""
+
+    def __init__(self, parent: Optional["QueryCount"] = None):
+        self.statements: List[str] = []
+        # Nested blocks (e.g. a test around the budget middleware) also count
+        # towards the enclosing block
+        self.parent = parent
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+_active_query_count: ContextVar[Optional[QueryCount]] = ContextVar("active_query_count", default=None)
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _record_statement(conn, cursor, statement, parameters, context, executemany):
+    query_count = _active_query_count.get()
+    while query_count is not None:
+        query_count.statements.append(statement)
+        query_count = query_count.parent
+
+@contextmanager
+def count_queries() -> Generator[QueryCount, None, None]:
+    """Count SQL statements issued by the current context (request or test).
+
+    Uses a context variable, so concurrent requests are counted separately.
+    """
+    query_count = QueryCount(parent=_active_query_count.get())
+    token = _active_query_count.set(query_count)
+    try:
+        yield query_count
+    finally:
+        _active_query_count.reset(token)
+
 @contextmanager
 def session_scope() -> Generator[Session, None, None]:
     """Provide a transactional scope around a series of operations"""
@@ -114,6 +363,16 @@ def get_db() -> Generator[Session, None, None]:
     finally:
         db.close()
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """Get async database session for async endpoints"""
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+        except SQLAlchemyError as e:
+            logger.error(f"Error in async database session: {e}")
+            await db.rollback()
+            raise
+
 def check_db_health() -> Optional[bool]:
     """Check database health with detailed error reporting"""
     try:
@@ -132,4 +391,31 @@ def check_db_health() -> Optional[bool]:
         return False
     except Exception as e:
         logger.error(f"Unexpected error during database health check: {e}")
-        return False
\ No newline at end of file
+        return False
+
+def check_schema_revision() -> Tuple[bool, str]:
+    """Compare the database's Alembic revision with the migration scripts' head.
+
+    Returns (is_current, message). Alembic is imported here rather than at
+    module level so the check costs nothing unless it is used.
+    """
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+    from alembic.runtime.migration import MigrationContext
+
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    config = Config(os.path.join(base_dir, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(base_dir, "alembic"))
+    heads = set(ScriptDirectory.from_config(config).get_heads())
+
+    try:
+        with engine.connect() as conn:
+            current = set(MigrationContext.configure(conn).get_current_heads())
+    except SQLAlchemyError as e:
+        logger.error(f"Could not read Alembic revision: {e}")
+        return False, f"could not read revision: {e}"
+
+    if current == heads:
+        return True, f"at head {', '.join(sorted(heads))}"
+    logger.warning(f"Database schema revision {current or 'none'} does not match head {heads}")
+    return False, f"database at {', '.join(sorted(current)) or 'no revision'}, expected {', '.join(sorted(heads))}"
@@ -0,0 +1,24 @@
+from fastapi import Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncGenerator
+
+from auth import get_current_user_clerk_id
+from database import read_session
+
+# Clients that just wrote (or need strict consistency) can send this header to
+# skip the replicas for a single request.
+READ_YOUR_WRITES_HEADER = "X-Read-Your-Writes"
+
+async def get_read_db(
+    request: Request,
+    clerk_id: str = Depends(get_current_user_clerk_id)
+) -> AsyncGenerator[AsyncSession, None]:
+    """Async session for read-only endpoints, routed to a read replica when configured.
+
+    Falls back to the primary when no replica is healthy, when the user wrote
+    within the read-your-writes window, or when the request sends
+    X-Read-Your-Writes: true.
+    """
+    force_primary = request.headers.get(READ_YOUR_WRITES_HEADER, "").lower() in ("1", "true", "yes")
+    async with read_session(clerk_id, force_primary=force_primary) as db:
+        yield db
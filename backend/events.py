@@ -0,0 +1,200 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Set
+
+from streaming import sse_event
+
+logger = logging.getLogger(__name__)
+
+# Per-user change notifications for GET /api/events.
+#
+# Write paths call publish(clerk_id, event, data) after they commit: profile
+# refreshes (update_profile_in_db), dashboard rebuilds, recommendations, chat
+# turns and Codeforces rating ingestion. publish is synchronous and thread-safe, so the sync background
+# tasks can call it from the threadpool. Subscribers get an asyncio.Queue per
+# open stream, filled on the event loop the bus was started on.
+#
+# EVENTS_BACKEND selects how events reach other workers:
+#   local    - (default) in-process only, fine for a single worker
+#   postgres - LISTEN/NOTIFY on EVENTS_CHANNEL; every worker (including the
+#              publisher) delivers what it hears to its own subscribers
+EVENTS_BACKEND = os.getenv("EVENTS_BACKEND", "local").lower()
+EVENTS_CHANNEL = os.getenv("EVENTS_CHANNEL", "user_events")
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))
+EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+RECONNECT_DELAY = 5
+
+class Subscription:
+    """One open event stream; overflowed means events were dropped and the client should refetch"""
+
+    def __init__(self, clerk_id: str):
+        self.clerk_id = clerk_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=EVENTS_QUEUE_SIZE)
+        self.overflowed = False
+
+    def put(self, message: dict) -> None:
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+class LocalBackend:
+    """Delivers straight to this process's subscribers"""
+
+    def __init__(self, bus: "EventBus"):
+        self.bus = bus
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    def send(self, message: dict) -> None:
+        self.bus.deliver(message)
+
+class PostgresBackend:
+    """Fans events out across workers with NOTIFY, delivering what LISTEN hears"""
+
+    def __init__(self, bus: "EventBus"):
+        self.bus = bus
+        self.conn = None
+        self._supervisor: Optional[asyncio.Task] = None
+        self._pending: Set[asyncio.Task] = set()  # in-flight NOTIFYs, referenced until done
+
+    async def _connect(self) -> None:
+        import asyncpg
+        from database import RAW_DATABASE_URL, build_async_database_url
+        url, connect_args = build_async_database_url(RAW_DATABASE_URL)
+        self.conn = await asyncpg.connect(url.replace("postgresql+asyncpg://", "postgresql://", 1), **connect_args)
+        await self.conn.add_listener(EVENTS_CHANNEL, self._on_notify)
+        logger.info(f"Listening for events on {EVENTS_CHANNEL}")
+
+    async def _supervise(self) -> None:
+        """Reconnect the LISTEN connection whenever it drops"""
+        while True:
+            if self.conn is None or self.conn.is_closed():
+                try:
+                    await self._connect()
+                except Exception as e:
+                    logger.error(f"Event listener connection failed: {e}")
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    async def start(self) -> None:
+        self._supervisor = asyncio.create_task(self._supervise())
+
+    async def stop(self) -> None:
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+        if self.conn is not None and not self.conn.is_closed():
+            await self.conn.close()
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        try:
+            self.bus.deliver(json.loads(payload))
+        except ValueError:
+            logger.warning(f"Ignoring malformed event payload on {channel}")
+
+    async def _notify(self, payload: str) -> None:
+        try:
+            await self.conn.execute("SELECT pg_notify($1, $2)", EVENTS_CHANNEL, payload)
+        except Exception as e:
+            logger.error(f"Failed to publish event: {e}")
+
+    def send(self, message: dict) -> None:
+        if self.conn is None or self.conn.is_closed():
+            logger.warning(f"Event listener not connected, dropping {message['event']} event")
+            return
+        task = asyncio.create_task(self._notify(json.dumps(message, default=str)))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+BACKENDS = {"local": LocalBackend, "postgres": PostgresBackend}
+
+class EventBus:
+    def __init__(self, backend: str = EVENTS_BACKEND):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown EVENTS_BACKEND {backend!r}, expected one of {', '.join(BACKENDS)}")
+        self.backend = BACKENDS[backend](self)
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+
+    async def start(self) -> None:
+        self.loop = asyncio.get_running_loop()
+        await self.backend.start()
+
+    async def stop(self) -> None:
+        await self.backend.stop()
+        self.loop = None
+
+    def _loop(self) -> asyncio.AbstractEventLoop:
+        # Started by the app lifespan; otherwise bind to the first loop that subscribes
+        if self.loop is None:
+            self.loop = asyncio.get_running_loop()
+        return self.loop
+
+    @asynccontextmanager
+    async def subscribe(self, clerk_id: str) -> AsyncIterator[Subscription]:
+        self._loop()
+        subscription = Subscription(clerk_id)
+        with self._lock:
+            self._subscribers.setdefault(clerk_id, set()).add(subscription)
+        try:
+            yield subscription
+        finally:
+            with self._lock:
+                subscribers = self._subscribers.get(clerk_id)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[clerk_id]
+
+    def deliver(self, message: dict) -> None:
+        """Hand a message to this process's subscribers (on the bus loop)"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(message.get("clerk_id"), ()))
+        for subscription in subscribers:
+            subscription.put(message)
+
+    def publish(self, clerk_id: str, event: str, data: Optional[dict] = None) -> None:
+        """Notify the user's open streams; safe from any thread, never raises"""
+        if not clerk_id or self.loop is None or self.loop.is_closed():
+            return  # nothing can be listening yet
+        message = {"clerk_id": clerk_id, "event": event, "data": data or {}}
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None  # sync background task in the threadpool
+        try:
+            if running is self.loop:
+                self.backend.send(message)
+            else:
+                self.loop.call_soon_threadsafe(self.backend.send, message)
+        except RuntimeError as e:
+            logger.warning(f"Could not publish {event} event for {clerk_id}: {e}")
+
+event_bus = EventBus()
+
+def publish(clerk_id: str, event: str, data: Optional[dict] = None) -> None:
+    event_bus.publish(clerk_id, event, data)
+
+async def event_stream(clerk_id: str) -> AsyncIterator[str]:
+    """SSE for one user: `ready`, then one event per change, with heartbeat comments in between"""
+    async with event_bus.subscribe(clerk_id) as subscription:
+        yield sse_event("ready", {})
+        while True:
+            try:
+                message = await asyncio.wait_for(subscription.queue.get(), timeout=EVENTS_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"  # keeps proxies from closing an idle stream
+                continue
+            yield sse_event(message["event"], message["data"])
+            if subscription.overflowed and subscription.queue.empty():
+                # Events were dropped while the client lagged; it has to refetch
+                subscription.overflowed = False
+                yield sse_event("resync", {})
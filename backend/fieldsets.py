@@ -0,0 +1,111 @@
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only, raiseload, selectinload
+
+from models import User as DBUser, CodingProfile, ChatSession
+
+# Sparse fieldsets for GET /api/query.
+#
+# Clients name the columns they need per resource (fields[user]=username,
+# fields[profiles]=platform,current_rating, fields[sessions]=title). Only the
+# resources that are asked for are queried, and only the requested columns are
+# loaded: load_only() on the user, the profiles selectinload and the sessions
+# SELECT, so the deferred JSON columns (languages, problem_categories) are read
+# only when they are in the list. "*" selects every exposed field.
+
+USER_FIELDS = {
+    name: getattr(DBUser, name) for name in (
+        "clerk_id", "email", "username", "profile_picture",
+        "leetcode_username", "github_username", "codechef_username", "codeforces_username",
+        "created_at", "updated_at",
+    )
+}
+
+PROFILE_FIELDS = {
+    name: getattr(CodingProfile, name) for name in (
+        "platform", "username", "last_updated",
+        "total_contributions", "current_streak", "longest_streak", "total_stars", "total_forks", "languages",
+        "total_problems_solved", "easy_solved", "medium_solved", "hard_solved",
+        "easy_percentage", "medium_percentage", "hard_percentage", "problem_categories",
+        "current_rating", "highest_rating", "global_rank", "country_rank", "stars",
+        "codeforces_rating", "codeforces_max_rating", "problems_solved_count", "contest_rating",
+    )
+}
+
+SESSION_FIELDS = {
+    name: getattr(ChatSession, name) for name in (
+        "session_id", "title", "message_count", "started_at", "last_message_at", "summary",
+    )
+}
+
+def parse_fields(raw: Optional[str], allowed: Dict[str, object], resource: str) -> Optional[List[str]]:
+    """Requested field names in request order, None if the resource wasn't asked for"""
+    if raw is None:
+        return None
+    names = [name.strip() for name in raw.split(",") if name.strip()]
+    if names == ["*"]:
+        return list(allowed)
+    unknown = [name for name in names if name not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown {resource} fields: {', '.join(unknown)}. Allowed: {', '.join(allowed)}"
+        )
+    if not names:
+        raise HTTPException(status_code=400, detail=f"fields[{resource}] must name at least one field")
+    return list(dict.fromkeys(names))
+
+def _pick(row, fields: List[str]) -> dict:
+    return {name: getattr(row, name) for name in fields}
+
+async def query_fields(
+    db: AsyncSession,
+    clerk_id: str,
+    user_fields: Optional[List[str]],
+    profile_fields: Optional[List[str]],
+    session_fields: Optional[List[str]],
+    platforms: Optional[List[str]] = None,
+    sessions_limit: int = 20,
+) -> dict:
+    """The requested resources for one user: at most three SELECTs, one per resource"""
+    if user_fields is None and profile_fields is None and session_fields is None:
+        raise HTTPException(status_code=400, detail="Request at least one of fields[user], fields[profiles], fields[sessions]")
+    result = {}
+    if user_fields is not None or profile_fields is not None:
+        # The user row is always read (it 404s unknown users); clerk_id alone when no user fields are wanted
+        options = [load_only(*(USER_FIELDS[name] for name in user_fields or ["clerk_id"]))]
+        if profile_fields is not None:
+            relationship = DBUser.coding_profiles
+            if platforms:
+                relationship = relationship.and_(CodingProfile.platform.in_(platforms))
+            # platform is always loaded, it orders the list
+            columns = [PROFILE_FIELDS[name] for name in profile_fields if name != "platform"]
+            options.append(selectinload(relationship).load_only(CodingProfile.platform, *columns))
+        else:
+            # coding_profiles is lazy="selectin" on the model; don't load it unasked,
+            # and fail loudly if something touches it anyway
+            options.append(raiseload(DBUser.coding_profiles))
+        db_user = (await db.execute(
+            select(DBUser).where(DBUser.clerk_id == clerk_id).options(*options)
+        )).scalar_one_or_none()
+        if db_user is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        if user_fields is not None:
+            result["user"] = _pick(db_user, user_fields)
+        if profile_fields is not None:
+            profiles = sorted(db_user.coding_profiles, key=lambda p: p.platform)
+            result["profiles"] = [_pick(p, profile_fields) for p in profiles]
+
+    if session_fields is not None:
+        rows = (await db.execute(
+            select(ChatSession)
+            .where(ChatSession.clerk_id == clerk_id)
+            .options(load_only(*(SESSION_FIELDS[name] for name in session_fields)))
+            .order_by(ChatSession.last_message_at.desc(), ChatSession.id.desc())
+            .limit(sessions_limit)
+        )).scalars().all()
+        result["sessions"] = [_pick(row, session_fields) for row in rows]
+    return result
@@ -0,0 +1,194 @@
+import re
+
+# Plain-text formatting of Gemini responses (markdown stripped, extra spacing).
+#
+# Same passes in the same order as the original inline implementation, with
+# every pattern compiled once at import, passes skipped when their trigger
+# text is absent, cheaper replacements, and linear rewrites of the two rules
+# that were quadratic or slow (trailing whitespace, section-title colons).
+# benchmarks/bench_formatting.py checks the output against the original.
+
+LINK = re.compile(r'\[([^\]]+)\]\(([^)]+)\)')
+HEADING = re.compile(r'^(#{1,6})\s+(.*?)$', re.MULTILINE)
+BULLET_MARKER = re.compile(r'^(\s*)(\*|-)\s+', re.MULTILINE)
+EMPHASIS = re.compile(r'(\*{1,2})([^*]+?)(\*{1,2})')
+NUMBERED_ITEM = re.compile(r'^(\s*)(\d+)\.\s+', re.MULTILINE)
+INLINE_CODE = re.compile(r'(?<!`)`([^`]+?)`(?!`)')
+UNDERSCORE = re.compile(r'_(.*?)_')
+BULLET_SPACING = re.compile(r'^([\s]*)(•)(\s*)', re.MULTILINE)
+SENTENCE_BREAK = re.compile(r'\.\s(?=[A-Z])')
+NEWLINES_4 = re.compile(r'\n{4,}')
+CODE_BLOCK = re.compile(r'(```[^`]*```)')
+NUMBERED_SPACING = re.compile(r'(\d+\.\s.*?)(\n)(\d+\.)')
+# ([A-Z][A-Z\s]+): retries every start position inside a long run of capitals
+# and whitespace, which is quadratic. On the reversed text the same rule only
+# starts at colons: a colon followed by a run containing a capital at index 1+
+# (i.e. a capital with at least one run character between it and the colon).
+REVERSED_TITLE_COLON = re.compile(r':(?=[A-Z\s][A-Z\s]*?[A-Z])')
+NEWLINES_5 = re.compile(r'\n{5,}')
+BULLET_PAIR = re.compile(r'(•.*?)(\n)(•)')
+
+def link_to_text(match):
+    link_text = match.group(1)
+    link_url = match.group(2)
+
+    # For LeetCode problems, extract problem name and number
+    if 'leetcode.com/problems' in link_url:
+        problem_slug = link_url.split('/')[-2]
+        return f"{link_text} (LeetCode: {problem_slug})"
+
+    # For GitHub repos
+    elif 'github.com' in link_url:
+        return f"{link_text} (GitHub)"
+
+    # For other URLs, just keep the text without the URL
+    else:
+        return f"{link_text}"
+
+def heading_replacer(match):
+    level = len(match.group(1))
+    title = match.group(2).strip().upper() if level <= 2 else match.group(2).strip()
+    # Add extra newline before headings
+    return f"\n\n\n{title}\n\n"
+
+def list_item_replacer(match):
+    indent = match.group(1)
+    number = match.group(2)
+    return f"\n\n{indent}{number}. "
+
+def strip_trailing_whitespace(text: str) -> str:
+    """Same result as re.sub(r'\s+$', '', text, flags=re.MULTILINE).
+
+    That regex also swallows whitespace-only lines (a run of whitespace ending
+    at a line end can span several newlines), so: strip every line, keep the
+    first line even if blank, drop later whitespace-only lines.
+    """
+    lines = text.split("\n")
+    return "\n".join([lines[0].rstrip()] + [line.rstrip() for line in lines[1:] if line.strip()])
+
+def add_title_colon_spacing(text: str) -> str:
+    """Same result as re.sub(r'([A-Z][A-Z\s]+):', r'\1:\n\n', text), in linear time"""
+    return REVERSED_TITLE_COLON.sub('\n\n:', text[::-1])[::-1]
+
+def format_ai_response(response_text):
+    """
+    Format the AI response by removing markdown symbols and making the text
+    more reader-friendly while preserving structure and adding appropriate spacing.
+    Convert links to plain text references.
+    """
+    # Replacement callables rather than r'\1' templates: before Python 3.12
+    # templates are expanded in Python code for every match
+    formatted_text = response_text
+
+    # Replace links with text-only versions
+    if '](' in formatted_text:
+        formatted_text = LINK.sub(link_to_text, formatted_text)
+
+    # Replace headings with capitalized versions and add spacing
+    if '#' in formatted_text:
+        formatted_text = HEADING.sub(heading_replacer, formatted_text)
+
+    # Remove bullet points (* or -) at the start of lines while preserving indentation
+    if '*' in formatted_text or '-' in formatted_text:
+        formatted_text = BULLET_MARKER.sub(lambda m: m.group(1) + '• ', formatted_text)
+
+    # Remove bold/italic markers (**, *) around words
+    if '*' in formatted_text:
+        formatted_text = EMPHASIS.sub(lambda m: m.group(2), formatted_text)
+
+    # Convert numbered list items to clean format while preserving numbers and adding space before items
+    formatted_text = NUMBERED_ITEM.sub(list_item_replacer, formatted_text)
+
+    # Remove backticks for inline code (except for code blocks)
+    has_backticks = '`' in formatted_text
+    if has_backticks:
+        formatted_text = INLINE_CODE.sub(lambda m: m.group(1), formatted_text)
+
+    # Remove underscores used for emphasis
+    if '_' in formatted_text:
+        formatted_text = UNDERSCORE.sub(lambda m: m.group(1), formatted_text)
+
+    # Add spacing after bullet points for better readability
+    has_bullets = '•' in formatted_text
+    if has_bullets:
+        formatted_text = BULLET_SPACING.sub(lambda m: '\n\n' + m.group(1) + '• ', formatted_text)
+
+    # Add spacing between paragraphs (sentences that end with period and are followed by a new sentence)
+    formatted_text = SENTENCE_BREAK.sub('.\n\n', formatted_text)
+
+    # Convert multiple newlines to just two (create paragraphs)
+    if '\n\n\n\n' in formatted_text:
+        formatted_text = NEWLINES_4.sub('\n\n\n', formatted_text)
+
+    # Remove trailing whitespace in each line
+    formatted_text = strip_trailing_whitespace(formatted_text)
+
+    # Add extra spacing around code blocks
+    if has_backticks:
+        formatted_text = CODE_BLOCK.sub(lambda m: '\n\n' + m.group(1) + '\n\n', formatted_text)
+
+    # Ensure each list item is followed by extra newlines
+    formatted_text = NUMBERED_SPACING.sub(lambda m: m.group(1) + '\n\n\n' + m.group(3), formatted_text)
+
+    # Ensure there's extra spacing after colons in section titles
+    if ':' in formatted_text:
+        formatted_text = add_title_colon_spacing(formatted_text)
+
+    # Clean up excessive newlines
+    if '\n\n\n\n\n' in formatted_text:
+        formatted_text = NEWLINES_5.sub('\n\n\n\n', formatted_text)
+
+    # Ensure the text starts without leading newlines
+    formatted_text = formatted_text.lstrip('\n')
+
+    # Add extra spacing between bullet points
+    if has_bullets:
+        formatted_text = BULLET_PAIR.sub(lambda m: m.group(1) + '\n\n•', formatted_text)
+
+    return formatted_text
+
+class StreamingFormatter:
+    """Applies format_ai_response to a stream, one paragraph block at a time.
+
+    Text is held back until a blank line closes a block (outside ``` fences),
+    so every pattern sees complete lines and list items. The output can differ
+    from formatting the whole text at once in inter-block spacing only.
+    """
+
+    def __init__(self, format_text=format_ai_response):
+        self.format_text = format_text
+        self.pending = ""
+        self.scanned = 0  # pending[:scanned] has no usable block boundary
+        self.started = False
+
+    def _emit(self, block: str) -> str:
+        formatted = self.format_text(block)
+        if not formatted:
+            return ""
+        out = ("\n\n" if self.started else "") + formatted
+        self.started = True
+        return out
+
+    def feed(self, chunk: str) -> str:
+        self.pending += chunk
+        cut = -1
+        search_from = max(self.scanned - 1, 0)
+        while True:
+            boundary = self.pending.find("\n\n", search_from)
+            if boundary == -1:
+                break
+            # Only split where no code fence is left open
+            if self.pending.count("```", 0, boundary) % 2 == 0:
+                cut = boundary
+            search_from = boundary + 2
+        if cut == -1:
+            self.scanned = len(self.pending)
+            return ""
+        block, self.pending = self.pending[:cut], self.pending[cut + 2:]
+        self.scanned = 0
+        return self._emit(block)
+
+    def flush(self) -> str:
+        block, self.pending = self.pending, ""
+        self.scanned = 0
+        return self._emit(block) if block.strip() else ""
@@ -0,0 +1,46 @@
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response
+
+# Conditional GET helpers.
+#
+# Endpoints derive a strong ETag from cheap version inputs (last_updated /
+# updated_at timestamps, row counts) or from the content itself, check
+# If-None-Match before loading or serializing anything heavy, and answer 304
+# with no body when the client's copy is current.
+
+# Cache-Control per endpoint family. Everything is per-user, so private;
+# no-cache means "revalidate every time", which is a cheap 304 here.
+CACHE_PROFILE = "private, no-cache"
+CACHE_PLATFORM = "private, max-age=60"  # platform stats only refresh every 30 minutes
+CACHE_DASHBOARD = "private, no-cache"
+
+def make_etag(*parts) -> str:
+    """Quoted strong ETag from version inputs"""
+    digest = hashlib.sha256("|".join("" if p is None else str(p) for p in parts).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+def cache_headers(etag: str, cache_control: str) -> dict:
+    return {"ETag": etag, "Cache-Control": cache_control}
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag, cache_control))
+
+def conditional(request: Request, etag: str, cache_control: str, response: Optional[Response] = None) -> Optional[Response]:
+    """304 response if the client has this version; otherwise set the headers on response and return None"""
+    if etag_matches(request, etag):
+        return not_modified(etag, cache_control)
+    if response is not None:
+        response.headers.update(cache_headers(etag, cache_control))
+    return None
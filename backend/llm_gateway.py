@@ -0,0 +1,292 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import AsyncIterator, Dict, Optional
+
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+# Single entry point for Gemini calls.
+#
+# Owns the model instances, always uses the SDK's async methods, and limits
+# concurrency: at most LLM_MAX_CONCURRENCY calls in flight overall and
+# LLM_MAX_PER_USER per user. Callers beyond that wait in a bounded queue
+# (LLM_MAX_QUEUE entries, LLM_QUEUE_TIMEOUT seconds); when it is full or the
+# wait times out the request gets a 429. Each call has a timeout and transient
+# errors are retried with jittered exponential backoff. Models are resolved in
+# a worker thread, since the first use imports and configures the SDK.
+LLM_MODEL_NAME = os.getenv("LLM_MODEL_NAME", "gemini-1.5-flash")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_PER_USER = int(os.getenv("LLM_MAX_PER_USER", "2"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "32"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "10"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_RETRIES = int(os.getenv("LLM_RETRIES", "2"))
+LLM_RETRY_BASE_DELAY = 0.5
+LATENCY_WINDOW = 500  # recent calls kept for percentiles
+
+CHAT_SYSTEM_INSTRUCTION = (
+    "You are a personalized coding career assistant that provides tailored recommendations based on user data. "
+    "You'll receive information about the user's coding profiles (LeetCode, GitHub, CodeChef, Codeforces) and "
+    "their stats whenever available. Use this information to personalize your responses for:\n\n"
+    "1. Code generation in languages the user is familiar with\n"
+    "2. Career advice and learning paths tailored to their experience level\n"
+    "3. Practice problems that match their current skill level\n"
+    "4. Project ideas that build on their strengths\n\n"
+    "IMPORTANT FORMATTING GUIDELINES:\n\n"
+    "- Always address the user by their username in a conversational tone\n"
+    "- Use clear section titles followed by TWO line breaks\n"
+    "- Present information in concise paragraphs with THREE line breaks between sections\n"
+    "- For lists, use clear numbered format with each item on its own line and TWO line breaks between items\n"
+    "- When recommending resources, include specific details for easy access:\n"
+    "  * For LeetCode questions: Include full problem name AND problem number (e.g., 'Two Sum - Problem 1')\n"
+    "  * For courses/tutorials: Include full course name AND platform/provider (e.g., 'Advanced Python - Coursera')\n"
+    "  * For concepts: Include specific search terms (e.g., 'Python asyncio programming - official documentation')\n"
+    "- Ensure EXTRA spacing between different sections and ideas\n"
+    "- Use bullet points (•) for unordered lists with TWO line breaks between items\n"
+    "- Keep content well-structured with ample white space"
+)
+
+@lru_cache(maxsize=1)
+def get_genai():
+    """Import and configure the Gemini SDK on first use (it is slow to import)"""
+    import google.generativeai as genai
+    genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+    return genai
+
+@lru_cache(maxsize=None)
+def get_model(kind: str):
+    """Shared model instances: "chat" (chat and recommendations) or "analysis" (resume analysis)"""
+    if kind == "chat":
+        return get_genai().GenerativeModel(LLM_MODEL_NAME, system_instruction=CHAT_SYSTEM_INSTRUCTION)
+    if kind == "analysis":
+        return get_genai().GenerativeModel(LLM_MODEL_NAME)
+    raise ValueError(f"Unknown model kind: {kind}")
+
+@lru_cache(maxsize=1)
+def _transient_errors() -> tuple:
+    from google.api_core import exceptions as api_exceptions
+    return (
+        asyncio.TimeoutError,
+        api_exceptions.ResourceExhausted,
+        api_exceptions.ServiceUnavailable,
+        api_exceptions.DeadlineExceeded,
+        api_exceptions.InternalServerError,
+    )
+
+def _chunk_text(chunk) -> str:
+    try:
+        return chunk.text
+    except ValueError:
+        # Chunks without text parts (e.g. safety or finish metadata)
+        return ""
+
+class LLMMetrics:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.rejected = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.queue_waits = deque(maxlen=LATENCY_WINDOW)
+
+    def record_usage(self, response) -> None:
+        usage = getattr(response, "usage_metadata", None)
+        if usage:
+            self.prompt_tokens += getattr(usage, "prompt_token_count", 0) or 0
+            self.output_tokens += getattr(usage, "candidates_token_count", 0) or 0
+
+    @staticmethod
+    def _percentile(values, q: float) -> Optional[float]:
+        if not values:
+            return None
+        ordered = sorted(values)
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 1)
+
+    def snapshot(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "rejected": self.rejected,
+            "prompt_tokens": self.prompt_tokens,
+            "output_tokens": self.output_tokens,
+            "latency_ms": {
+                "p50": self._percentile(self.latencies, 0.5),
+                "p95": self._percentile(self.latencies, 0.95),
+                "p99": self._percentile(self.latencies, 0.99),
+            },
+            "queue_wait_ms": {
+                "p50": self._percentile(self.queue_waits, 0.5),
+                "p95": self._percentile(self.queue_waits, 0.95),
+            },
+        }
+
+class LLMGateway:
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY, max_per_user: int = LLM_MAX_PER_USER,
+                 max_queue: int = LLM_MAX_QUEUE, queue_timeout: float = LLM_QUEUE_TIMEOUT,
+                 timeout: float = LLM_TIMEOUT, retries: int = LLM_RETRIES):
+        self.max_concurrency = max_concurrency
+        self.max_per_user = max_per_user
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.timeout = timeout
+        self.retries = retries
+        self.metrics = LLMMetrics()
+        self.in_flight = 0
+        self.admitted = 0  # running + waiting for a slot
+        self._global: Optional[asyncio.Semaphore] = None
+        self._users: Dict[str, list] = {}  # key -> [semaphore, holders + waiters]
+
+    def _saturated(self, detail: str) -> HTTPException:
+        self.metrics.rejected += 1
+        return HTTPException(status_code=429, detail=detail, headers={"Retry-After": "5"})
+
+    @property
+    def waiting(self) -> int:
+        return self.admitted - self.in_flight
+
+    def check_capacity(self) -> None:
+        """Fail fast with 429 when the wait queue is already full"""
+        if self.admitted >= self.max_concurrency + self.max_queue:
+            raise self._saturated("Too many AI requests in progress, please retry shortly")
+
+    @asynccontextmanager
+    async def slot(self, key: str):
+        """Hold one global and one per-user concurrency slot"""
+        self.check_capacity()
+        if self._global is None:
+            self._global = asyncio.Semaphore(self.max_concurrency)
+        entry = self._users.setdefault(key, [asyncio.Semaphore(self.max_per_user), 0])
+        entry[1] += 1
+        user_sem = entry[0]
+
+        async def acquire_both():
+            await user_sem.acquire()
+            try:
+                await self._global.acquire()
+            except BaseException:
+                user_sem.release()
+                raise
+
+        start = time.perf_counter()
+        self.admitted += 1
+        try:
+            await asyncio.wait_for(acquire_both(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.admitted -= 1
+            self._release_user(key)
+            raise self._saturated("Timed out waiting for an AI slot, please retry shortly")
+        except BaseException:
+            self.admitted -= 1
+            self._release_user(key)
+            raise
+        self.metrics.queue_waits.append(time.perf_counter() - start)
+
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self.admitted -= 1
+            self._global.release()
+            user_sem.release()
+            self._release_user(key)
+
+    def _release_user(self, key: str) -> None:
+        entry = self._users.get(key)
+        if entry:
+            entry[1] -= 1
+            if entry[1] <= 0:
+                del self._users[key]
+
+    async def _backoff(self, attempt: int, error: Exception, label: str) -> None:
+        self.metrics.retries += 1
+        delay = LLM_RETRY_BASE_DELAY * (2 ** attempt) * (1 + random.random())
+        logger.warning(f"{label}: transient LLM error ({error!r}), retrying in {delay:.1f}s")
+        await asyncio.sleep(delay)
+
+    async def generate(self, kind: str, prompt: str, key: str, label: str = "LLM call"):
+        """Non-streaming generation; returns the SDK response"""
+        model = await asyncio.to_thread(get_model, kind)
+        async with self.slot(key):
+            for attempt in range(self.retries + 1):
+                start = time.perf_counter()
+                try:
+                    response = await asyncio.wait_for(model.generate_content_async(prompt), self.timeout)
+                except _transient_errors() as e:
+                    if attempt == self.retries:
+                        self.metrics.errors += 1
+                        raise
+                    await self._backoff(attempt, e, label)
+                    continue
+                except Exception:
+                    self.metrics.errors += 1
+                    raise
+                self.metrics.calls += 1
+                self.metrics.latencies.append(time.perf_counter() - start)
+                self.metrics.record_usage(response)
+                logger.info(f"{label}: {(time.perf_counter() - start) * 1000:.0f}ms")
+                return response
+
+    async def stream(self, kind: str, prompt: str, key: str, label: str = "LLM stream") -> AsyncIterator[str]:
+        """Streaming generation yielding text chunks.
+
+        Retries only happen before the first chunk; each chunk must arrive
+        within the call timeout.
+        """
+        model = await asyncio.to_thread(get_model, kind)
+        async with self.slot(key):
+            for attempt in range(self.retries + 1):
+                start = time.perf_counter()
+                last = None
+                yielded = False
+                try:
+                    response = await asyncio.wait_for(
+                        model.generate_content_async(prompt, stream=True), self.timeout
+                    )
+                    chunks = response.__aiter__()
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(chunks.__anext__(), self.timeout)
+                        except StopAsyncIteration:
+                            break
+                        last = chunk
+                        text = _chunk_text(chunk)
+                        if text:
+                            yielded = True
+                            yield text
+                except _transient_errors() as e:
+                    if yielded or attempt == self.retries:
+                        self.metrics.errors += 1
+                        raise
+                    await self._backoff(attempt, e, label)
+                    continue
+                except Exception:
+                    self.metrics.errors += 1
+                    raise
+                self.metrics.calls += 1
+                self.metrics.latencies.append(time.perf_counter() - start)
+                if last is not None:
+                    self.metrics.record_usage(last)
+                return
+
+    def status(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_concurrency": self.max_concurrency,
+            "max_per_user": self.max_per_user,
+            "max_queue": self.max_queue,
+            **self.metrics.snapshot(),
+        }
+
+llm = LLMGateway()
@@ -0,0 +1,95 @@
+# Per-endpoint loader options and query budgets.
+#
+# Each response model touches a known set of columns. Listing them here (rather
+# than relying on lazy/deferred loading) keeps every endpoint at a fixed number
+# of SELECTs no matter how many coding profiles a user has, and is required for
+# AsyncSession, which cannot lazy-load at all.
+from sqlalchemy import select, func
+from sqlalchemy.orm import selectinload, load_only, undefer
+
+from models import User as DBUser, CodingProfile
+
+# UserResponse -> CodingProfileResponse (includes the deferred languages column)
+USER_RESPONSE_LOADERS = (
+    selectinload(DBUser.coding_profiles).load_only(
+        CodingProfile.platform,
+        CodingProfile.username,
+        CodingProfile.last_updated,
+        CodingProfile.total_problems_solved,
+        CodingProfile.current_streak,
+        CodingProfile.languages,
+    ),
+)
+
+# UserAnalysisOut -> CodingProfileOut
+ANALYSIS_LOADERS = (
+    load_only(DBUser.username, DBUser.email),
+    selectinload(DBUser.coding_profiles).load_only(
+        CodingProfile.platform,
+        CodingProfile.total_problems_solved,
+        CodingProfile.easy_solved,
+        CodingProfile.medium_solved,
+        CodingProfile.hard_solved,
+        CodingProfile.current_rating,
+        CodingProfile.stars,
+        CodingProfile.languages,
+    ),
+)
+
+# Dashboard document: the whole user plus every profile column
+DASHBOARD_LOADERS = (
+    selectinload(DBUser.coding_profiles).options(
+        undefer(CodingProfile.languages),
+        undefer(CodingProfile.problem_categories),
+    ),
+)
+
+# Prompt context for /chat and /api/recommendations
+PROMPT_CONTEXT_LOADERS = (
+    load_only(
+        DBUser.username,
+        DBUser.leetcode_username,
+        DBUser.github_username,
+        DBUser.codechef_username,
+        DBUser.codeforces_username,
+    ),
+    selectinload(DBUser.coding_profiles).load_only(
+        CodingProfile.platform,
+        CodingProfile.total_problems_solved,
+        CodingProfile.easy_solved,
+        CodingProfile.medium_solved,
+        CodingProfile.hard_solved,
+        CodingProfile.total_contributions,
+        CodingProfile.languages,
+        CodingProfile.current_rating,
+        CodingProfile.stars,
+        CodingProfile.codeforces_rating,
+        CodingProfile.problems_solved_count,
+    ),
+)
+
+def select_user(clerk_id: str, loaders=USER_RESPONSE_LOADERS):
+    """SELECT for one user with the given loader options applied"""
+    return select(DBUser).where(DBUser.clerk_id == clerk_id).options(*loaders)
+
+def select_user_version(clerk_id: str):
+    """One-row SELECT of what changes whenever UserResponse/UserAnalysisOut would:
+    users.updated_at, the newest profile last_updated and the profile count"""
+    return (
+        select(DBUser.updated_at, func.max(CodingProfile.last_updated), func.count(CodingProfile.id))
+        .select_from(DBUser)
+        .outerjoin(CodingProfile, CodingProfile.clerk_id == DBUser.clerk_id)
+        .where(DBUser.clerk_id == clerk_id)
+        .group_by(DBUser.updated_at)
+    )
+
+def query_budget(max_queries: int):
+    """Declare the maximum number of SQL statements an endpoint may execute.
+
+    Checked by the query budget middleware in main.py when
+    ENFORCE_QUERY_BUDGETS is set to warn or raise.
+    """
+    def decorator(endpoint):
+        endpoint.__query_budget__ = max_queries
+        return endpoint
+    return decorator
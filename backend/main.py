@@ -3,46 +3,94 @@
 
 import os
 import logging
+import asyncio
 import requests
-import fitz
+from contextlib import aclosing, asynccontextmanager
 from dotenv import load_dotenv
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, NamedTuple
 from datetime import datetime
-import re
 
-from fastapi import FastAPI, File, UploadFile, Form, Depends, HTTPException, status
+from fastapi import FastAPI, File, UploadFile, Form, Depends, HTTPException, Query, Request, BackgroundTasks, status
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 
 from sqlalchemy.orm import Session
-from sqlalchemy import text
-from datetime import datetime, timezone
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text, select, func, and_, or_
+from datetime import datetime, timedelta, timezone
 
-from database import engine, SessionLocal, get_db
-from models import Base, User as DBUser, ChatHistory
+from database import engine, SessionLocal, AsyncSessionLocal, get_db, get_async_db, mark_write, check_db_health, check_schema_revision, count_queries
+from loaders import select_user, select_user_version, query_budget, USER_RESPONSE_LOADERS, ANALYSIS_LOADERS
+from dependencies import get_read_db, READ_YOUR_WRITES_HEADER
+from models import Base, User as DBUser, CodingProfile, ChatHistory, ChatSession, DashboardDocument
 from schemas import UserResponse, UserUpdate
 from auth import get_current_user_clerk_id, get_current_user
 from routes.platform_routes import router as platform_router
-
-import google.generativeai as genai
+from routes.chat_routes import router as chat_router, record_chat_turn, encode_cursor, decode_cursor, CHAT_SESSIONS_MAX_PAGE
+from chat_search import index_chat_message
+from chat_memory import build_memory_context, fold_turn, estimate_tokens
+from user_context import UserContext, get_user_context, invalidate_user_context
+from recommendations import material_inputs, get_cached_recommendations, store_recommendations
+from streaming import LLMStream, sse_event, sse_response, ndjson_response
+from events import event_bus, event_stream, publish
+from formatting import format_ai_response
+from llm_gateway import llm, get_model
+from resume_cache import (
+    sha256_hex, job_description_hash, get_cached_analysis, store_analysis,
+    get_cached_text, store_text, evict_resume_cache
+)
+from skill_matcher import match_skills
+from resume_analysis import build_analysis_prompt
+from screening import BATCH_MAX_ZIP_BYTES, collect_resumes, screen_resumes
+from dashboard import rebuild_dashboard, rebuild_dashboard_document
+from fieldsets import USER_FIELDS, PROFILE_FIELDS, SESSION_FIELDS, parse_fields, query_fields
+from profile_history import TRACKED_METRICS, profile_history
+from http_cache import CACHE_DASHBOARD, CACHE_PROFILE, conditional, make_etag
+from pdf_extract import (
+    PDF_MAX_BYTES, UPLOAD_FORM_OVERHEAD, UploadLimitMiddleware, read_upload, extract_pdf_text,
+    shutdown_pool as shutdown_pdf_pool
+)
 
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+load_dotenv()
 
+# Schema handling at startup:
+#   alembic    - (default) /ready reports whether the DB is at the Alembic head
+#   create_all - legacy behaviour, create missing tables on startup (local dev)
+#   off        - no schema checks at all
+SCHEMA_CHECK = os.getenv("SCHEMA_CHECK", "alembic").lower()
+# Import the Gemini SDK in a background thread once the server is up, so the
+# first LLM request doesn't pay for it. Off by default to keep cold starts lean.
+PREWARM_LLM = os.getenv("PREWARM_LLM", "false").lower() == "true"
 
-load_dotenv()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if SCHEMA_CHECK == "create_all":
+        await asyncio.to_thread(Base.metadata.create_all, bind=engine)
+    if PREWARM_LLM:
+        asyncio.get_running_loop().run_in_executor(None, get_model, "chat")
+    await event_bus.start()
+    yield
+    await event_bus.stop()
+    shutdown_pdf_pool()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 @app.get("/")
 def read_root():
     return {"message": "Hello from FastAPI on Render!"}
 
+# Whole-request caps for the upload endpoints, enforced before the multipart
+# body is parsed (added before CORS so 413s still carry CORS headers)
+app.add_middleware(UploadLimitMiddleware, limits={
+    "/analyze": PDF_MAX_BYTES + UPLOAD_FORM_OVERHEAD,
+    "/analyze/batch": BATCH_MAX_ZIP_BYTES + UPLOAD_FORM_OVERHEAD,
+})
+
 # CORS Configuration
 allowed_origins = os.getenv("FRONTEND_URL", "http://localhost:5173,https://coding-journey-9rlm.vercel.app,https://codenexusai.me,https://www.codenexusai.me").split(",")
 app.add_middleware(
@@ -50,8 +98,8 @@ app.add_middleware(
     allow_origins=allowed_origins,
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
-    allow_headers=["Authorization", "Content-Type", "Accept"],
-    expose_headers=["Content-Type", "Authorization"],
+    allow_headers=["Authorization", "Content-Type", "Accept", "If-None-Match", READ_YOUR_WRITES_HEADER],
+    expose_headers=["Content-Type", "Authorization", "ETag", "X-Dashboard-Version"],
     max_age=3600,
 )
 
@@ -61,6 +109,22 @@ logger.info(f"Starting server in {environment.upper()} mode")
 logger.info(f"Allowed origins: {allowed_origins}")
 logger.info(f"Database: {os.getenv('DATABASE_URL', 'sqlite:///./test.db').split('@')[0]}...") # Show only the first part for security
 
+# Query budgets (see loaders.query_budget): off, warn or raise
+ENFORCE_QUERY_BUDGETS = os.getenv("ENFORCE_QUERY_BUDGETS", "off").lower()
+
+if ENFORCE_QUERY_BUDGETS in ("warn", "raise"):
+    @app.middleware("http")
+    async def enforce_query_budget(request, call_next):
+        with count_queries() as queries:
+            response = await call_next(request)
+        budget = getattr(request.scope.get("endpoint"), "__query_budget__", None)
+        if budget is not None and queries.count > budget:
+            message = f"{request.method} {request.url.path} ran {queries.count} queries (budget {budget})"
+            logger.error(f"Query budget exceeded: {message}: {queries.statements}")
+            if ENFORCE_QUERY_BUDGETS == "raise":
+                return JSONResponse(status_code=500, content={"detail": f"Query budget exceeded: {message}"})
+        return response
+
 # Add logging middleware
 @app.middleware("http")
 async def log_requests(request, call_next):
@@ -74,11 +138,26 @@ async def log_requests(request, call_next):
         logger.error(f"Error processing request: {e}")
         raise
 
-# Configure Gemini
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+class SkillHit(BaseModel):
+    skill: str
+    category: str
+    confidence: float
+
+class SkillGap(BaseModel):
+    skill: str
+    category: str
+    weight: int  # how often the job description mentions it (capped)
+
+class SkillMatchOut(BaseModel):
+    coverage: Optional[float] = None  # % of the job description's skills found, None without one
+    matches: List[SkillHit] = []
+    gaps: List[SkillGap] = []
+    other_skills: List[str] = []
 
 class AnalysisResponse(BaseModel):
     analysis: str
+    cached: bool = False  # served from the resume analysis cache
+    skills: Optional[SkillMatchOut] = None
 
 class CodingProfileOut(BaseModel):
     platform: str
@@ -102,343 +181,214 @@ class ChatMessage(BaseModel):
     ai_response: str
     created_at: str
     session_id: str | None = None
+    truncated: bool = False  # True when user_message/ai_response are previews
 
 class ChatHistoryResponse(BaseModel):
     messages: List[ChatMessage]
+    next_cursor: Optional[str] = None  # Pass as ?cursor= to load older messages
+    has_more: bool = False
 
-def extract_text(pdf_bytes: bytes) -> str:
-    try:
-        # Use PyMuPDF (Fitz) to extract text
-        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-        text = ""
-        for page in doc:
-            text += page.get_text("text")
-        
-        if text.strip():
-            return text
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Error extracting text from the resume: {str(e)}")
-    return ""
+CHAT_HISTORY_MAX_PAGE = 200
+
+ANALYZE_MODES = ("full", "fast")
 
 @app.post("/analyze", response_model=AnalysisResponse)
 async def analyze_resume(
+    request: Request,
+    background_tasks: BackgroundTasks,
     resume: UploadFile = File(...),
-    job_description: str = Form("")
+    job_description: str = Form(""),
+    mode: str = Form("full"),  # "fast" = local skill match only, no LLM call
+    db: AsyncSession = Depends(get_async_db)
 ):
-    pdf_bytes = await resume.read()
-    resume_text = extract_text(pdf_bytes)
+    if mode not in ANALYZE_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of: {', '.join(ANALYZE_MODES)}")
+    pdf_bytes = await read_upload(resume)
+    pdf_sha256 = sha256_hex(pdf_bytes)
+    jd_sha256 = job_description_hash(job_description)
+
+    resume_text = await get_cached_text(db, pdf_sha256)
+    if resume_text is None:
+        extracted = await extract_pdf_text(pdf_bytes, db)
+        resume_text = extracted.text
+        if resume_text.strip():
+            await store_text(db, pdf_sha256, resume_text, extracted.page_count)
     
     if not resume_text.strip():
         raise HTTPException(status_code=400, detail="Could not extract text from the resume. Please upload a valid document.")
+
+    # Deterministic skill match (milliseconds); the whole answer in fast mode
+    match = match_skills(resume_text, job_description)
+    if mode == "fast":
+        return {"analysis": match.report(), "skills": match.to_dict()}
+
+    # Same resume against the same job description: reuse the earlier analysis
+    cached_analysis = await get_cached_analysis(db, pdf_sha256, jd_sha256)
+    if cached_analysis is not None:
+        logger.info(f"Resume analysis cache hit for {pdf_sha256[:12]}")
+        return {"analysis": cached_analysis, "cached": True, "skills": match.to_dict()}
     
-    model = genai.GenerativeModel("gemini-1.5-flash")
-    
-    additional_text = ""
-    if job_description:
-        additional_text = f"""
-        Additionally, compare this resume with the following job description and highlight specific matches and gaps:
-        
-        Job Description:
-        {job_description}
-        """
-    
-    prompt = f"""
-    You are an experienced HR with technical expertise in roles such as Data Science, Data Analysis, DevOps, 
-    Machine Learning Engineering, Prompt Engineering, AI Engineering, Full Stack Web Development, 
-    Big Data Engineering, Marketing Analysis, Human Resource Management, and Software Development.
-    
-    Your task is to analyze the following resume:
-    
-    Resume:
-    {resume_text}
+    prompt = build_analysis_prompt(resume_text, job_description, match)
+    logger.info(f"Resume analysis prompt: ~{estimate_tokens(prompt)} tokens")
     
-    Please provide a structured evaluation covering:
-    - Overall alignment with common industry roles
-    - Strengths and weaknesses of the candidate
-    - Key skills they already have
-    - Skills they should improve or acquire
-    - Recommended courses to enhance their profile
-    {additional_text}
+    # Unauthenticated endpoint, so the per-caller limit is keyed on the client address
+    caller = f"ip:{request.client.host if request.client else 'unknown'}"
+    response = await llm.generate("analysis", prompt, caller, label="Resume analysis")
+    analysis = response.text.strip()
+
+    await store_analysis(db, pdf_sha256, jd_sha256, analysis)
+    background_tasks.add_task(evict_resume_cache)
+    return {"analysis": analysis, "cached": False, "skills": match.to_dict()}
+
+@app.post("/analyze/batch")
+async def analyze_resume_batch(
+    resumes: List[UploadFile] = File(...),  # PDFs and/or zips of PDFs
+    job_description: str = Form(...),
+    reports: int = Form(0),  # LLM reports for this many top-ranked resumes
+    clerk_id: str = Depends(get_current_user_clerk_id)
+):
+    """Screen many resumes against one job description.
+
+    Streams NDJSON: an `extracted` line per resume as it is processed, then
+    `result` lines in rank order (skill coverage, matches, gaps), then
+    `report` lines if requested, and a final `done` line.
     """
-    
-    response = model.generate_content(prompt)
-    return {"analysis": response.text.strip()}
-
-
-model = genai.GenerativeModel(
-    'gemini-1.5-flash',
-    system_instruction=(
-        "You are a personalized coding career assistant that provides tailored recommendations based on user data. "
-        "You'll receive information about the user's coding profiles (LeetCode, GitHub, CodeChef, Codeforces) and "
-        "their stats whenever available. Use this information to personalize your responses for:\n\n"
-        "1. Code generation in languages the user is familiar with\n"
-        "2. Career advice and learning paths tailored to their experience level\n"
-        "3. Practice problems that match their current skill level\n"
-        "4. Project ideas that build on their strengths\n\n"
-        "IMPORTANT FORMATTING GUIDELINES:\n\n"
-        "- Always address the user by their username in a conversational tone\n"
-        "- Use clear section titles followed by TWO line breaks\n"
-        "- Present information in concise paragraphs with THREE line breaks between sections\n"
-        "- For lists, use clear numbered format with each item on its own line and TWO line breaks between items\n"
-        "- When recommending resources, include specific details for easy access:\n"
-        "  * For LeetCode questions: Include full problem name AND problem number (e.g., 'Two Sum - Problem 1')\n"
-        "  * For courses/tutorials: Include full course name AND platform/provider (e.g., 'Advanced Python - Coursera')\n"
-        "  * For concepts: Include specific search terms (e.g., 'Python asyncio programming - official documentation')\n"
-        "- Ensure EXTRA spacing between different sections and ideas\n"
-        "- Use bullet points (•) for unordered lists with TWO line breaks between items\n"
-        "- Keep content well-structured with ample white space"
-    )
-)
+    if not job_description.strip():
+        raise HTTPException(status_code=400, detail="A job description is required for batch screening")
+    batch = await collect_resumes(resumes)
+    if reports > 0:
+        llm.check_capacity()  # reject with 429 before the stream starts
+    return ndjson_response(screen_resumes(batch, job_description, clerk_id, reports))
 
 class Message(BaseModel):
     content: str
 
-def format_ai_response(response_text):
+class PreparedChat(NamedTuple):
+    username: str
+    prompt: str
+    session_id: str
+    session_summary: Optional[str]
+
+async def prepare_chat(db: AsyncSession, clerk_id: str, content: str) -> PreparedChat:
+    """Build the prompt for a chat turn and work out which session it belongs to"""
+    # Cached profile snapshot (rebuilt only after profile/settings changes)
+    user_context = await get_user_context(db, clerk_id)
+    if not user_context:
+        raise HTTPException(status_code=404, detail="User not found")
+    username = user_context.username
+    
+    # Latest turn plus the rolling summary of its session (one query)
+    last_turn = (await db.execute(
+        select(
+            ChatHistory.user_message,
+            ChatHistory.ai_response,
+            ChatHistory.session_id,
+            ChatHistory.created_at,
+            ChatSession.summary
+        )
+        .outerjoin(ChatSession, and_(
+            ChatSession.clerk_id == ChatHistory.clerk_id,
+            ChatSession.session_id == ChatHistory.session_id
+        ))
+        .where(ChatHistory.clerk_id == clerk_id)
+        .order_by(ChatHistory.created_at.desc())
+        .limit(1)
+    )).first()
+
+    # Continue the session if the last message was within 1 hour, otherwise start a new one
+    now = datetime.now(timezone.utc)
+    session_id = f"session_{int(now.timestamp())}"
+    conversation_context = ""
+    session_summary = None
+    last_time = last_turn and last_turn.created_at
+    if last_time and last_time.tzinfo is None:
+        last_time = last_time.replace(tzinfo=timezone.utc)  # SQLite drops the offset
+    if last_turn and (now - last_time).total_seconds() < 3600:
+        session_id = last_turn.session_id or f"session_{int(last_time.timestamp())}"
+        conversation_context = build_memory_context(last_turn.summary, last_turn.user_message, last_turn.ai_response)
+        # The previous turn moves into the summary once this one is stored
+        session_summary = fold_turn(last_turn.summary, last_turn.user_message, last_turn.ai_response)
+
+    # Build personalized prompt
+    personalized_context = f"""
+    I'm helping {username} with their coding journey. Here's what I know about them:
     """
-    Format the AI response by removing markdown symbols and making the text 
-    more reader-friendly while preserving structure and adding appropriate spacing.
-    Convert links to plain text references.
+    personalized_context += user_context.describe_profiles()
+
+    personalized_context += f"""
+
+
+    I'll provide a well-structured, personalized response to {username}'s query below.
+
+
+    IMPORTANT FORMATTING:
+
+    - I'll use clear section titles with TWO line breaks after each
+
+    - I'll ensure THREE line breaks between sections and paragraphs
+
+    - For any lists, I'll put each item on its own line with TWO line breaks between items
+
+    - When recommending resources, I'll include specific details for easy access:
+      * For LeetCode questions: Full problem name AND problem number (e.g., "Two Sum - Problem 1")
+      * For courses/tutorials: Full course name AND platform/provider (e.g., "Advanced Python - Coursera")
+      * For concepts: Specific search terms (e.g., "Python asyncio programming - official documentation")
+
+    - I'll use bullet points (•) for unordered lists with proper spacing
+
+    - I'll be conversational and friendly, addressing them by name
+
+    - I'll maintain ample white space throughout the entire response
     """
-    # Convert markdown links to plain text references
-    def link_to_text(match):
-        link_text = match.group(1)
-        link_url = match.group(2)
-        
-        # For LeetCode problems, extract problem name and number
-        if 'leetcode.com/problems' in link_url:
-            problem_slug = link_url.split('/')[-2]
-            return f"{link_text} (LeetCode: {problem_slug})"
-        
-        # For GitHub repos
-        elif 'github.com' in link_url:
-            return f"{link_text} (GitHub)"
-        
-        # For other URLs, just keep the text without the URL
-        else:
-            return f"{link_text}"
-    
-    # Replace links with text-only versions
-    processed_text = re.sub(r'\[([^\]]+)\]\(([^)]+)\)', link_to_text, response_text)
-    
-    # Replace headings with capitalized versions and add spacing
-    def heading_replacer(match):
-        level = len(match.group(1))
-        title = match.group(2).strip().upper() if level <= 2 else match.group(2).strip()
-        # Add extra newline before headings
-        return f"\n\n\n{title}\n\n"
-    
-    formatted_text = re.sub(r'^(#{1,6})\s+(.*?)$', heading_replacer, processed_text, flags=re.MULTILINE)
-    
-    # Remove bullet points (* or -) at the start of lines while preserving indentation
-    formatted_text = re.sub(r'^(\s*)(\*|-)\s+', r'\1• ', formatted_text, flags=re.MULTILINE)
-    
-    # Remove bold/italic markers (**, *) around words
-    formatted_text = re.sub(r'(\*{1,2})([^*]+?)(\*{1,2})', r'\2', formatted_text)
-    
-    # Convert numbered list items to clean format while preserving numbers and adding space before items
-    def list_item_replacer(match):
-        indent = match.group(1)
-        number = match.group(2)
-        return f"\n\n{indent}{number}. "
-    
-    formatted_text = re.sub(r'^(\s*)(\d+)\.\s+', list_item_replacer, formatted_text, flags=re.MULTILINE)
-    
-    # Remove backticks for inline code (except for code blocks)
-    formatted_text = re.sub(r'(?<!`)`([^`]+?)`(?!`)', r'\1', formatted_text)
-    
-    # Remove underscores used for emphasis
-    formatted_text = re.sub(r'_(.*?)_', r'\1', formatted_text)
-    
-    # Add spacing after bullet points for better readability
-    formatted_text = re.sub(r'^([\s]*)(•)(\s*)', r'\n\n\1\2 ', formatted_text, flags=re.MULTILINE)
-    
-    # Add spacing between paragraphs (sentences that end with period and are followed by a new sentence)
-    formatted_text = re.sub(r'(\.\s)([A-Z])', r'.\n\n\2', formatted_text)
-    
-    # Convert multiple newlines to just two (create paragraphs)
-    formatted_text = re.sub(r'\n{4,}', '\n\n\n', formatted_text)
-    
-    # Remove trailing whitespace in each line
-    formatted_text = re.sub(r'\s+$', '', formatted_text, flags=re.MULTILINE)
-    
-    # Add extra spacing around code blocks
-    formatted_text = re.sub(r'(```[^`]*```)', r'\n\n\1\n\n', formatted_text)
-    
-    # Ensure each list item is followed by extra newlines
-    formatted_text = re.sub(r'(\d+\.\s.*?)(\n)(\d+\.)', r'\1\n\n\n\3', formatted_text)
-    
-    # Ensure there's extra spacing after colons in section titles
-    formatted_text = re.sub(r'([A-Z][A-Z\s]+):', r'\1:\n\n', formatted_text)
-    
-    # Clean up excessive newlines
-    formatted_text = re.sub(r'\n{5,}', '\n\n\n\n', formatted_text)
-    
-    # Ensure the text starts without leading newlines
-    formatted_text = formatted_text.lstrip('\n')
-    
-    # Add extra spacing between bullet points
-    formatted_text = re.sub(r'(•.*?)(\n)(•)', r'\1\n\n\3', formatted_text)
-    
-    return formatted_text
+
+    # Combine personalized context with conversation history and user query
+    enhanced_prompt = f"{personalized_context}{conversation_context}\n\nCurrent Query: {content}"
+
+    logger.info(
+        f"Enhanced prompt with user data for {username}: "
+        f"~{estimate_tokens(enhanced_prompt)} tokens (conversation memory ~{estimate_tokens(conversation_context)})"
+    )
+    return PreparedChat(username, enhanced_prompt, session_id, session_summary)
+
+async def save_chat_turn(db: AsyncSession, clerk_id: str, chat: PreparedChat, content: str, formatted_response: str) -> None:
+    """Store a finished turn; failures are logged, not raised"""
+    try:
+        created_at = datetime.now(timezone.utc)
+        chat_record = ChatHistory(
+            clerk_id=clerk_id,
+            user_message=content,
+            ai_response=formatted_response,
+            session_id=chat.session_id,
+            created_at=created_at
+        )
+        db.add(chat_record)
+        await db.flush()
+        await index_chat_message(db, chat_record)
+        await record_chat_turn(db, clerk_id, chat.session_id, content, created_at, chat.session_summary)
+        await db.commit()
+        mark_write(clerk_id)
+        publish(clerk_id, "chat_session", {"session_id": chat.session_id, "last_message_at": created_at.isoformat()})
+        logger.info(f"Saved chat history for user {chat.username} with session {chat.session_id}")
+    except Exception as e:
+        logger.error(f"Failed to save chat history: {str(e)}")
+        # Don't fail the request if saving history fails
+        await db.rollback()
 
 @app.post("/chat")
+@query_budget(9)
 async def chat_endpoint(
     message: Message,
     clerk_id: str = Depends(get_current_user_clerk_id),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     try:
-        # Fetch user data from database
-        db_user = db.query(DBUser).filter(DBUser.clerk_id == clerk_id).first()
-        if not db_user:
-            raise HTTPException(status_code=404, detail="User not found")
-        
-        # Get user's platform usernames and other relevant data
-        user_data = {
-            "username": db_user.username or "user",
-            "leetcode_username": db_user.leetcode_username,
-            "github_username": db_user.github_username,
-            "codechef_username": db_user.codechef_username,
-            "codeforces_username": db_user.codeforces_username,
-        }
-        
-        # Get user's coding profiles for more detailed data
-        if hasattr(db_user, 'coding_profiles') and db_user.coding_profiles:
-            platform_stats = {}
-            for profile in db_user.coding_profiles:
-                if profile.platform == "leetcode":
-                    platform_stats["leetcode"] = {
-                        "total_solved": profile.total_problems_solved,
-                        "easy_solved": profile.easy_solved,
-                        "medium_solved": profile.medium_solved,
-                        "hard_solved": profile.hard_solved
-                    }
-                elif profile.platform == "github":
-                    platform_stats["github"] = {
-                        "total_contributions": profile.total_contributions,
-                        "languages": profile.languages
-                    }
-                elif profile.platform == "codechef":
-                    platform_stats["codechef"] = {
-                        "rating": profile.current_rating,
-                        "stars": profile.stars
-                    }
-                elif profile.platform == "codeforces":
-                    platform_stats["codeforces"] = {
-                        "rating": profile.codeforces_rating,
-                        "problems_solved": profile.problems_solved_count
-                    }
-            user_data["platform_stats"] = platform_stats
-        
-        # Get recent chat history (last 10 messages for context)
-        recent_history = db.query(ChatHistory).filter(
-            ChatHistory.clerk_id == clerk_id
-        ).order_by(ChatHistory.created_at.desc()).limit(10).all()
-        
-        # Build conversation context
-        conversation_context = ""
-        if recent_history:
-            conversation_context = "\n\nRECENT CONVERSATION HISTORY:\n"
-            for msg in reversed(recent_history[-5:]):  # Last 5 messages for context
-                conversation_context += f"User: {msg.user_message}\n"
-                conversation_context += f"Assistant: {msg.ai_response}\n\n"
-        
-        # Build personalized prompt
-        personalized_context = f"""
-        I'm helping {user_data['username']} with their coding journey. Here's what I know about them:
-        """
-        
-        if user_data.get("leetcode_username"):
-            personalized_context += f"\n- LeetCode: {user_data['leetcode_username']}"
-            if "platform_stats" in user_data and "leetcode" in user_data["platform_stats"]:
-                stats = user_data["platform_stats"]["leetcode"]
-                personalized_context += f" (Solved: {stats.get('total_solved', 'N/A')} problems)"
-        
-        if user_data.get("github_username"):
-            personalized_context += f"\n- GitHub: {user_data['github_username']}"
-            if "platform_stats" in user_data and "github" in user_data["platform_stats"]:
-                stats = user_data["platform_stats"]["github"]
-                personalized_context += f" (Contributions: {stats.get('total_contributions', 'N/A')})"
-                if stats.get("languages"):
-                    top_languages = ", ".join([f"{lang}" for lang, _ in list(stats.get("languages", {}).items())[:3]])
-                    personalized_context += f"\n  Top languages: {top_languages}"
-        
-        if user_data.get("codechef_username"):
-            personalized_context += f"\n- CodeChef: {user_data['codechef_username']}"
-            if "platform_stats" in user_data and "codechef" in user_data["platform_stats"]:
-                stats = user_data["platform_stats"]["codechef"]
-                personalized_context += f" (Rating: {stats.get('rating', 'N/A')}, Stars: {stats.get('stars', 'N/A')})"
-        
-        if user_data.get("codeforces_username"):
-            personalized_context += f"\n- Codeforces: {user_data['codeforces_username']}"
-            if "platform_stats" in user_data and "codeforces" in user_data["platform_stats"]:
-                stats = user_data["platform_stats"]["codeforces"]
-                personalized_context += f" (Rating: {stats.get('rating', 'N/A')})"
-        
-        personalized_context += f"""
-        
-        
-        I'll provide a well-structured, personalized response to {user_data['username']}'s query below.
-        
-        
-        IMPORTANT FORMATTING:
-        
-        - I'll use clear section titles with TWO line breaks after each
-        
-        - I'll ensure THREE line breaks between sections and paragraphs
-        
-        - For any lists, I'll put each item on its own line with TWO line breaks between items
-        
-        - When recommending resources, I'll include specific details for easy access:
-          * For LeetCode questions: Full problem name AND problem number (e.g., "Two Sum - Problem 1")
-          * For courses/tutorials: Full course name AND platform/provider (e.g., "Advanced Python - Coursera")
-          * For concepts: Specific search terms (e.g., "Python asyncio programming - official documentation")
-        
-        - I'll use bullet points (•) for unordered lists with proper spacing
-        
-        - I'll be conversational and friendly, addressing them by name
-        
-        - I'll maintain ample white space throughout the entire response
-        """
-        
-        # Combine personalized context with conversation history and user query
-        enhanced_prompt = f"{personalized_context}{conversation_context}\n\nCurrent Query: {message.content}"
-        
-        logger.info(f"Enhanced prompt with user data for {user_data['username']}")
-        response = model.generate_content(enhanced_prompt)
+        chat = await prepare_chat(db, clerk_id, message.content)
+        response = await llm.generate("chat", chat.prompt, clerk_id, label=f"Chat for {chat.username}")
         
         # Format the response to remove markdown symbols at the beginning of lines
         formatted_response = format_ai_response(response.text)
         
-        # Generate session ID (use current timestamp if no recent session)
-        session_id = None
-        if recent_history:
-            # Check if the last message was within 1 hour
-            last_message_time = recent_history[0].created_at
-            time_diff = datetime.now(timezone.utc) - last_message_time
-            if time_diff.total_seconds() < 3600:  # 1 hour
-                session_id = recent_history[0].session_id or f"session_{int(last_message_time.timestamp())}"
-            else:
-                session_id = f"session_{int(datetime.now(timezone.utc).timestamp())}"
-        else:
-            session_id = f"session_{int(datetime.now(timezone.utc).timestamp())}"
-
-        # Save the conversation to database
-        try:
-            chat_record = ChatHistory(
-                clerk_id=clerk_id,
-                user_message=message.content,
-                ai_response=formatted_response,
-                session_id=session_id
-            )
-            db.add(chat_record)
-            db.commit()
-            logger.info(f"Saved chat history for user {user_data['username']} with session {session_id}")
-        except Exception as e:
-            logger.error(f"Failed to save chat history: {str(e)}")
-            # Don't fail the request if saving history fails
-            db.rollback()
-        
+        await save_chat_turn(db, clerk_id, chat, message.content, formatted_response)
         return {"content": formatted_response}
     except HTTPException as e:
         raise e
@@ -449,32 +399,116 @@ async def chat_endpoint(
             detail=f"Gemini API Error: {str(e)}"
         )
 
+@app.post("/chat/stream")
+@query_budget(3)
+async def chat_stream_endpoint(
+    message: Message,
+    clerk_id: str = Depends(get_current_user_clerk_id),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Streaming /chat: server-sent `chunk` events, then `done` with the stored response"""
+    chat = await prepare_chat(db, clerk_id, message.content)
+    llm.check_capacity()  # reject with 429 before the stream starts
+    
+    async def events():
+        label = f"Chat stream for {chat.username}"
+        stream = LLMStream(llm.stream("chat", chat.prompt, clerk_id, label), label)
+        try:
+            # Closed even when the client disconnects mid-stream, which releases the LLM slot
+            async with aclosing(stream.chunks()) as chunks:
+                async for text in chunks:
+                    yield sse_event("chunk", {"text": text})
+        except Exception as e:
+            logger.error(f"Gemini API Error: {str(e)}")
+            yield sse_event("error", {"detail": f"Gemini API Error: {str(e)}"})
+            return
+        formatted_response = format_ai_response(stream.text)
+        # The request's session may already be closed once the body streams
+        async with AsyncSessionLocal() as session:
+            await save_chat_turn(session, clerk_id, chat, message.content, formatted_response)
+        yield sse_event("done", {"content": formatted_response, "time_to_first_token_ms": stream.first_token_ms})
+    
+    return sse_response(events())
+
 @app.get("/api/chat/history", response_model=ChatHistoryResponse, tags=["Chat"])
+@query_budget(1)
 async def get_chat_history(
     clerk_id: str = Depends(get_current_user_clerk_id),
-    db: Session = Depends(get_db),
-    limit: int = 50
+    db: AsyncSession = Depends(get_read_db),
+    limit: int = Query(50, ge=1, le=CHAT_HISTORY_MAX_PAGE),
+    cursor: Optional[str] = None,
+    session_id: Optional[str] = None,
+    preview: bool = False,
+    preview_chars: int = Query(200, ge=20, le=2000)
 ):
-    """Get chat history for the current user"""
+    """Get chat history for the current user, newest page first.
+
+    Pages are keyset-paginated over idx_clerk_created: pass next_cursor back as
+    cursor to fetch older messages. With preview=true both texts are truncated
+    in SQL to preview_chars; fetch /api/chat/history/{id} for the full message.
+    session_id limits the page to one session (see /api/chat/sessions).
+    """
     try:
-        # Fetch chat history for the user, ordered by most recent first
-        chat_messages = db.query(ChatHistory).filter(
-            ChatHistory.clerk_id == clerk_id
-        ).order_by(ChatHistory.created_at.desc()).limit(limit).all()
-        
+        if preview:
+            # Take one extra character so "was it truncated" needs no full length()
+            user_col = func.substr(ChatHistory.user_message, 1, preview_chars + 1)
+            ai_col = func.substr(ChatHistory.ai_response, 1, preview_chars + 1)
+        else:
+            user_col = ChatHistory.user_message
+            ai_col = ChatHistory.ai_response
+
+        query = (
+            select(
+                ChatHistory.id,
+                ChatHistory.created_at,
+                ChatHistory.session_id,
+                user_col.label("user_message"),
+                ai_col.label("ai_response")
+            )
+            .where(ChatHistory.clerk_id == clerk_id)
+        )
+        if session_id:
+            query = query.where(ChatHistory.session_id == session_id)
+        if cursor:
+            cursor_created_at, cursor_id = decode_cursor(cursor)
+            # Expanded row comparison so the created_at bound is an index range
+            query = query.where(
+                ChatHistory.created_at <= cursor_created_at,
+                or_(
+                    ChatHistory.created_at < cursor_created_at,
+                    ChatHistory.id < cursor_id
+                )
+            )
+
+        # Fetch one extra row to know whether an older page exists
+        rows = (await db.execute(
+            query.order_by(ChatHistory.created_at.desc(), ChatHistory.id.desc()).limit(limit + 1)
+        )).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
         # Convert to response format
         messages = []
-        for msg in reversed(chat_messages):  # Reverse to get chronological order
+        for row in reversed(rows):  # Reverse to get chronological order
+            user_message, ai_response, truncated = row.user_message, row.ai_response, False
+            if preview:
+                truncated = len(user_message) > preview_chars or len(ai_response) > preview_chars
+                user_message = user_message[:preview_chars]
+                ai_response = ai_response[:preview_chars]
             messages.append(ChatMessage(
-                id=msg.id,
-                user_message=msg.user_message,
-                ai_response=msg.ai_response,
-                created_at=msg.created_at.isoformat(),
-                session_id=msg.session_id
+                id=row.id,
+                user_message=user_message,
+                ai_response=ai_response,
+                created_at=row.created_at.isoformat(),
+                session_id=row.session_id,
+                truncated=truncated
             ))
-        
-        return ChatHistoryResponse(messages=messages)
-        
+
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None
+        return ChatHistoryResponse(messages=messages, next_cursor=next_cursor, has_more=has_more)
+
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching chat history: {str(e)}")
         raise HTTPException(
@@ -482,6 +516,27 @@ async def get_chat_history(
             detail=f"Failed to fetch chat history: {str(e)}"
         )
 
+@app.get("/api/chat/history/{message_id}", response_model=ChatMessage, tags=["Chat"])
+@query_budget(1)
+async def get_chat_message(
+    message_id: int,
+    clerk_id: str = Depends(get_current_user_clerk_id),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Fetch one full chat message (e.g. after a preview page)"""
+    msg = (await db.execute(
+        select(ChatHistory).where(ChatHistory.id == message_id, ChatHistory.clerk_id == clerk_id)
+    )).scalar_one_or_none()
+    if not msg:
+        raise HTTPException(status_code=404, detail="Chat message not found")
+    return ChatMessage(
+        id=msg.id,
+        user_message=msg.user_message,
+        ai_response=msg.ai_response,
+        created_at=msg.created_at.isoformat(),
+        session_id=msg.session_id
+    )
+
 def get_db():
     db = SessionLocal()
     try:
@@ -491,44 +546,53 @@ def get_db():
 
 @app.put("/api/settings", response_model=UserResponse, tags=["User Settings"])
 @app.post("/api/settings", response_model=UserResponse, tags=["User Settings"])
+@query_budget(7)
 async def update_settings(
     user_data: UserUpdate,
+    background_tasks: BackgroundTasks,
     clerk_id: str = Depends(get_current_user_clerk_id),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update user settings and platform usernames"""
     try:
         logger.info(f"Updating settings for user: {clerk_id}")
         logger.info(f"Received data: {user_data}")
 
-        db_user = db.query(DBUser).filter(DBUser.clerk_id == clerk_id).first()
+        db_user = (await db.execute(select_user(clerk_id))).scalar_one_or_none()
 
         if not db_user:
             logger.info(f"Creating new user record for {clerk_id}")
             db_user = DBUser(clerk_id=clerk_id)
             db.add(db_user)
-            db.commit()
-            db.refresh(db_user)
+            await db.commit()
 
         update_fields = user_data.dict(exclude_unset=True)
         for field, value in update_fields.items():
             if hasattr(db_user, field):
                 setattr(db_user, field, value)
 
-        db.commit()
-        db.refresh(db_user)
+        await db.commit()
+        mark_write(clerk_id)
+        invalidate_user_context(clerk_id)
+        background_tasks.add_task(rebuild_dashboard_document, clerk_id)
+        # Re-select so server-side timestamps and profiles are loaded for serialization
+        db_user = (await db.execute(
+            select_user(clerk_id).execution_options(populate_existing=True)
+        )).scalar_one()
         return db_user
 
     except Exception as e:
         logger.error(f"Error updating settings: {e}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to update settings"
         )
 
 @app.post("/api/settings/profile-picture", response_model=UserResponse, tags=["User Settings"])
+@query_budget(5)
 async def upload_profile_picture(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     clerk_id: str = Depends(get_current_user_clerk_id),
     db: Session = Depends(get_db)
@@ -545,7 +609,11 @@ async def upload_profile_picture(
         placeholder_url = f"https://example.com/profiles/{clerk_id}_{file.filename}.jpg" # Include clerk_id for uniqueness
         db_user.profile_picture = placeholder_url 
         db.commit()
-        db.refresh(db_user)
+        mark_write(clerk_id)
+        background_tasks.add_task(rebuild_dashboard_document, clerk_id)
+        # Reload with the UserResponse loaders instead of refresh(), which would
+        # leave languages deferred and cost one SELECT per profile
+        db_user = db.query(DBUser).options(*USER_RESPONSE_LOADERS).populate_existing().filter(DBUser.clerk_id == clerk_id).one()
         return db_user # Return the updated user object from DB
 
     except HTTPException as e:
@@ -560,6 +628,7 @@ async def upload_profile_picture(
 
 # Include platform routes
 app.include_router(platform_router, prefix="/api", tags=["Platforms"])
+app.include_router(chat_router, prefix="/api")
 
 # Add a Pydantic model for the sync request body
 class UserSyncRequest(BaseModel):
@@ -569,8 +638,10 @@ class UserSyncRequest(BaseModel):
 
 # Endpoint for syncing user data from Clerk
 @app.post("/users/sync", response_model=UserResponse, tags=["Users"])
+@query_budget(5)
 async def sync_user(
     sync_data: UserSyncRequest,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
     # Note: No auth dependency here as this might be called by Clerk webhooks or frontend right after signup/signin
     # before a session token is fully established or if the request needs to be unauthenticated initially.
@@ -612,7 +683,10 @@ async def sync_user(
             db.add(db_user)
 
         db.commit()
-        db.refresh(db_user)
+        mark_write(sync_data.clerk_id)
+        invalidate_user_context(sync_data.clerk_id)
+        background_tasks.add_task(rebuild_dashboard_document, sync_data.clerk_id)
+        db_user = db.query(DBUser).options(*USER_RESPONSE_LOADERS).populate_existing().filter(DBUser.clerk_id == sync_data.clerk_id).one()
         logger.info(f"User sync successful for Clerk ID: {sync_data.clerk_id}")
         return db_user
 
@@ -652,14 +726,52 @@ async def health_check(db: Session = Depends(get_db)):
             detail=f"Database connection failed: {str(e)}"
         )
 
+# Readiness is cached once the schema check has passed; the DB ping always runs
+_schema_ready: Optional[bool] = None
+
+@app.get("/llm/status")
+async def llm_status():
+    """LLM gateway load, latency percentiles and token usage for this worker"""
+    return llm.status()
+
+@app.get("/ready")
+async def readiness_probe():
+    """Readiness probe: database reachable and (optionally) schema at the Alembic head"""
+    global _schema_ready
+    checks = {"database": await asyncio.to_thread(check_db_health)}
+
+    if SCHEMA_CHECK == "alembic" and checks["database"]:
+        if not _schema_ready:
+            _schema_ready, message = await asyncio.to_thread(check_schema_revision)
+            checks["schema_message"] = message
+        checks["schema"] = _schema_ready
+
+    ready = checks["database"] and checks.get("schema", True)
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"ready": ready, **checks}
+    )
+
 # NEW Endpoint to get current user data from DB
+async def user_etag(db: AsyncSession, clerk_id: str, endpoint: str) -> Optional[str]:
+    """ETag for a user-derived response, from one lightweight version query"""
+    version = (await db.execute(select_user_version(clerk_id))).first()
+    return make_etag(endpoint, clerk_id, *version) if version else None
+
 @app.get("/api/users/me", response_model=UserResponse, tags=["Users"])
+@query_budget(3)  # 1 when answered with 304
 async def get_current_db_user(
+    request: Request,
+    response: Response,
     clerk_id: str = Depends(get_current_user_clerk_id),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Fetch the current user's data stored in the application database."""
-    db_user = db.query(DBUser).filter(DBUser.clerk_id == clerk_id).first()
+    etag = await user_etag(db, clerk_id, "users/me")
+    cached = conditional(request, etag, CACHE_PROFILE, response) if etag else None
+    if cached:
+        return cached
+    db_user = (await db.execute(select_user(clerk_id))).scalar_one_or_none()
     if not db_user:
         # Optionally create user if not found, or just return 404
         logger.warning(f"User record not found in DB for clerk_id: {clerk_id}. Consider syncing.")
@@ -667,11 +779,18 @@ async def get_current_db_user(
     return db_user # Automatically serialized by UserResponse
 
 @app.get("/api/analysis-data", response_model=UserAnalysisOut, tags=["Analysis"])
+@query_budget(3)  # 1 when answered with 304
 async def get_analysis_data(
+    request: Request,
+    response: Response,
     clerk_id: str = Depends(get_current_user_clerk_id),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    db_user = db.query(DBUser).filter(DBUser.clerk_id == clerk_id).first()
+    etag = await user_etag(db, clerk_id, "analysis-data")
+    cached = conditional(request, etag, CACHE_PROFILE, response) if etag else None
+    if cached:
+        return cached
+    db_user = (await db.execute(select_user(clerk_id, ANALYSIS_LOADERS))).scalar_one_or_none()
     if not db_user:
         raise HTTPException(404, "User not found")
     profiles = []
@@ -692,154 +811,200 @@ async def get_analysis_data(
         profiles=profiles
     )
 
+@app.get("/api/history/{platform}", tags=["Analysis"])
+@query_budget(1)
+async def get_profile_history(
+    platform: str,
+    clerk_id: str = Depends(get_current_user_clerk_id),
+    db: AsyncSession = Depends(get_read_db),
+    metrics: Optional[str] = Query(None, description="Comma-separated metrics, default all tracked for the platform"),
+    bucket: str = Query("day", pattern="^(day|week|month)$"),
+    since: Optional[datetime] = Query(None, description="Default: 90 days before until"),
+    until: Optional[datetime] = Query(None, description="Default: now")
+):
+    """Progress-over-time series for one platform, downsampled to the last value per bucket"""
+    tracked = TRACKED_METRICS.get(platform)
+    if tracked is None:
+        raise HTTPException(status_code=404, detail=f"Unknown platform {platform}")
+    selected = [m.strip() for m in metrics.split(",") if m.strip()] if metrics else list(tracked)
+    unknown = [m for m in selected if m not in tracked]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown {platform} metrics: {', '.join(unknown)}. Tracked: {', '.join(tracked)}")
+    until = until or datetime.now(timezone.utc)
+    if until.tzinfo is None:
+        until = until.replace(tzinfo=timezone.utc)
+    since = since or until - timedelta(days=90)
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    if since > until:
+        raise HTTPException(status_code=400, detail="since must be before until")
+    return await profile_history(db, clerk_id, platform, selected, bucket, since, until)
+
+@app.get("/api/query", tags=["Dashboard"])
+@query_budget(3)  # one SELECT per requested resource
+async def query_user_data(
+    clerk_id: str = Depends(get_current_user_clerk_id),
+    db: AsyncSession = Depends(get_read_db),
+    user_fields: Optional[str] = Query(None, alias="fields[user]", description=f"Any of {', '.join(USER_FIELDS)}, or *"),
+    profile_fields: Optional[str] = Query(None, alias="fields[profiles]", description=f"Any of {', '.join(PROFILE_FIELDS)}, or *"),
+    session_fields: Optional[str] = Query(None, alias="fields[sessions]", description=f"Any of {', '.join(SESSION_FIELDS)}, or *"),
+    platforms: Optional[str] = Query(None, description="Only these profiles, e.g. leetcode,codeforces"),
+    sessions_limit: int = Query(20, ge=1, le=CHAT_SESSIONS_MAX_PAGE)
+):
+    """Only the requested fields of the user, their coding profiles and chat sessions, in one response.
+
+    e.g. /api/query?fields[user]=username&fields[profiles]=platform,current_rating
+    Deferred columns such as languages are only loaded when they are requested.
+    """
+    return await query_fields(
+        db,
+        clerk_id,
+        parse_fields(user_fields, USER_FIELDS, "user"),
+        parse_fields(profile_fields, PROFILE_FIELDS, "profiles"),
+        parse_fields(session_fields, SESSION_FIELDS, "sessions"),
+        platforms=[p.strip() for p in platforms.split(",") if p.strip()] if platforms else None,
+        sessions_limit=sessions_limit
+    )
+
+@app.get("/api/dashboard", tags=["Dashboard"])
+@query_budget(1)  # plus the one-off build when the user has no document yet
+async def get_dashboard(
+    request: Request,
+    clerk_id: str = Depends(get_current_user_clerk_id),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """User, platform stats and analysis data in one pre-built JSON document"""
+    document = (await db.execute(
+        select(DashboardDocument.body, DashboardDocument.etag, DashboardDocument.version)
+        .where(DashboardDocument.clerk_id == clerk_id)
+    )).first()
+    if document is None:
+        async with AsyncSessionLocal() as session:
+            document = await session.run_sync(rebuild_dashboard, clerk_id)
+        if document is None:
+            raise HTTPException(404, "User not found")
+    body, etag, version = document
+    etag = f'"{etag}"'
+    cached = conditional(request, etag, CACHE_DASHBOARD)
+    if cached:
+        return cached
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": CACHE_DASHBOARD, "X-Dashboard-Version": str(version)}
+    )
+
+@app.get("/api/events", tags=["Events"])
+async def user_events(clerk_id: str = Depends(get_current_user_clerk_id)):
+    """Server-sent events when the user's profiles, dashboard, recommendations or chat sessions change.
+
+    Events: ready, profile, dashboard, recommendations, chat_session,
+    codeforces_ratings (new contests stored for the rating chart), and resync
+    (events were dropped, refetch everything). No database session is held
+    while the stream is open.
+    """
+    return sse_response(event_stream(clerk_id))
+
+def build_recommendations_prompt(user_context: UserContext) -> str:
+    username = user_context.username
+    
+    # Build personalized prompt for recommendations
+    personalized_context = f"""
+    Generate personalized coding recommendations for {username}, who has the following coding profiles:
+    """
+    personalized_context += user_context.describe_profiles(detailed=True)
+    if not user_context.has_profiles:
+        personalized_context += "\n- No coding profiles linked yet"
+
+    personalized_context += f"""
+
+
+    Please provide well-spaced, personalized recommendations for {username} in these categories:
+
+
+    SKILL DEVELOPMENT:
+
+    Based on their profiles, suggest 2-3 specific skills or topics they should focus on next. Present each suggestion as a separate paragraph with proper spacing. Include specific resources they can use to learn each skill (name the book, course, or website).
+
+
+    PRACTICE PROBLEMS:
+
+    Suggest 3-5 specific LeetCode problems that match their skill level. List each problem on its own line with TWO line breaks between items. Include the full problem name AND problem number (e.g., "Two Sum - Problem 1").
+
+
+    LEARNING RESOURCES:
+
+    Recommend specific books, courses, or tutorials. Present each recommendation as a distinct paragraph with proper spacing. Include full resource name, author, and platform (e.g., "Clean Code by Robert Martin" or "Advanced Python on Coursera by University of Michigan").
+
+
+    PROJECT IDEAS:
+
+    Suggest 2-3 concrete project ideas. Each project suggestion should be in its own paragraph with THREE line breaks between them. Include key technologies to use and enough details that they could start working on it immediately.
+
+
+    CAREER ADVICE:
+
+    Provide practical career advice based on their current skill set. Use TRIPLE line breaks between different pieces of advice. Be specific about next steps and mention any specific resources by name.
+
+
+    IMPORTANT FORMATTING: 
+    - Use clear section titles with TWO line breaks after each title
+    - Ensure THREE line breaks between sections
+    - For lists, put each item on its own line with TWO line breaks between items
+    - Include detailed references to resources (names, numbers, authors, platforms) directly in the text
+    - Use bullet points (•) for unordered lists with proper spacing
+    - Keep your language conversational and friendly
+    - Maintain ample white space throughout the entire response
+    """
+    return personalized_context
+
 @app.get("/api/recommendations", tags=["Recommendations"])
+@query_budget(5)
 async def get_recommendations(
     clerk_id: str = Depends(get_current_user_clerk_id),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db),
+    force: bool = Query(False, description="Regenerate even if the profile has not changed")
 ):
     """
     Generate personalized recommendations based on user's coding profiles and statistics.
     This endpoint provides tailored suggestions for learning paths, practice problems,
     and career development without requiring user input.
+    
+    Recommendations are stored per user and reused until the profile changes
+    materially (see recommendations.py) or `force=true` is passed.
     """
     try:
-        # Fetch user data from database
-        db_user = db.query(DBUser).filter(DBUser.clerk_id == clerk_id).first()
-        if not db_user:
+        user_context = await get_user_context(db, clerk_id)
+        if not user_context:
             raise HTTPException(status_code=404, detail="User not found")
+        username = user_context.username
         
-        # Get user's platform usernames and other relevant data
-        user_data = {
-            "username": db_user.username or "user",
-            "leetcode_username": db_user.leetcode_username,
-            "github_username": db_user.github_username,
-            "codechef_username": db_user.codechef_username,
-            "codeforces_username": db_user.codeforces_username,
-        }
-        
-        # Get user's coding profiles for more detailed data
-        if hasattr(db_user, 'coding_profiles') and db_user.coding_profiles:
-            platform_stats = {}
-            for profile in db_user.coding_profiles:
-                if profile.platform == "leetcode":
-                    platform_stats["leetcode"] = {
-                        "total_solved": profile.total_problems_solved,
-                        "easy_solved": profile.easy_solved,
-                        "medium_solved": profile.medium_solved,
-                        "hard_solved": profile.hard_solved
-                    }
-                elif profile.platform == "github":
-                    platform_stats["github"] = {
-                        "total_contributions": profile.total_contributions,
-                        "languages": profile.languages
-                    }
-                elif profile.platform == "codechef":
-                    platform_stats["codechef"] = {
-                        "rating": profile.current_rating,
-                        "stars": profile.stars
-                    }
-                elif profile.platform == "codeforces":
-                    platform_stats["codeforces"] = {
-                        "rating": profile.codeforces_rating,
-                        "problems_solved": profile.problems_solved_count
-                    }
-            user_data["platform_stats"] = platform_stats
-        
-        # Build personalized prompt for recommendations
-        personalized_context = f"""
-        Generate personalized coding recommendations for {user_data['username']}, who has the following coding profiles:
-        """
-        
-        has_profiles = False
-        
-        if user_data.get("leetcode_username"):
-            has_profiles = True
-            personalized_context += f"\n- LeetCode: {user_data['leetcode_username']}"
-            if "platform_stats" in user_data and "leetcode" in user_data["platform_stats"]:
-                stats = user_data["platform_stats"]["leetcode"]
-                personalized_context += f" (Solved: {stats.get('total_solved', 'N/A')} problems, " + \
-                                       f"Easy: {stats.get('easy_solved', 'N/A')}, " + \
-                                       f"Medium: {stats.get('medium_solved', 'N/A')}, " + \
-                                       f"Hard: {stats.get('hard_solved', 'N/A')})"
-        
-        if user_data.get("github_username"):
-            has_profiles = True
-            personalized_context += f"\n- GitHub: {user_data['github_username']}"
-            if "platform_stats" in user_data and "github" in user_data["platform_stats"]:
-                stats = user_data["platform_stats"]["github"]
-                personalized_context += f" (Contributions: {stats.get('total_contributions', 'N/A')})"
-                if stats.get("languages"):
-                    top_languages = ", ".join([f"{lang}" for lang, _ in list(stats.get("languages", {}).items())[:3]])
-                    personalized_context += f"\n  Top languages: {top_languages}"
+        inputs = material_inputs(user_context)
+        if not force:
+            cached = await get_cached_recommendations(db, clerk_id, inputs)
+            if cached:
+                return {
+                    "username": username,
+                    "recommendations": cached.content,
+                    "generated_at": cached.generated_at.isoformat(),
+                    "cached": True
+                }
         
-        if user_data.get("codechef_username"):
-            has_profiles = True
-            personalized_context += f"\n- CodeChef: {user_data['codechef_username']}"
-            if "platform_stats" in user_data and "codechef" in user_data["platform_stats"]:
-                stats = user_data["platform_stats"]["codechef"]
-                personalized_context += f" (Rating: {stats.get('rating', 'N/A')}, Stars: {stats.get('stars', 'N/A')})"
+        personalized_context = build_recommendations_prompt(user_context)
         
-        if user_data.get("codeforces_username"):
-            has_profiles = True
-            personalized_context += f"\n- Codeforces: {user_data['codeforces_username']}"
-            if "platform_stats" in user_data and "codeforces" in user_data["platform_stats"]:
-                stats = user_data["platform_stats"]["codeforces"]
-                personalized_context += f" (Rating: {stats.get('rating', 'N/A')})"
-        
-        if not has_profiles:
-            personalized_context += "\n- No coding profiles linked yet"
-            
-        personalized_context += f"""
-        
-        
-        Please provide well-spaced, personalized recommendations for {user_data['username']} in these categories:
-        
-        
-        SKILL DEVELOPMENT:
-        
-        Based on their profiles, suggest 2-3 specific skills or topics they should focus on next. Present each suggestion as a separate paragraph with proper spacing. Include specific resources they can use to learn each skill (name the book, course, or website).
-        
-        
-        PRACTICE PROBLEMS:
-        
-        Suggest 3-5 specific LeetCode problems that match their skill level. List each problem on its own line with TWO line breaks between items. Include the full problem name AND problem number (e.g., "Two Sum - Problem 1").
-        
-        
-        LEARNING RESOURCES:
-        
-        Recommend specific books, courses, or tutorials. Present each recommendation as a distinct paragraph with proper spacing. Include full resource name, author, and platform (e.g., "Clean Code by Robert Martin" or "Advanced Python on Coursera by University of Michigan").
-        
-        
-        PROJECT IDEAS:
-        
-        Suggest 2-3 concrete project ideas. Each project suggestion should be in its own paragraph with THREE line breaks between them. Include key technologies to use and enough details that they could start working on it immediately.
-        
-        
-        CAREER ADVICE:
-        
-        Provide practical career advice based on their current skill set. Use TRIPLE line breaks between different pieces of advice. Be specific about next steps and mention any specific resources by name.
-        
-        
-        IMPORTANT FORMATTING: 
-        - Use clear section titles with TWO line breaks after each title
-        - Ensure THREE line breaks between sections
-        - For lists, put each item on its own line with TWO line breaks between items
-        - Include detailed references to resources (names, numbers, authors, platforms) directly in the text
-        - Use bullet points (•) for unordered lists with proper spacing
-        - Keep your language conversational and friendly
-        - Maintain ample white space throughout the entire response
-        """
-        
-        logger.info(f"Generating personalized recommendations for {user_data['username']}")
-        response = model.generate_content(personalized_context)
+        logger.info(f"Generating personalized recommendations for {username}")
+        response = await llm.generate("chat", personalized_context, clerk_id, label=f"Recommendations for {username}")
         
         # Format the response to remove markdown symbols at the beginning of lines
         formatted_response = format_ai_response(response.text)
         
+        generated_at = await store_recommendations(db, clerk_id, inputs, formatted_response)
+        
         return {
-            "username": user_data['username'],
+            "username": username,
             "recommendations": formatted_response,
-            "generated_at": datetime.now().isoformat()
+            "generated_at": generated_at.isoformat(),
+            "cached": False
         }
     except HTTPException as e:
         raise e
@@ -850,6 +1015,50 @@ async def get_recommendations(
             detail=f"Failed to generate recommendations: {str(e)}"
         )
 
+@app.get("/api/recommendations/stream", tags=["Recommendations"])
+@query_budget(3)
+async def stream_recommendations(
+    clerk_id: str = Depends(get_current_user_clerk_id),
+    db: AsyncSession = Depends(get_async_db),
+    force: bool = Query(False, description="Regenerate even if the profile has not changed")
+):
+    """Streaming /api/recommendations (server-sent events, same protocol as /chat/stream)"""
+    user_context = await get_user_context(db, clerk_id)
+    if not user_context:
+        raise HTTPException(status_code=404, detail="User not found")
+    inputs = material_inputs(user_context)
+    cached = None if force else await get_cached_recommendations(db, clerk_id, inputs)
+    if not cached:
+        llm.check_capacity()  # reject with 429 before the stream starts
+    
+    async def events():
+        if cached:
+            yield sse_event("chunk", {"text": cached.content})
+            yield sse_event("done", {"content": cached.content, "generated_at": cached.generated_at.isoformat(), "cached": True})
+            return
+        label = f"Recommendations stream for {user_context.username}"
+        stream = LLMStream(llm.stream("chat", build_recommendations_prompt(user_context), clerk_id, label), label)
+        try:
+            # Closed even when the client disconnects mid-stream, which releases the LLM slot
+            async with aclosing(stream.chunks()) as chunks:
+                async for text in chunks:
+                    yield sse_event("chunk", {"text": text})
+        except Exception as e:
+            logger.error(f"Error generating recommendations: {str(e)}")
+            yield sse_event("error", {"detail": f"Failed to generate recommendations: {str(e)}"})
+            return
+        formatted_response = format_ai_response(stream.text)
+        async with AsyncSessionLocal() as session:
+            generated_at = await store_recommendations(session, clerk_id, inputs, formatted_response)
+        yield sse_event("done", {
+            "content": formatted_response,
+            "generated_at": generated_at.isoformat(),
+            "cached": False,
+            "time_to_first_token_ms": stream.first_token_ms
+        })
+    
+    return sse_response(events())
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Float, JSON, UniqueConstraint, Index, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Float, JSON, UniqueConstraint, Index, Text, LargeBinary
 from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.ext.declarative import declarative_base
 from database import Base
@@ -226,4 +226,337 @@ class ChatHistory(Base):
     __table_args__ = (
         Index('idx_clerk_created', 'clerk_id', 'created_at'),
         Index('idx_created_at', 'created_at'),
-    )
\ No newline at end of file
+        Index('idx_clerk_session_created', 'clerk_id', 'session_id', 'created_at'),
+    )
+
+# Inverted index over chat_history for databases without full-text search.
+# Postgres searches the generated chat_history.search_vector column (created
+# by migration, GIN indexed) instead and leaves this table empty.
+class ChatSearchTerm(Base):
+    __tablename__ = "chat_search_terms"
+    
+    term = Column(String(64), primary_key=True)
+    
+    message_id = Column(
+        Integer,
+        ForeignKey("chat_history.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    
+    clerk_id = Column(String(255), nullable=False)
+    
+    # Term frequency in the message, user_message occurrences weighted higher
+    weight = Column(Integer, nullable=False, default=1)
+    
+    __table_args__ = (
+        Index('idx_search_clerk_term', 'clerk_id', 'term'),
+    )
+
+class ChatSession(Base):
+    __tablename__ = "chat_sessions"
+    
+    id = Column(
+        Integer,
+        primary_key=True,
+        autoincrement=True,
+        comment="Internal session row ID"
+    )
+    
+    clerk_id = Column(
+        String(255),
+        ForeignKey("users.clerk_id", ondelete="CASCADE"),
+        nullable=False,
+        comment="User who owns the session"
+    )
+    
+    session_id = Column(
+        String(255),
+        nullable=False,
+        comment="Matches chat_history.session_id"
+    )
+    
+    title = Column(
+        String(120),
+        nullable=True,
+        comment="First user message of the session, truncated"
+    )
+    
+    message_count = Column(Integer, nullable=False, default=0)
+    
+    started_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False
+    )
+    
+    last_message_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False
+    )
+
+    # Rolling conversation memory (see chat_memory.py): covers every turn of
+    # the session except the latest one, which is prompted verbatim
+    summary = Column(
+        Text,
+        nullable=True,
+        comment="Extractive summary of earlier turns"
+    )
+
+    summary_tokens = Column(Integer, nullable=False, default=0, server_default="0")
+
+    # Maintained incrementally by chat_endpoint on every insert
+    __table_args__ = (
+        UniqueConstraint('clerk_id', 'session_id', name='unique_user_session'),
+        Index('idx_clerk_last_message', 'clerk_id', 'last_message_at'),
+    )
+# Last generated /api/recommendations response per user, with the inputs
+# that produced it (see recommendations.py for what counts as a change)
+class Recommendation(Base):
+    __tablename__ = "recommendations"
+    
+    clerk_id = Column(
+        String(255),
+        ForeignKey("users.clerk_id", ondelete="CASCADE"),
+        primary_key=True,
+        comment="One cached recommendation set per user"
+    )
+    
+    fingerprint = Column(
+        String(64),
+        nullable=False,
+        comment="SHA-256 of the material inputs"
+    )
+    
+    inputs = Column(JSON, nullable=False)
+    
+    content = Column(Text, nullable=False)
+    
+    generated_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False
+    )
+
+# Content-addressed caches for /analyze (see resume_cache.py). Keyed by the
+# SHA-256 of the uploaded PDF; analyses also by a hash of the normalized job
+# description. Expired after a TTL and trimmed least-recently-used first.
+class ResumeText(Base):
+    __tablename__ = "resume_texts"
+    
+    pdf_sha256 = Column(String(64), primary_key=True)
+    
+    text = Column(Text, nullable=False)
+    
+    page_count = Column(Integer, nullable=True)
+    
+    created_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False
+    )
+    
+    last_used_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+        index=True
+    )
+
+class ResumeAnalysis(Base):
+    __tablename__ = "resume_analyses"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    
+    pdf_sha256 = Column(String(64), nullable=False)
+    
+    jd_sha256 = Column(
+        String(64),
+        nullable=False,
+        comment="Hash of the normalized job description ('' when none was given)"
+    )
+    
+    analysis = Column(Text, nullable=False)
+    
+    created_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False
+    )
+    
+    last_used_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+        index=True
+    )
+    
+    __table_args__ = (
+        UniqueConstraint('pdf_sha256', 'jd_sha256', name='unique_resume_jd'),
+    )
+
+# OCR output for resume pages without a text layer, keyed by a hash of the
+# rendered page image, so the same scanned page is only OCR'd once.
+class OCRPage(Base):
+    __tablename__ = "ocr_pages"
+    
+    page_sha256 = Column(String(64), primary_key=True)
+    
+    text = Column(Text, nullable=False)
+    
+    created_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False
+    )
+    
+    last_used_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+        index=True
+    )
+
+# Materialized /api/dashboard response per user (see dashboard.py). Rebuilt
+# after profile and settings writes; served as-is.
+class DashboardDocument(Base):
+    __tablename__ = "dashboard_documents"
+    
+    clerk_id = Column(
+        String(255),
+        ForeignKey("users.clerk_id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    
+    version = Column(
+        Integer,
+        nullable=False,
+        default=1,
+        comment="Incremented whenever the body changes"
+    )
+    
+    etag = Column(
+        String(64),
+        nullable=False,
+        comment="SHA-256 of the body"
+    )
+    
+    body = Column(
+        Text,
+        nullable=False,
+        comment="Pre-serialized JSON response"
+    )
+    
+    built_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False
+    )
+
+# Append-only history of CodingProfile metrics (see profile_history.py).
+# Keyframes hold every tracked metric; the rows in between hold only the
+# metrics that changed, as differences from the previous snapshot.
+class ProfileSnapshot(Base):
+    __tablename__ = "profile_snapshots"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    
+    clerk_id = Column(
+        String(255),
+        ForeignKey("users.clerk_id", ondelete="CASCADE"),
+        nullable=False
+    )
+    
+    platform = Column(String(20), nullable=False)
+    
+    taken_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False
+    )
+    
+    seq = Column(
+        Integer,
+        nullable=False,
+        default=0,
+        comment="Snapshots since the last keyframe (0 = keyframe)"
+    )
+    
+    metrics = Column(
+        JSON,
+        nullable=False,
+        comment="Full values on keyframes, changed metrics as deltas otherwise"
+    )
+    
+    __table_args__ = (
+        Index('idx_snapshot_profile_time', 'clerk_id', 'platform', 'taken_at'),
+    )
+
+# Codeforces rating changes per handle (see rating_history.py), packed as
+# fixed-size binary records in contest order and appended incrementally.
+class CodeforcesRatingHistory(Base):
+    __tablename__ = "codeforces_rating_history"
+    
+    handle = Column(
+        String(24),
+        primary_key=True,
+        comment="Lowercased Codeforces handle"
+    )
+    
+    series = Column(
+        LargeBinary,
+        nullable=False,
+        comment="Packed (contest id, update time, new rating) records"
+    )
+    
+    contest_count = Column(Integer, nullable=False, default=0)
+    
+    last_update_time = Column(
+        Integer,
+        nullable=False,
+        default=0,
+        comment="ratingUpdateTimeSeconds of the newest stored contest"
+    )
+    
+    last_rating = Column(Integer, nullable=True)
+    
+    max_rating = Column(Integer, nullable=True)
+    
+    checked_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+        comment="Last time user.rating was fetched"
+    )
+
+# Daily GitHub contribution counts per handle and calendar year (see
+# contributions.py): one little-endian uint16 per day of the year, plus a
+# bitmap of the days that have actually been fetched.
+class GitHubContributionYear(Base):
+    __tablename__ = "github_contribution_years"
+    
+    handle = Column(
+        String(39),
+        primary_key=True,
+        comment="Lowercased GitHub login"
+    )
+    
+    year = Column(Integer, primary_key=True)
+    
+    counts = Column(
+        LargeBinary,
+        nullable=False,
+        comment="Packed uint16 count per day of the year"
+    )
+    
+    fetched = Column(
+        LargeBinary,
+        nullable=False,
+        comment="Bitmap of the days of the year that have been fetched"
+    )
+    
+    updated_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False
+    )
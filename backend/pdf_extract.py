@@ -0,0 +1,219 @@
+import asyncio
+import hashlib
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from fastapi.responses import JSONResponse
+
+from fastapi import HTTPException, UploadFile
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+# Resume PDF text extraction, off the event loop.
+#
+# Request bodies for the upload endpoints are capped by UploadLimitMiddleware
+# (on Content-Length, and while the body streams in for chunked uploads), so
+# an oversized upload is rejected with 413 before Starlette spools it. Each
+# file is then read in chunks and checked against PDF_MAX_BYTES. PyMuPDF runs in a process pool
+# (PDF_WORKERS processes): the first PDF_PAGES_PER_TASK pages are extracted
+# together with the page count, and longer documents fan the remaining pages
+# out across the pool in chunks of the same size. Documents with more than
+# PDF_MAX_PAGES pages are rejected.
+#
+# Pages without a text layer (scans) are OCR'd with Tesseract, also in the
+# pool: each is rendered to grayscale at PDF_OCR_DPI once and hashed, cached
+# OCR text is looked up by that hash, and only the remaining pages (at most
+# PDF_OCR_MAX_PAGES per document) are OCR'd in parallel from those same
+# rendered pixels.
+PDF_MAX_BYTES = int(os.getenv("PDF_MAX_BYTES", str(10 * 1024 * 1024)))
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "50"))
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "8"))
+PDF_OCR_ENABLED = os.getenv("PDF_OCR", "true").lower() == "true"
+PDF_OCR_DPI = int(os.getenv("PDF_OCR_DPI", "200"))
+PDF_OCR_LANG = os.getenv("PDF_OCR_LANG", "eng")
+PDF_OCR_MAX_PAGES = int(os.getenv("PDF_OCR_MAX_PAGES", "10"))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+UPLOAD_FORM_OVERHEAD = 1024 * 1024  # multipart framing plus the job description field
+
+class ExtractedPDF(NamedTuple):
+    text: str
+    page_count: int
+
+class RenderedPage(NamedTuple):
+    sha256: str  # rendered pixels plus OCR settings, the OCR cache key
+    width: int
+    height: int
+    samples: bytes  # 8-bit grayscale, row by row
+
+class PDFError(Exception):
+    """Raised inside worker processes for documents PyMuPDF can't read"""
+
+class OCRUnavailable(Exception):
+    """Raised inside worker processes when Tesseract is missing or fails"""
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS)
+    return _pool
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+
+def _extract_pages(pdf_bytes: bytes, start: int, stop: int) -> Tuple[int, List[str]]:
+    """Worker: (page count, text of pages [start, stop)). Runs in the pool"""
+    import fitz
+    try:
+        with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+            page_count = doc.page_count
+            if page_count > PDF_MAX_PAGES:
+                return page_count, []
+            return page_count, [doc[i].get_text("text") for i in range(start, min(stop, page_count))]
+    except Exception as e:
+        # PyMuPDF exceptions don't always pickle; send the message back instead
+        raise PDFError(str(e)) from None
+
+def _render_page(doc, index: int):
+    import fitz
+    return doc[index].get_pixmap(dpi=PDF_OCR_DPI, colorspace=fitz.csGRAY)
+
+def _render_pages(pdf_bytes: bytes, indices: List[int]) -> List[RenderedPage]:
+    """Worker: each page rendered once, with the hash its OCR text is cached under"""
+    import fitz
+    try:
+        with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+            pages = []
+            for index in indices:
+                pix = _render_page(doc, index)
+                digest = hashlib.sha256(f"{PDF_OCR_LANG}:{pix.width}x{pix.height}:".encode())
+                digest.update(pix.samples)
+                pages.append(RenderedPage(digest.hexdigest(), pix.width, pix.height, pix.samples))
+            return pages
+    except Exception as e:
+        raise PDFError(str(e)) from None
+
+def _ocr_page(page: RenderedPage) -> str:
+    """Worker: Tesseract text of one rendered page"""
+    import pytesseract
+    from PIL import Image
+    image = Image.frombytes("L", (page.width, page.height), page.samples)
+    try:
+        text = pytesseract.image_to_string(image, lang=PDF_OCR_LANG)
+    except (pytesseract.TesseractNotFoundError, pytesseract.TesseractError) as e:
+        raise OCRUnavailable(str(e)) from None
+    return text.strip() + "\n" if text.strip() else ""
+
+async def ocr_pages(pdf_bytes: bytes, indices: List[int], db: Optional[AsyncSession] = None) -> Dict[int, str]:
+    """OCR text by page index, from the page cache where possible (uses it only when db is given)"""
+    loop = asyncio.get_running_loop()
+    pool = get_pool()
+    # Imported here so extraction itself has no database dependency
+    from resume_cache import get_cached_ocr_pages, store_ocr_pages
+    pages = await loop.run_in_executor(pool, _render_pages, pdf_bytes, indices)
+    hashes = [page.sha256 for page in pages]
+    texts = await get_cached_ocr_pages(db, set(hashes)) if db is not None else {}
+
+    # Identical pages within one document are only OCR'd once
+    todo = {}
+    for page in pages:
+        if page.sha256 not in texts:
+            todo.setdefault(page.sha256, page)
+    del pages  # cached pages' pixels aren't needed any more
+    if todo:
+        try:
+            results = await asyncio.gather(*(
+                loop.run_in_executor(pool, _ocr_page, page) for page in todo.values()
+            ))
+        except OCRUnavailable as e:
+            logger.warning(f"OCR unavailable, skipping {len(todo)} scanned pages: {e}")
+        else:
+            new_texts = dict(zip(todo, results))
+            if db is not None:
+                await store_ocr_pages(db, new_texts)
+            texts.update(new_texts)
+        logger.info(f"OCR: {len(indices) - len(todo)} pages from cache, {len(todo)} processed")
+    return {index: texts[page_hash] for index, page_hash in zip(indices, hashes) if page_hash in texts}
+
+class UploadLimitMiddleware:
+    """Rejects request bodies over a per-path byte limit with 413 (ASGI, so it sees the raw body)"""
+
+    def __init__(self, app, limits: Dict[str, int]):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope.get("path")) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+        too_large = f"Upload must be at most {limit // (1024 * 1024)} MB"
+        headers = dict(scope.get("headers") or [])
+        try:
+            declared = int(headers.get(b"content-length", b"0"))
+        except ValueError:
+            declared = 0
+        if declared > limit:
+            await JSONResponse(status_code=413, content={"detail": too_large})(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Raised inside the form parser, so FastAPI answers 413
+                    raise HTTPException(status_code=413, detail=too_large)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+async def read_upload(upload: UploadFile, max_bytes: Optional[int] = None) -> bytes:
+    """Read an upload in chunks, failing with 413 as soon as it exceeds max_bytes"""
+    max_bytes = max_bytes or PDF_MAX_BYTES
+    too_large = HTTPException(status_code=413, detail=f"Resume must be at most {max_bytes // (1024 * 1024)} MB")
+    if upload.size is not None and upload.size > max_bytes:
+        raise too_large
+    chunks = []
+    received = 0
+    while True:
+        chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        received += len(chunk)
+        if received > max_bytes:
+            raise too_large
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+async def extract_pdf_text(pdf_bytes: bytes, db: Optional[AsyncSession] = None) -> ExtractedPDF:
+    """Text of every page, OCR'ing pages without a text layer when enabled"""
+    loop = asyncio.get_running_loop()
+    pool = get_pool()
+    try:
+        page_count, first = await loop.run_in_executor(pool, _extract_pages, pdf_bytes, 0, PDF_PAGES_PER_TASK)
+        if page_count > PDF_MAX_PAGES:
+            raise HTTPException(status_code=413, detail=f"Resume must have at most {PDF_MAX_PAGES} pages")
+        rest = await asyncio.gather(*(
+            loop.run_in_executor(pool, _extract_pages, pdf_bytes, start, start + PDF_PAGES_PER_TASK)
+            for start in range(PDF_PAGES_PER_TASK, page_count, PDF_PAGES_PER_TASK)
+        ))
+        pages = first + [text for _, chunk in rest for text in chunk]
+        missing = [index for index, text in enumerate(pages) if not text.strip()]
+        if missing and PDF_OCR_ENABLED:
+            for index, text in (await ocr_pages(pdf_bytes, missing[:PDF_OCR_MAX_PAGES], db)).items():
+                pages[index] = text
+    except PDFError as e:
+        raise HTTPException(status_code=400, detail=f"Error extracting text from the resume: {e}")
+    return ExtractedPDF("".join(pages), page_count)
@@ -0,0 +1,148 @@
+import logging
+import os
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from models import CodingProfile, ProfileSnapshot
+
+logger = logging.getLogger(__name__)
+
+# Profile metric history for progress-over-time charts.
+#
+# update_profile_in_db records a snapshot in the same transaction as the
+# profile update, and only when a tracked metric changed. Every
+# SNAPSHOT_KEYFRAME_EVERY-th snapshot (and any snapshot where a metric appears
+# or disappears) is a keyframe holding all values; the ones in between hold
+# just the changed metrics as differences from the previous snapshot.
+#
+# A history query is one range scan over idx_snapshot_profile_time, starting
+# at the last keyframe before the requested range, replayed in memory and
+# downsampled to day/week/month buckets (last value per bucket). Retention
+# runs whenever a keyframe is written: rows older than
+# SNAPSHOT_RETENTION_DAYS are deleted up to the newest keyframe before the
+# cutoff, so what remains always starts with a keyframe.
+SNAPSHOT_KEYFRAME_EVERY = int(os.getenv("SNAPSHOT_KEYFRAME_EVERY", "30"))
+SNAPSHOT_RETENTION_DAYS = int(os.getenv("SNAPSHOT_RETENTION_DAYS", "730"))
+
+TRACKED_METRICS = {
+    "leetcode": ("total_problems_solved", "easy_solved", "medium_solved", "hard_solved"),
+    "github": ("total_contributions", "current_streak", "longest_streak", "total_stars", "total_forks"),
+    "codechef": ("current_rating", "highest_rating", "global_rank", "country_rank", "stars"),
+    "codeforces": ("codeforces_rating", "codeforces_max_rating", "problems_solved_count"),
+}
+
+BUCKETS = ("day", "week", "month")
+
+def snapshot_metrics(profile: CodingProfile) -> Dict[str, int]:
+    """Tracked metrics that currently have a value"""
+    values = {}
+    for metric in TRACKED_METRICS.get(profile.platform, ()):
+        value = getattr(profile, metric)
+        if value is not None:
+            values[metric] = value
+    return values
+
+def _apply_retention(db: Session, clerk_id: str, platform: str, now: datetime) -> None:
+    cutoff = now - timedelta(days=SNAPSHOT_RETENTION_DAYS)
+    keep_from = db.execute(
+        select(func.max(ProfileSnapshot.taken_at)).where(
+            ProfileSnapshot.clerk_id == clerk_id,
+            ProfileSnapshot.platform == platform,
+            ProfileSnapshot.seq == 0,
+            ProfileSnapshot.taken_at <= cutoff,
+        )
+    ).scalar()
+    if keep_from is None:
+        return
+    deleted = db.execute(
+        delete(ProfileSnapshot).where(
+            ProfileSnapshot.clerk_id == clerk_id,
+            ProfileSnapshot.platform == platform,
+            ProfileSnapshot.taken_at < keep_from,
+        )
+    ).rowcount
+    if deleted:
+        logger.info(f"Pruned {deleted} {platform} snapshots for {clerk_id}")
+
+def record_snapshot(db: Session, profile: CodingProfile, previous: Dict[str, int]) -> Optional[ProfileSnapshot]:
+    """Add a snapshot for a profile update (previous = snapshot_metrics before it); flushed with the caller's commit"""
+    current = snapshot_metrics(profile)
+    last_seq = db.execute(
+        select(ProfileSnapshot.seq)
+        .where(ProfileSnapshot.clerk_id == profile.clerk_id, ProfileSnapshot.platform == profile.platform)
+        .order_by(ProfileSnapshot.taken_at.desc(), ProfileSnapshot.id.desc())
+        .limit(1)
+    ).scalar()
+    now = datetime.now(timezone.utc)
+    if last_seq is None or last_seq + 1 >= SNAPSHOT_KEYFRAME_EVERY or set(previous) != set(current):
+        snapshot = ProfileSnapshot(clerk_id=profile.clerk_id, platform=profile.platform, taken_at=now,
+                                   seq=0, metrics=current)
+        db.add(snapshot)
+        _apply_retention(db, profile.clerk_id, profile.platform, now)
+        return snapshot
+    deltas = {metric: value - previous[metric] for metric, value in current.items() if value != previous[metric]}
+    if not deltas:
+        return None
+    snapshot = ProfileSnapshot(clerk_id=profile.clerk_id, platform=profile.platform, taken_at=now,
+                               seq=last_seq + 1, metrics=deltas)
+    db.add(snapshot)
+    return snapshot
+
+def bucket_start(moment: datetime, bucket: str) -> date:
+    day = moment.date()
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())  # ISO weeks start on Monday
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+def _aware(moment: datetime) -> datetime:
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)  # SQLite drops the offset
+
+async def profile_history(db: AsyncSession, clerk_id: str, platform: str, metrics: List[str], bucket: str,
+                          since: datetime, until: datetime) -> dict:
+    """Columnar series of metrics between since and until, last value per bucket"""
+    start = (
+        select(func.max(ProfileSnapshot.taken_at))
+        .where(
+            ProfileSnapshot.clerk_id == clerk_id,
+            ProfileSnapshot.platform == platform,
+            ProfileSnapshot.seq == 0,
+            ProfileSnapshot.taken_at <= since,
+        )
+        .scalar_subquery()
+    )
+    rows = (await db.execute(
+        select(ProfileSnapshot.taken_at, ProfileSnapshot.seq, ProfileSnapshot.metrics)
+        .where(
+            ProfileSnapshot.clerk_id == clerk_id,
+            ProfileSnapshot.platform == platform,
+            ProfileSnapshot.taken_at >= func.coalesce(start, since),
+            ProfileSnapshot.taken_at <= until,
+        )
+        .order_by(ProfileSnapshot.taken_at, ProfileSnapshot.id)
+    )).all()
+
+    state: Dict[str, int] = {}
+    points: Dict[date, Dict[str, Optional[int]]] = {}
+    for taken_at, seq, values in rows:
+        if seq == 0:
+            state = dict(values)
+        else:
+            for metric, delta in values.items():
+                state[metric] = state.get(metric, 0) + delta
+        # Snapshots before the range only seed the first bucket's value
+        key = bucket_start(max(_aware(taken_at), since), bucket)
+        points[key] = {metric: state.get(metric) for metric in metrics}
+
+    keys = sorted(points)
+    return {
+        "platform": platform,
+        "bucket": bucket,
+        "timestamps": [key.isoformat() for key in keys],
+        "series": {metric: [points[key][metric] for key in keys] for metric in metrics},
+    }
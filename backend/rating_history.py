@@ -0,0 +1,115 @@
+import logging
+import os
+import struct
+from datetime import datetime, timedelta, timezone
+from typing import List, NamedTuple, Optional
+
+import httpx
+from sqlalchemy.exc import IntegrityError
+
+from database import AsyncSessionLocal, mark_write
+from events import publish
+from models import CodeforcesRatingHistory
+
+logger = logging.getLogger(__name__)
+
+# Codeforces rating curves, stored so charts never call the Codeforces API.
+#
+# Each handle's rating changes live in one row as packed 10-byte records
+# (contest id, rating update time, new rating) in contest order. Ingestion runs
+# as a background task after a fresh Codeforces profile fetch and only
+# appends contests newer than last_update_time. user.rating is skipped
+# altogether while the current rating still matches the stored curve and the
+# last check is less than CODEFORCES_RATING_RECHECK_HOURS old.
+CODEFORCES_RATING_RECHECK_HOURS = float(os.getenv("CODEFORCES_RATING_RECHECK_HOURS", "24"))
+CODEFORCES_RATING_URL = "https://codeforces.com/api/user.rating"
+RATING_CHART_MAX_POINTS = 1000
+
+RECORD = struct.Struct("<IIh")
+
+class RatingPoint(NamedTuple):
+    contest_id: int
+    time: int  # seconds since the epoch
+    rating: int
+
+def pack_points(points: List[RatingPoint]) -> bytes:
+    return b"".join(RECORD.pack(*point) for point in points)
+
+def unpack_points(series: bytes) -> List[RatingPoint]:
+    return [RatingPoint(*record) for record in RECORD.iter_unpack(series)]
+
+def downsample(points: List[RatingPoint], max_points: int) -> List[RatingPoint]:
+    """At most max_points points, keeping each bucket's lowest and highest rating (and the last point)"""
+    if len(points) <= max_points:
+        return points
+    # Two points per bucket plus the last point must fit in max_points
+    buckets = (max_points - 1) // 2
+    if buckets == 0:
+        return [points[0], points[-1]][-max_points:]
+    size = len(points) / buckets
+    kept = []
+    for b in range(buckets):
+        chunk = points[int(b * size):int((b + 1) * size)]
+        if not chunk:
+            continue
+        low = min(chunk, key=lambda p: p.rating)
+        high = max(chunk, key=lambda p: p.rating)
+        kept.extend(sorted({low, high}, key=lambda p: p.time))
+    if kept[-1] != points[-1]:
+        kept.append(points[-1])
+    return kept
+
+def _aware(moment: datetime) -> datetime:
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)  # SQLite drops the offset
+
+async def fetch_rating_changes(handle: str) -> List[RatingPoint]:
+    async with httpx.AsyncClient(timeout=10.0) as client:
+        response = await client.get(CODEFORCES_RATING_URL, params={"handle": handle})
+    data = response.json()
+    if data.get("status") != "OK":
+        raise ValueError(data.get("comment", "user.rating failed"))
+    return [
+        RatingPoint(change["contestId"], change["ratingUpdateTimeSeconds"], change["newRating"])
+        for change in data["result"]
+    ]
+
+async def ingest_codeforces_ratings(clerk_id: str, handle: str, current_rating: Optional[int] = None) -> int:
+    """Append the handle's new rating changes; returns how many were added. Never raises"""
+    key = handle.lower()
+    try:
+        async with AsyncSessionLocal() as db:
+            row = await db.get(CodeforcesRatingHistory, key)
+        if row is not None and current_rating is not None and row.last_rating == current_rating:
+            if datetime.now(timezone.utc) - _aware(row.checked_at) < timedelta(hours=CODEFORCES_RATING_RECHECK_HOURS):
+                return 0
+
+        # No connection held during the upstream call
+        changes = await fetch_rating_changes(handle)
+
+        async with AsyncSessionLocal() as db:
+            row = await db.get(CodeforcesRatingHistory, key)
+            if row is None:
+                row = CodeforcesRatingHistory(handle=key, series=b"", contest_count=0, last_update_time=0)
+                db.add(row)
+            new = [p for p in changes if p.time > row.last_update_time]
+            if new:
+                row.series = row.series + pack_points(new)
+                row.contest_count += len(new)
+                row.last_update_time = new[-1].time
+                row.last_rating = new[-1].rating
+                row.max_rating = max([p.rating for p in new] + ([row.max_rating] if row.max_rating is not None else []))
+            row.checked_at = datetime.now(timezone.utc)
+            try:
+                await db.commit()
+            except IntegrityError:
+                # Ingested concurrently from the same upstream data
+                await db.rollback()
+                return 0
+    except Exception as e:
+        logger.error(f"Codeforces rating ingestion failed for {handle}: {e}")
+        return 0
+    if new:
+        mark_write(clerk_id)
+        publish(clerk_id, "codeforces_ratings", {"handle": handle, "contests": row.contest_count})
+        logger.info(f"Stored {len(new)} new Codeforces rating changes for {handle}")
+    return len(new)
@@ -0,0 +1,97 @@
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from events import publish
+from models import Recommendation
+from user_context import UserContext
+
+logger = logging.getLogger(__name__)
+
+# Cached /api/recommendations.
+#
+# The stored row keeps the material inputs it was generated from. A visit
+# regenerates only when those inputs changed materially: a platform was linked
+# or unlinked, the username, top languages or a rating tier changed, or a
+# solved/contribution count moved by at least RECOMMENDATIONS_COUNT_STEP.
+# Anything smaller reuses the stored text.
+RECOMMENDATIONS_COUNT_STEP = int(os.getenv("RECOMMENDATIONS_COUNT_STEP", "25"))
+
+# Codeforces rank boundaries (newbie < 1200 <= pupil < 1400 ...)
+CODEFORCES_TIERS = (1200, 1400, 1600, 1900, 2100, 2300, 2400, 2600, 3000)
+COUNT_FIELDS = ("leetcode_solved", "leetcode_hard", "codeforces_solved", "github_contributions")
+
+def _tier(rating: Optional[int], boundaries) -> Optional[int]:
+    if rating is None:
+        return None
+    return sum(1 for boundary in boundaries if rating >= boundary)
+
+def material_inputs(context: UserContext) -> Dict[str, Any]:
+    """The parts of a user's profile that recommendations depend on"""
+    stats = context.platform_stats
+    leetcode = stats.get("leetcode", {})
+    github = stats.get("github", {})
+    codechef = stats.get("codechef", {})
+    codeforces = stats.get("codeforces", {})
+    return {
+        "username": context.username,
+        "platforms": sorted(platform for platform, handle in context.handles.items() if handle),
+        "languages": list(github.get("languages") or {})[:3],
+        "codeforces_tier": _tier(codeforces.get("rating"), CODEFORCES_TIERS),
+        "codechef_stars": codechef.get("stars"),
+        "leetcode_solved": leetcode.get("total_solved"),
+        "leetcode_hard": leetcode.get("hard_solved"),
+        "codeforces_solved": codeforces.get("problems_solved"),
+        "github_contributions": github.get("total_contributions"),
+    }
+
+def fingerprint(inputs: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()
+
+def changed_materially(previous: Dict[str, Any], current: Dict[str, Any]) -> bool:
+    for key, value in current.items():
+        old = previous.get(key)
+        if key in COUNT_FIELDS and old is not None and value is not None:
+            if abs(value - old) >= RECOMMENDATIONS_COUNT_STEP:
+                return True
+        elif old != value:
+            return True
+    return False
+
+async def get_cached_recommendations(db: AsyncSession, clerk_id: str, inputs: Dict[str, Any]) -> Optional[Recommendation]:
+    """Stored recommendations if they are still valid for these inputs"""
+    cached = await db.get(Recommendation, clerk_id)
+    if cached is None:
+        return None
+    if cached.fingerprint == fingerprint(inputs) or not changed_materially(cached.inputs, inputs):
+        return cached
+    logger.info(f"Recommendations for {clerk_id} are stale, profile changed materially")
+    return None
+
+async def store_recommendations(db: AsyncSession, clerk_id: str, inputs: Dict[str, Any], content: str) -> datetime:
+    """Upsert the user's recommendations; returns their generated_at"""
+    generated_at = datetime.now(timezone.utc)
+    row = await db.get(Recommendation, clerk_id)
+    if row is None:
+        row = Recommendation(clerk_id=clerk_id)
+        db.add(row)
+    row.fingerprint = fingerprint(inputs)
+    row.inputs = inputs
+    row.content = content
+    row.generated_at = generated_at
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Another request generated them first; theirs are just as fresh
+        await db.rollback()
+        logger.info(f"Recommendations for {clerk_id} stored concurrently")
+        return generated_at
+    publish(clerk_id, "recommendations", {"generated_at": generated_at.isoformat()})
+    return generated_at
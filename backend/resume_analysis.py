@@ -0,0 +1,47 @@
+import os
+
+from skill_matcher import SkillMatch
+
+# Prompt for /analyze. The resume is sent with blank lines and padding removed;
+# for the job description the LLM gets the local skill match plus an excerpt
+# instead of the full text.
+ANALYZE_JD_PROMPT_CHARS = int(os.getenv("ANALYZE_JD_PROMPT_CHARS", "1500"))
+
+def compact_text(text: str) -> str:
+    """Drop blank lines and per-line padding (PDF text is full of both)"""
+    return "\n".join(" ".join(line.split()) for line in text.splitlines() if line.strip())
+
+def build_analysis_prompt(resume_text: str, job_description: str, match: SkillMatch) -> str:
+    additional_text = ""
+    if job_description.strip():
+        excerpt = compact_text(job_description)
+        if len(excerpt) > ANALYZE_JD_PROMPT_CHARS:
+            excerpt = excerpt[:ANALYZE_JD_PROMPT_CHARS] + "..."
+        additional_text = f"""
+        Additionally, compare this resume with the following job description and highlight specific matches and gaps.
+        A keyword-level skill comparison has already been done; build on it rather than repeating it:
+        
+        {match.prompt_summary()}
+        
+        Job Description (excerpt):
+        {excerpt}
+        """
+    
+    return f"""
+    You are an experienced HR with technical expertise in roles such as Data Science, Data Analysis, DevOps, 
+    Machine Learning Engineering, Prompt Engineering, AI Engineering, Full Stack Web Development, 
+    Big Data Engineering, Marketing Analysis, Human Resource Management, and Software Development.
+    
+    Your task is to analyze the following resume:
+    
+    Resume:
+    {compact_text(resume_text)}
+    
+    Please provide a structured evaluation covering:
+    - Overall alignment with common industry roles
+    - Strengths and weaknesses of the candidate
+    - Key skills they already have
+    - Skills they should improve or acquire
+    - Recommended courses to enhance their profile
+    {additional_text}
+    """
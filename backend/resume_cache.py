@@ -0,0 +1,140 @@
+import hashlib
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import AsyncSessionLocal
+from models import OCRPage, ResumeAnalysis, ResumeText
+
+logger = logging.getLogger(__name__)
+
+# Content-addressed caches for /analyze.
+#
+# Extracted text is keyed by the SHA-256 of the PDF bytes; analyses by that
+# plus the SHA-256 of the normalized job description, so re-running the same
+# resume against the same JD skips both extraction and Gemini. OCR output for
+# scanned pages is keyed by the hash of the rendered page (see pdf_extract.py).
+# Entries expire after RESUME_CACHE_TTL_DAYS and each table is trimmed to
+# RESUME_CACHE_MAX_ENTRIES, least recently used first.
+RESUME_CACHE_TTL_DAYS = int(os.getenv("RESUME_CACHE_TTL_DAYS", "30"))
+RESUME_CACHE_MAX_ENTRIES = int(os.getenv("RESUME_CACHE_MAX_ENTRIES", "5000"))
+# last_used_at is only rewritten when older than this, so hits rarely write
+TOUCH_INTERVAL = timedelta(hours=1)
+
+def sha256_hex(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def normalize_job_description(job_description: str) -> str:
+    """Case and whitespace differences don't change the analysis key"""
+    return " ".join(job_description.lower().split())
+
+def job_description_hash(job_description: str) -> str:
+    return sha256_hex(normalize_job_description(job_description).encode())
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+def _aware(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)  # SQLite drops the offset
+
+async def _touch(db: AsyncSession, model, row, *where) -> None:
+    if _now() - _aware(row.last_used_at) > TOUCH_INTERVAL:
+        await db.execute(update(model).where(*where).values(last_used_at=_now()))
+        await db.commit()
+
+def _fresh(row) -> bool:
+    return _now() - _aware(row.created_at) < timedelta(days=RESUME_CACHE_TTL_DAYS)
+
+async def get_cached_analysis(db: AsyncSession, pdf_sha256: str, jd_sha256: str) -> Optional[str]:
+    row = (await db.execute(
+        select(ResumeAnalysis).where(ResumeAnalysis.pdf_sha256 == pdf_sha256, ResumeAnalysis.jd_sha256 == jd_sha256)
+    )).scalar_one_or_none()
+    if row is None or not _fresh(row):
+        return None
+    await _touch(db, ResumeAnalysis, row, ResumeAnalysis.id == row.id)
+    return row.analysis
+
+async def get_cached_text(db: AsyncSession, pdf_sha256: str) -> Optional[str]:
+    row = await db.get(ResumeText, pdf_sha256)
+    if row is None or not _fresh(row):
+        return None
+    await _touch(db, ResumeText, row, ResumeText.pdf_sha256 == pdf_sha256)
+    return row.text
+
+async def get_cached_texts(db: AsyncSession, pdf_hashes: Iterable[str]) -> Dict[str, str]:
+    """Extracted text for the given PDF hashes that are cached and fresh (one query)"""
+    rows = (await db.execute(select(ResumeText).where(ResumeText.pdf_sha256.in_(list(pdf_hashes))))).scalars().all()
+    fresh = [row for row in rows if _fresh(row)]
+    stale = [row.pdf_sha256 for row in fresh if _now() - _aware(row.last_used_at) > TOUCH_INTERVAL]
+    if stale:
+        await db.execute(update(ResumeText).where(ResumeText.pdf_sha256.in_(stale)).values(last_used_at=_now()))
+        await db.commit()
+    return {row.pdf_sha256: row.text for row in fresh}
+
+async def get_cached_ocr_pages(db: AsyncSession, page_hashes: Iterable[str]) -> Dict[str, str]:
+    """OCR text for the given page hashes that are cached and fresh"""
+    rows = (await db.execute(select(OCRPage).where(OCRPage.page_sha256.in_(list(page_hashes))))).scalars().all()
+    fresh = [row for row in rows if _fresh(row)]
+    stale = [row.page_sha256 for row in fresh if _now() - _aware(row.last_used_at) > TOUCH_INTERVAL]
+    if stale:
+        await db.execute(update(OCRPage).where(OCRPage.page_sha256.in_(stale)).values(last_used_at=_now()))
+        await db.commit()
+    return {row.page_sha256: row.text for row in fresh}
+
+async def store_ocr_pages(db: AsyncSession, pages: Dict[str, str]) -> None:
+    now = _now()
+    for page_sha256, text in pages.items():
+        await _upsert(db, OCRPage(page_sha256=page_sha256, text=text, created_at=now, last_used_at=now), page_sha256[:12])
+
+async def _upsert(db: AsyncSession, row, key: str) -> None:
+    try:
+        await db.merge(row)
+        await db.commit()
+    except IntegrityError:
+        # A concurrent request cached the same content first
+        await db.rollback()
+        logger.info(f"Resume cache entry {key} stored concurrently")
+
+async def store_text(db: AsyncSession, pdf_sha256: str, text: str, page_count: Optional[int] = None) -> None:
+    now = _now()
+    await _upsert(db, ResumeText(
+        pdf_sha256=pdf_sha256, text=text, page_count=page_count, created_at=now, last_used_at=now
+    ), pdf_sha256[:12])
+
+async def store_analysis(db: AsyncSession, pdf_sha256: str, jd_sha256: str, analysis: str) -> None:
+    now = _now()
+    existing_id = (await db.execute(
+        select(ResumeAnalysis.id).where(ResumeAnalysis.pdf_sha256 == pdf_sha256, ResumeAnalysis.jd_sha256 == jd_sha256)
+    )).scalar_one_or_none()
+    await _upsert(db, ResumeAnalysis(
+        id=existing_id, pdf_sha256=pdf_sha256, jd_sha256=jd_sha256, analysis=analysis, created_at=now, last_used_at=now
+    ), f"{pdf_sha256[:12]}/{jd_sha256[:12]}")
+
+async def _evict(db: AsyncSession, model, key_column) -> int:
+    removed = (await db.execute(
+        delete(model).where(model.created_at < _now() - timedelta(days=RESUME_CACHE_TTL_DAYS))
+    )).rowcount or 0
+    overflow = (await db.execute(select(func.count()).select_from(model))).scalar() - RESUME_CACHE_MAX_ENTRIES
+    if overflow > 0:
+        oldest = select(key_column).order_by(model.last_used_at).limit(overflow).scalar_subquery()
+        removed += (await db.execute(delete(model).where(key_column.in_(oldest)))).rowcount or 0
+    return removed
+
+async def evict_resume_cache() -> None:
+    """Drop expired entries and trim each table to the LRU limit (run as a background task)"""
+    async with AsyncSessionLocal() as db:
+        try:
+            removed = await _evict(db, ResumeAnalysis, ResumeAnalysis.id)
+            removed += await _evict(db, ResumeText, ResumeText.pdf_sha256)
+            removed += await _evict(db, OCRPage, OCRPage.page_sha256)
+            await db.commit()
+            if removed:
+                logger.info(f"Evicted {removed} resume cache entries")
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Resume cache eviction failed: {e}")
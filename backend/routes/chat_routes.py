@@ -0,0 +1,161 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import select, update, or_
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel
+import base64
+import logging
+
+from auth import get_current_user_clerk_id
+from chat_memory import estimate_tokens
+from chat_search import search_chat_history
+from dependencies import get_read_db
+from loaders import query_budget
+from models import ChatSession
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+SESSION_TITLE_LENGTH = 120
+CHAT_SESSIONS_MAX_PAGE = 100
+CHAT_SEARCH_MAX_PAGE = 50
+
+# Response models
+class ChatSessionSummary(BaseModel):
+    session_id: str
+    title: Optional[str] = None
+    message_count: int
+    started_at: str
+    last_message_at: str
+
+class ChatSessionsResponse(BaseModel):
+    sessions: List[ChatSessionSummary]
+    next_cursor: Optional[str] = None
+    has_more: bool = False
+
+class ChatSearchHit(BaseModel):
+    id: int
+    session_id: Optional[str] = None
+    created_at: str
+    rank: float
+    user_snippet: str  # matches wrapped in <mark></mark>
+    ai_snippet: str
+
+class ChatSearchResponse(BaseModel):
+    results: List[ChatSearchHit]
+    next_cursor: Optional[str] = None
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    """Opaque keyset cursor for a (timestamp, id) position"""
+    raw = f"{timestamp.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, row_id = base64.urlsafe_b64decode(padded).decode().rsplit("|", 1)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+async def record_chat_turn(db: AsyncSession, clerk_id: str, session_id: str, user_message: str, created_at: datetime,
+                           summary: Optional[str] = None) -> None:
+    """Keep the chat_sessions row in step with a newly added chat_history row.
+
+    Runs in the caller's transaction: an UPDATE for the common case, an INSERT
+    (in a savepoint, so a concurrent insert of the same session only retries
+    the UPDATE) for the first message of a session. `summary` replaces the
+    session's rolling summary when given.
+    """
+    values = dict(message_count=ChatSession.message_count + 1, last_message_at=created_at)
+    if summary is not None:
+        values.update(summary=summary, summary_tokens=estimate_tokens(summary))
+    bump = (
+        update(ChatSession)
+        .where(ChatSession.clerk_id == clerk_id, ChatSession.session_id == session_id)
+        .values(**values)
+    )
+    if (await db.execute(bump)).rowcount:
+        return
+
+    try:
+        async with db.begin_nested():
+            db.add(ChatSession(
+                clerk_id=clerk_id,
+                session_id=session_id,
+                title=user_message.strip()[:SESSION_TITLE_LENGTH],
+                message_count=1,
+                started_at=created_at,
+                last_message_at=created_at,
+                summary=summary,
+                summary_tokens=estimate_tokens(summary)
+            ))
+    except IntegrityError:
+        logger.info(f"Chat session {session_id} created concurrently, updating instead")
+        await db.execute(bump)
+
+@router.get("/chat/sessions", response_model=ChatSessionsResponse, tags=["Chat"])
+@query_budget(1)
+async def get_chat_sessions(
+    clerk_id: str = Depends(get_current_user_clerk_id),
+    db: AsyncSession = Depends(get_read_db),
+    limit: int = Query(20, ge=1, le=CHAT_SESSIONS_MAX_PAGE),
+    cursor: Optional[str] = None
+):
+    """List the user's chat sessions, most recently active first"""
+    query = select(ChatSession).where(ChatSession.clerk_id == clerk_id)
+    if cursor:
+        cursor_time, cursor_id = decode_cursor(cursor)
+        query = query.where(
+            ChatSession.last_message_at <= cursor_time,
+            or_(ChatSession.last_message_at < cursor_time, ChatSession.id < cursor_id)
+        )
+
+    rows = (await db.execute(
+        query.order_by(ChatSession.last_message_at.desc(), ChatSession.id.desc()).limit(limit + 1)
+    )).scalars().all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return ChatSessionsResponse(
+        sessions=[
+            ChatSessionSummary(
+                session_id=row.session_id,
+                title=row.title,
+                message_count=row.message_count,
+                started_at=row.started_at.isoformat(),
+                last_message_at=row.last_message_at.isoformat()
+            )
+            for row in rows
+        ],
+        next_cursor=encode_cursor(rows[-1].last_message_at, rows[-1].id) if has_more else None,
+        has_more=has_more
+    )
+
+@router.get("/chat/search", response_model=ChatSearchResponse, tags=["Chat"])
+@query_budget(1)
+async def search_chat(
+    q: str = Query(..., min_length=1, max_length=200),
+    clerk_id: str = Depends(get_current_user_clerk_id),
+    db: AsyncSession = Depends(get_read_db),
+    limit: int = Query(20, ge=1, le=CHAT_SEARCH_MAX_PAGE),
+    cursor: Optional[str] = None
+):
+    """Full-text search over the user's questions and AI responses, best match first"""
+    rows, next_cursor = await search_chat_history(db, clerk_id, q, limit, cursor)
+    return ChatSearchResponse(
+        results=[
+            ChatSearchHit(
+                id=row["id"],
+                session_id=row["session_id"],
+                created_at=row["created_at"].isoformat(),
+                rank=row["rank"],
+                user_snippet=row["user_snippet"],
+                ai_snippet=row["ai_snippet"]
+            )
+            for row in rows
+        ],
+        next_cursor=next_cursor
+    )
@@ -1,11 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query, Request, Response, status
+from sqlalchemy.orm import Session, undefer
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
-from database import get_db, SessionLocal
-from models import CodingProfile, User as DBUser
+from database import get_db, get_async_db, SessionLocal, mark_write
+from dependencies import get_read_db
+from models import CodingProfile, CodeforcesRatingHistory, User as DBUser
 from auth import get_current_user_clerk_id
+from user_context import invalidate_user_context
+from events import publish
+from profile_history import record_snapshot, snapshot_metrics
+from contributions import contribution_heatmap, merge_contributions
+from rating_history import RATING_CHART_MAX_POINTS, downsample, ingest_codeforces_ratings, unpack_points
+from http_cache import CACHE_PLATFORM, cache_headers, conditional, make_etag
 from datetime import datetime, timedelta, timezone
-from sqlalchemy import and_
+from sqlalchemy import and_, select
 import asyncio
 import logging
 from typing import Dict, Any, Optional
@@ -85,12 +93,18 @@ async def fetch_with_retry(client: httpx.AsyncClient, url: str, **kwargs) -> htt
             await asyncio.sleep(1.5 ** attempt)
     raise HTTPException(500, "Maximum retries exceeded")
 
+def platform_etag(clerk_id: str, platform: str, username: str, last_updated: datetime) -> str:
+    """ETag for a platform body: it only changes when last_updated does"""
+    return make_etag("platform", clerk_id, platform, username, last_updated.isoformat())
+
 @router.get("/platform/{platform}/{username}")
 async def get_platform_stats(
     platform: str,
     username: str,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
     clerk_id: str = Depends(get_current_user_clerk_id)
 ):
     """Get platform-specific statistics"""
@@ -100,9 +114,26 @@ async def get_platform_stats(
         logger.warning(f"Invalid {platform} username format: {username}")
         raise HTTPException(400, f"Invalid {platform} username format")
 
+    # Conditional GET: a cached body only changes with last_updated, so check
+    # If-None-Match before loading the profile or validating anything
+    last_updated = (await db.execute(
+        select(CodingProfile.last_updated).where(
+            CodingProfile.clerk_id == clerk_id,
+            CodingProfile.platform == platform
+        )
+    )).scalar_one_or_none()
+    if last_updated is not None:
+        if last_updated.tzinfo is None:
+            last_updated = last_updated.replace(tzinfo=timezone.utc)  # SQLite drops the offset
+        if datetime.now(timezone.utc) - last_updated < CACHE_EXPIRY:
+            etag = platform_etag(clerk_id, platform, username, last_updated)
+            cached = conditional(request, etag, CACHE_PLATFORM, response)
+            if cached:
+                return cached
+
     try:
         # Restore normal cache check for all platforms
-        cached_profile = get_cached_profile(db, clerk_id, platform)
+        cached_profile = await get_cached_profile(db, clerk_id, platform)
         
         if cached_profile:
             logger.info(f"Using cached {platform} profile for user {clerk_id}")
@@ -143,6 +174,14 @@ async def get_platform_stats(
             fetcher = globals()[fetcher_func_name]
 
             data = await fetcher(username)
+            # Day-level GitHub counts only go to storage (see contributions.py)
+            body = {k: v for k, v in data.items() if k != "contributionDays"}
+            # The update below stores this timestamp, so this is the same ETag
+            # the cached path will compute on the next request
+            fetched_at = datetime.now(timezone.utc)
+            response.headers.update(cache_headers(
+                platform_etag(clerk_id, platform, username, fetched_at), CACHE_PLATFORM
+            ))
             
             logger.info(f"Queueing database update after fresh fetch for {platform} profile")
             background_tasks.add_task(
@@ -150,9 +189,12 @@ async def get_platform_stats(
                 clerk_id,
                 platform,
                 username,
-                data
+                data,
+                fetched_at
             )
-            return data
+            if platform == "codeforces":
+                background_tasks.add_task(ingest_codeforces_ratings, clerk_id, username, data.get("currentRating"))
+            return body
 
     except HTTPException as http_exc:
         logger.warning(f"Propagating HTTPException for {platform} user {username}: {http_exc.status_code} - {http_exc.detail}")
@@ -161,6 +203,71 @@ async def get_platform_stats(
         logger.error(f"Unexpected error processing {platform} stats for {username}: {e}", exc_info=True)
         raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, f"Failed to process {platform} statistics due to an internal error.")
 
+@router.get("/platform/codeforces/{username}/ratings")
+async def get_codeforces_ratings(
+    username: str,
+    background_tasks: BackgroundTasks,
+    request: Request,
+    response: Response,
+    points: int = Query(200, ge=2, le=RATING_CHART_MAX_POINTS),
+    db: AsyncSession = Depends(get_read_db),
+    clerk_id: str = Depends(get_current_user_clerk_id)
+):
+    """Stored Codeforces rating curve, downsampled to at most `points` points (no upstream call)"""
+    if not validate_username("codeforces", username):
+        raise HTTPException(400, "Invalid codeforces username format")
+    row = (await db.execute(
+        select(CodeforcesRatingHistory).where(CodeforcesRatingHistory.handle == username.lower())
+    )).scalar_one_or_none()
+    if row is None:
+        # First view: ingest in the background and let the client wait for the codeforces_ratings event
+        background_tasks.add_task(ingest_codeforces_ratings, clerk_id, username)
+        return {"handle": username, "contests": 0, "pending": True, "times": [], "ratings": [], "contest_ids": []}
+
+    etag = make_etag("codeforces-ratings", row.handle, row.last_update_time, points)
+    cached = conditional(request, etag, CACHE_PLATFORM, response)
+    if cached:
+        return cached
+    series = downsample(unpack_points(row.series), points)
+    return {
+        "handle": username,
+        "contests": row.contest_count,
+        "pending": False,
+        "current_rating": row.last_rating,
+        "max_rating": row.max_rating,
+        "times": [p.time for p in series],
+        "ratings": [p.rating for p in series],
+        "contest_ids": [p.contest_id for p in series],
+    }
+
+@router.get("/platform/github/{username}/contributions")
+async def get_github_contributions(
+    username: str,
+    request: Request,
+    response: Response,
+    year: Optional[int] = Query(None, ge=2008, description="Calendar year; default the last 365 days"),
+    db: AsyncSession = Depends(get_read_db),
+    clerk_id: str = Depends(get_current_user_clerk_id)
+):
+    """Stored daily contribution counts for a heatmap (null for days never fetched; no upstream call)"""
+    if not validate_username("github", username):
+        raise HTTPException(400, "Invalid github username format")
+    if year is not None and year > datetime.now(timezone.utc).year + 1:
+        raise HTTPException(400, f"year must be at most {datetime.now(timezone.utc).year + 1}")
+    if year is not None:
+        start, end = datetime(year, 1, 1).date(), datetime(year, 12, 31).date()
+    else:
+        end = datetime.now(timezone.utc).date()
+        start = end - timedelta(days=364)
+    heatmap = await contribution_heatmap(db, username, start, end)
+    if heatmap is None:
+        raise HTTPException(404, f"No stored contributions for {username}; fetch the GitHub profile first")
+    etag = make_etag("github-contributions", username.lower(), start, end, heatmap.pop("updated_at").isoformat())
+    cached = conditional(request, etag, CACHE_PLATFORM, response)
+    if cached:
+        return cached
+    return heatmap
+
 async def fetch_leetcode_data(username: str) -> Dict[str, Any]:
     """Validated LeetCode data fetcher"""
     # Define the operation and declare the $username variable
@@ -286,13 +393,19 @@ def validate_cached_data(profile: CodingProfile, model: BaseModel, platform: str
         logger.error(f"Unexpected error validating cached {platform} data ({profile.clerk_id}): {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error validating cached {platform} data.")
 
-def get_cached_profile(db: Session, clerk_id: str, platform: str) -> Optional[CodingProfile]:
+async def get_cached_profile(db: AsyncSession, clerk_id: str, platform: str) -> Optional[CodingProfile]:
     """Get cached profile data from database"""
     try:
-        profile = db.query(CodingProfile).filter(
-            CodingProfile.clerk_id == clerk_id,
-            CodingProfile.platform == platform
-        ).first()
+        # The deferred JSON columns are read by validate_cached_data and cannot
+        # be lazy-loaded on an AsyncSession, so load them with the row.
+        profile = (await db.execute(
+            select(CodingProfile)
+            .where(
+                CodingProfile.clerk_id == clerk_id,
+                CodingProfile.platform == platform
+            )
+            .options(undefer(CodingProfile.languages), undefer(CodingProfile.problem_categories))
+        )).scalars().first()
 
         if profile:
             # Make utcnow() timezone-aware before comparison
@@ -311,12 +424,14 @@ def get_cached_profile(db: Session, clerk_id: str, platform: str) -> Optional[Co
         logger.error(f"Error getting cached profile for {platform} user {clerk_id}: {e}", exc_info=True)
         return None
 
-def update_profile_in_db(clerk_id: str, platform: str, username: str, data: Dict[str, Any]):
+def update_profile_in_db(clerk_id: str, platform: str, username: str, data: Dict[str, Any],
+                         fetched_at: Optional[datetime] = None):
     """Update profile data in database with detailed logging and error handling"""
     db: Optional[Session] = None # Initialize db to None
     try:
         db = SessionLocal()
-        logger.info(f"[DB Update - START] Updating {platform} for {clerk_id}. Data: {data}")
+        logged = {k: v for k, v in data.items() if k != "contributionDays"}
+        logger.info(f"[DB Update - START] Updating {platform} for {clerk_id}. Data: {logged}")
 
         profile = db.query(CodingProfile).filter(
             CodingProfile.clerk_id == clerk_id,
@@ -333,6 +448,7 @@ def update_profile_in_db(clerk_id: str, platform: str, username: str, data: Dict
             db.add(profile)
         else:
             logger.info(f"[DB Update] Found existing {platform} profile record for {clerk_id}")
+        previous_metrics = snapshot_metrics(profile)
         
         # Log values just before assigning
         logger.debug(f"[DB Update] Values before update: current_rating={profile.current_rating}, highest_rating={profile.highest_rating}, stars={profile.stars}, last_updated={profile.last_updated}")
@@ -345,6 +461,7 @@ def update_profile_in_db(clerk_id: str, platform: str, username: str, data: Dict
             profile.total_stars = data.get("totalStars")
             profile.total_forks = data.get("totalForks")
             profile.languages = data.get("languages")
+            merge_contributions(db, username, data.get("contributionDays"))
         elif platform == "leetcode":
             profile.total_problems_solved = data.get("totalSolved")
             profile.easy_solved = data.get("easySolved")
@@ -367,7 +484,9 @@ def update_profile_in_db(clerk_id: str, platform: str, username: str, data: Dict
             profile.problems_solved_count = data.get("solvedProblems")
         
         # Use timezone-aware datetime for the timezone=True column
-        profile.last_updated = datetime.now(timezone.utc)
+        profile.last_updated = fetched_at or datetime.now(timezone.utc)
+        # History for progress charts, committed together with the update
+        record_snapshot(db, profile, previous_metrics)
         
         # Log values just before commit
         logger.debug(f"[DB Update] Values before commit: current_rating={profile.current_rating}, highest_rating={profile.highest_rating}, stars={profile.stars}, last_updated={profile.last_updated}")
@@ -375,7 +494,13 @@ def update_profile_in_db(clerk_id: str, platform: str, username: str, data: Dict
         try:
             logger.info(f"[DB Update] Attempting commit for {platform} - {clerk_id}")
             db.commit()
+            mark_write(clerk_id)
+            invalidate_user_context(clerk_id)
             logger.info(f"[DB Update - SUCCESS] Commit successful for {platform} - {clerk_id}")
+            publish(clerk_id, "profile", {"platform": platform, "last_updated": profile.last_updated.isoformat()})
+            # Imported here: dashboard builds on this module's response models
+            from dashboard import rebuild_dashboard_document
+            rebuild_dashboard_document(clerk_id)
             # Optional: Refresh instance if needed elsewhere, but not strictly necessary here
             # db.refresh(profile)
         except SQLAlchemyError as db_err:
@@ -534,8 +659,10 @@ async def fetch_github_data(username: str) -> Dict[str, Any]:
             last_contribution_date = None
             
             contribution_dates = set()
+            contribution_days = []  # stored for the heatmap by update_profile_in_db
             for week in weeks:
                 for day in week.get("contributionDays", []):
+                    contribution_days.append([day["date"], day.get("contributionCount", 0)])
                     if day.get("contributionCount", 0) > 0:
                         contribution_dates.add(datetime.fromisoformat(day["date"]).date())
             
@@ -641,7 +768,7 @@ async def fetch_github_data(username: str) -> Dict[str, Any]:
                 totalForks=total_forks,
                 languages=languages_final # Use calculated languages
             )
-            return validated.dict()
+            return {**validated.dict(), "contributionDays": contribution_days}
 
     except httpx.HTTPStatusError as e:
         # Log response body for debugging HTTP errors during GraphQL request
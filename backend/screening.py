@@ -0,0 +1,240 @@
+import asyncio
+import io
+import logging
+import os
+import time
+import zipfile
+from contextlib import aclosing
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, List, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile
+
+from database import AsyncSessionLocal
+from llm_gateway import LLM_MAX_PER_USER, llm
+from pdf_extract import PDF_MAX_BYTES, PDF_WORKERS, extract_pdf_text, read_upload
+from resume_analysis import build_analysis_prompt
+from resume_cache import (
+    sha256_hex, job_description_hash, get_cached_texts, store_text, get_cached_analysis, store_analysis
+)
+from skill_matcher import SkillMatch, build_match, coverage_scores, jd_weights, skill_vectors
+
+logger = logging.getLogger(__name__)
+
+# Batch resume screening: many resumes (PDFs and/or zips of PDFs) against one
+# job description.
+#
+# The job description is matched once. Resumes are extracted concurrently
+# (cached text first, then the PDF process pool), scored together as one
+# (resumes x skills) matrix and streamed back ranked by coverage. Optional
+# LLM reports for the top results run afterwards through the LLM gateway, at
+# most LLM_MAX_PER_USER at a time, and reuse the /analyze analysis cache.
+#
+# A batch's PDFs are all in memory until extraction starts, so their total
+# size (uncompressed, for zips) is capped at BATCH_MAX_TOTAL_BYTES, and each
+# resume's bytes are dropped as soon as its text is known.
+BATCH_MAX_RESUMES = int(os.getenv("BATCH_MAX_RESUMES", "100"))
+BATCH_MAX_ZIP_BYTES = int(os.getenv("BATCH_MAX_ZIP_BYTES", str(50 * 1024 * 1024)))
+BATCH_MAX_TOTAL_BYTES = int(os.getenv("BATCH_MAX_TOTAL_BYTES", str(100 * 1024 * 1024)))
+BATCH_MAX_REPORTS = int(os.getenv("BATCH_MAX_REPORTS", "10"))
+EXTRACT_CONCURRENCY = PDF_WORKERS * 2  # keeps the pool busy without a session per resume
+
+@dataclass
+class ScreenedResume:
+    filename: str
+    pdf_bytes: bytes
+    sha256: str = ""
+    text: str = ""
+    cached: bool = False
+    error: Optional[str] = None
+
+def _is_zip(upload: UploadFile) -> bool:
+    return (upload.filename or "").lower().endswith(".zip") or upload.content_type in (
+        "application/zip", "application/x-zip-compressed"
+    )
+
+def _too_large() -> HTTPException:
+    return HTTPException(status_code=413,
+                         detail=f"Batch PDFs must total at most {BATCH_MAX_TOTAL_BYTES // (1024 * 1024)}MB")
+
+def _unzip(data: bytes, archive: str, room: int) -> List[ScreenedResume]:
+    """PDFs in the archive; room is how many uncompressed bytes the batch can still take"""
+    resumes = []
+    try:
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            for info in zf.infolist():
+                name = info.filename
+                if info.is_dir() or not name.lower().endswith(".pdf") or name.startswith("__MACOSX/"):
+                    continue
+                if len(resumes) >= BATCH_MAX_RESUMES:
+                    raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_RESUMES} resumes per batch")
+                label = f"{archive}/{name}"
+                if info.file_size > PDF_MAX_BYTES:
+                    resumes.append(ScreenedResume(label, b"", error="File too large"))
+                    continue
+                room -= info.file_size
+                if room < 0:
+                    raise _too_large()
+                resumes.append(ScreenedResume(label, zf.read(info)))
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail=f"{archive} is not a valid zip file")
+    return resumes
+
+async def collect_resumes(uploads: List[UploadFile]) -> List[ScreenedResume]:
+    """Read the uploaded PDFs and unpack zips, enforcing size and count limits"""
+    resumes: List[ScreenedResume] = []
+    total = 0
+    for upload in uploads:
+        filename = upload.filename or f"resume-{len(resumes) + 1}.pdf"
+        if _is_zip(upload):
+            data = await read_upload(upload, BATCH_MAX_ZIP_BYTES)
+            unzipped = await asyncio.to_thread(_unzip, data, filename, BATCH_MAX_TOTAL_BYTES - total)
+            del data
+            resumes.extend(unzipped)
+            total += sum(len(r.pdf_bytes) for r in unzipped)
+        else:
+            resumes.append(ScreenedResume(filename, await read_upload(upload)))
+            total += len(resumes[-1].pdf_bytes)
+        if total > BATCH_MAX_TOTAL_BYTES:
+            raise _too_large()
+        if len(resumes) > BATCH_MAX_RESUMES:
+            raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_RESUMES} resumes per batch")
+    if not resumes:
+        raise HTTPException(status_code=400, detail="No PDF resumes found in the upload")
+    return resumes
+
+async def as_completed(aws: List[Awaitable]) -> AsyncIterator:
+    """Results in completion order, from tasks owned by this generator.
+
+    Closing it early (the client went away) cancels whatever is still running,
+    so extraction and LLM calls don't outlive the stream.
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        for done in asyncio.as_completed(tasks):
+            yield await done
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+async def extract_resumes(resumes: List[ScreenedResume], use_cache: bool = True) -> AsyncIterator[ScreenedResume]:
+    """Fill in each resume's text (or error), yielding them as they finish"""
+    for resume in resumes:
+        if resume.error is not None:
+            yield resume  # rejected while unpacking
+    pending = [r for r in resumes if r.error is None]
+    for resume in pending:
+        resume.sha256 = sha256_hex(resume.pdf_bytes)
+
+    if use_cache:
+        try:
+            async with AsyncSessionLocal() as db:
+                texts = await get_cached_texts(db, {r.sha256 for r in pending})
+        except Exception as e:
+            logger.error(f"Resume text cache lookup failed, extracting the whole batch: {e}")
+            texts = {}
+        for resume in pending:
+            if resume.sha256 in texts:
+                resume.text, resume.cached = texts[resume.sha256], True
+                resume.pdf_bytes = b""
+                yield resume
+
+    semaphore = asyncio.Semaphore(EXTRACT_CONCURRENCY)
+
+    async def extract(resume: ScreenedResume) -> ScreenedResume:
+        async with semaphore:
+            try:
+                if use_cache:
+                    async with AsyncSessionLocal() as db:
+                        extracted = await extract_pdf_text(resume.pdf_bytes, db)
+                        if extracted.text.strip():
+                            await store_text(db, resume.sha256, extracted.text, extracted.page_count)
+                else:
+                    extracted = await extract_pdf_text(resume.pdf_bytes)
+                resume.text = extracted.text
+                if not resume.text.strip():
+                    resume.error = "No text could be extracted"
+            except HTTPException as e:
+                resume.error = e.detail
+            except Exception as e:
+                # One bad resume must not end the stream for the rest of the batch
+                logger.error(f"Text extraction for {resume.filename} failed: {e}")
+                resume.error = "Text extraction failed"
+            finally:
+                resume.pdf_bytes = b""  # only the text is needed from here on
+        return resume
+
+    async with aclosing(as_completed([extract(r) for r in pending if not r.cached])) as extracted:
+        async for resume in extracted:
+            yield resume
+
+def rank_resumes(resumes: List[ScreenedResume], job_description: str) -> List[Tuple[ScreenedResume, SkillMatch]]:
+    """Resumes with text and their skill match, best coverage first"""
+    import numpy as np
+    scored = [r for r in resumes if r.error is None]
+    if not scored:
+        return []
+    weights = jd_weights(skill_vectors(job_description)[1])
+    # Coverage for the whole batch in one matrix product
+    matrix = np.stack([skill_vectors(r.text)[0] for r in scored])
+    order = np.argsort(-coverage_scores(matrix, weights), kind="stable")
+    return [(scored[i], build_match(matrix[i], weights)) for i in order]
+
+async def llm_report(resume: ScreenedResume, job_description: str, match: SkillMatch, key: str) -> Tuple[str, bool]:
+    """LLM analysis for one resume, from the analysis cache when possible"""
+    jd_sha256 = job_description_hash(job_description)
+    async with AsyncSessionLocal() as db:
+        cached = await get_cached_analysis(db, resume.sha256, jd_sha256)
+    if cached is not None:
+        return cached, True
+    # No connection held while waiting on the LLM
+    prompt = build_analysis_prompt(resume.text, job_description, match)
+    response = await llm.generate("analysis", prompt, key, label=f"Batch report for {resume.filename}")
+    analysis = response.text.strip()
+    async with AsyncSessionLocal() as db:
+        await store_analysis(db, resume.sha256, jd_sha256, analysis)
+    return analysis, False
+
+async def screen_resumes(resumes: List[ScreenedResume], job_description: str, key: str,
+                         reports: int = 0) -> AsyncIterator[dict]:
+    """NDJSON events: extracted (per resume, as done), result (ranked), report, done"""
+    start = time.perf_counter()
+    async with aclosing(extract_resumes(resumes)) as extracted:
+        async for resume in extracted:
+            yield {"type": "extracted", "filename": resume.filename, "cached": resume.cached, "error": resume.error}
+
+    # numpy/rapidfuzz work for the whole batch, kept off the event loop
+    ranked = await asyncio.to_thread(rank_resumes, resumes, job_description)
+    for rank, (resume, match) in enumerate(ranked, 1):
+        yield {"type": "result", "rank": rank, "filename": resume.filename, **match.to_dict()}
+
+    reports = min(reports, BATCH_MAX_REPORTS, len(ranked))
+    if reports:
+        # Queue behind the per-user LLM limit instead of timing out in the gateway
+        semaphore = asyncio.Semaphore(LLM_MAX_PER_USER)
+
+        async def report(rank: int):
+            async with semaphore:
+                resume, match = ranked[rank]
+                try:
+                    analysis, cached = await llm_report(resume, job_description, match, key)
+                    return {"type": "report", "rank": rank + 1, "filename": resume.filename,
+                            "analysis": analysis, "cached": cached}
+                except Exception as e:
+                    logger.error(f"Batch report for {resume.filename} failed: {e}")
+                    return {"type": "report", "rank": rank + 1, "filename": resume.filename,
+                            "error": getattr(e, "detail", str(e))}
+
+        async with aclosing(as_completed([report(rank) for rank in range(reports)])) as results:
+            async for result in results:
+                yield result
+
+    elapsed = time.perf_counter() - start
+    yield {
+        "type": "done",
+        "resumes": len(resumes),
+        "ranked": len(ranked),
+        "failed": len(resumes) - len(ranked),
+        "seconds": round(elapsed, 2),
+    }
@@ -0,0 +1,297 @@
+import os
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Local resume vs job description skill matching, no LLM involved.
+#
+# Both texts are mapped onto a fixed skill taxonomy: aliases are matched
+# exactly with one compiled regex, then longer aliases are fuzzy-matched
+# against the text's 1-3 word phrases with rapidfuzz (a single vectorized
+# cdist call) to catch typos and spacing variants ("tensor flow",
+# "kubernates"). Each text becomes a vector over the taxonomy, so coverage for
+# one resume or a whole batch is a dot product against the JD's weights.
+# numpy and rapidfuzz are imported on first use, so importing this module
+# (and the app) doesn't pay for them.
+SKILL_FUZZY_CUTOFF = int(os.getenv("SKILL_FUZZY_CUTOFF", "88"))
+FUZZY_MIN_LENGTH = 5  # shorter phrases match too many ordinary words
+MAX_JD_WEIGHT = 3  # mentions counted per JD skill
+
+# canonical name -> (category, aliases). Ambiguous short names ("r", "c") are
+# only matched in unambiguous forms; bare "Go" only when written exactly so.
+TAXONOMY: Dict[str, Tuple[str, List[str]]] = {
+    "Python": ("Languages", ["python", "python3"]),
+    "Java": ("Languages", ["java"]),
+    "JavaScript": ("Languages", ["javascript", "js", "ecmascript", "es6"]),
+    "TypeScript": ("Languages", ["typescript", "ts"]),
+    "C++": ("Languages", ["c++", "cpp"]),
+    "C": ("Languages", ["c language", "ansi c", "c programming"]),
+    "C#": ("Languages", ["c#", "csharp", "c sharp"]),
+    "Go": ("Languages", ["golang", "go lang", "go"]),
+    "Rust": ("Languages", ["rust"]),
+    "Kotlin": ("Languages", ["kotlin"]),
+    "Swift": ("Languages", ["swift"]),
+    "Ruby": ("Languages", ["ruby"]),
+    "PHP": ("Languages", ["php"]),
+    "Scala": ("Languages", ["scala"]),
+    "R": ("Languages", ["r programming", "rstudio", "r language"]),
+    "SQL": ("Languages", ["sql", "t-sql", "pl/sql"]),
+    "Bash": ("Languages", ["bash", "shell scripting", "shell script"]),
+    "HTML": ("Frontend", ["html", "html5"]),
+    "CSS": ("Frontend", ["css", "css3", "sass", "scss"]),
+    "React": ("Frontend", ["react", "react.js", "reactjs"]),
+    "Angular": ("Frontend", ["angular", "angularjs"]),
+    "Vue": ("Frontend", ["vue", "vue.js", "vuejs"]),
+    "Next.js": ("Frontend", ["next.js", "nextjs"]),
+    "Redux": ("Frontend", ["redux"]),
+    "Tailwind CSS": ("Frontend", ["tailwind", "tailwindcss"]),
+    "Node.js": ("Backend", ["node.js", "nodejs", "node"]),
+    "Express": ("Backend", ["express", "express.js", "expressjs"]),
+    "Django": ("Backend", ["django"]),
+    "Flask": ("Backend", ["flask"]),
+    "FastAPI": ("Backend", ["fastapi"]),
+    "Spring": ("Backend", ["spring", "spring boot", "springboot"]),
+    ".NET": ("Backend", [".net", "asp.net", "dotnet", ".net core"]),
+    "REST APIs": ("Backend", ["rest", "restful", "rest api", "rest apis"]),
+    "GraphQL": ("Backend", ["graphql"]),
+    "gRPC": ("Backend", ["grpc"]),
+    "Microservices": ("Backend", ["microservices", "microservice"]),
+    "PostgreSQL": ("Databases", ["postgresql", "postgres"]),
+    "MySQL": ("Databases", ["mysql"]),
+    "MongoDB": ("Databases", ["mongodb", "mongo"]),
+    "Redis": ("Databases", ["redis"]),
+    "SQLite": ("Databases", ["sqlite"]),
+    "Elasticsearch": ("Databases", ["elasticsearch", "elastic search"]),
+    "Cassandra": ("Databases", ["cassandra"]),
+    "DynamoDB": ("Databases", ["dynamodb"]),
+    "AWS": ("Cloud", ["aws", "amazon web services", "ec2", "s3", "lambda"]),
+    "Azure": ("Cloud", ["azure", "microsoft azure"]),
+    "GCP": ("Cloud", ["gcp", "google cloud", "google cloud platform", "bigquery"]),
+    "Docker": ("DevOps", ["docker", "containers", "containerization"]),
+    "Kubernetes": ("DevOps", ["kubernetes", "k8s"]),
+    "Terraform": ("DevOps", ["terraform"]),
+    "Ansible": ("DevOps", ["ansible"]),
+    "CI/CD": ("DevOps", ["ci/cd", "continuous integration", "continuous delivery", "continuous deployment"]),
+    "Jenkins": ("DevOps", ["jenkins"]),
+    "GitHub Actions": ("DevOps", ["github actions"]),
+    "Linux": ("DevOps", ["linux", "unix"]),
+    "Git": ("Tools", ["git", "github", "gitlab", "version control"]),
+    "Jira": ("Tools", ["jira"]),
+    "Kafka": ("Data Engineering", ["kafka", "apache kafka"]),
+    "Spark": ("Data Engineering", ["spark", "apache spark", "pyspark"]),
+    "Hadoop": ("Data Engineering", ["hadoop", "hdfs", "mapreduce"]),
+    "Airflow": ("Data Engineering", ["airflow", "apache airflow"]),
+    "ETL": ("Data Engineering", ["etl", "elt", "data pipelines", "data pipeline"]),
+    "Data Warehousing": ("Data Engineering", ["data warehouse", "data warehousing", "snowflake", "redshift"]),
+    "Pandas": ("Data Analysis", ["pandas"]),
+    "NumPy": ("Data Analysis", ["numpy"]),
+    "Excel": ("Data Analysis", ["excel", "spreadsheets"]),
+    "Tableau": ("Data Analysis", ["tableau"]),
+    "Power BI": ("Data Analysis", ["power bi", "powerbi"]),
+    "Statistics": ("Data Analysis", ["statistics", "statistical analysis", "hypothesis testing", "a/b testing"]),
+    "Data Visualization": ("Data Analysis", ["data visualization", "matplotlib", "seaborn", "plotly"]),
+    "Machine Learning": ("Machine Learning", ["machine learning", "ml"]),
+    "Deep Learning": ("Machine Learning", ["deep learning", "neural networks", "neural network"]),
+    "NLP": ("Machine Learning", ["nlp", "natural language processing"]),
+    "Computer Vision": ("Machine Learning", ["computer vision", "opencv", "image processing"]),
+    "TensorFlow": ("Machine Learning", ["tensorflow", "keras"]),
+    "PyTorch": ("Machine Learning", ["pytorch", "torch"]),
+    "scikit-learn": ("Machine Learning", ["scikit-learn", "sklearn", "scikit learn"]),
+    "LLMs": ("Machine Learning", ["llm", "llms", "large language models", "generative ai", "genai"]),
+    "Prompt Engineering": ("Machine Learning", ["prompt engineering", "prompt design"]),
+    "MLOps": ("Machine Learning", ["mlops", "mlflow", "kubeflow"]),
+    "Data Structures & Algorithms": ("Fundamentals", ["data structures", "algorithms", "dsa"]),
+    "System Design": ("Fundamentals", ["system design", "distributed systems", "scalability"]),
+    "Object-Oriented Design": ("Fundamentals", ["oop", "object oriented", "object-oriented", "design patterns"]),
+    "Testing": ("Practices", ["unit testing", "pytest", "junit", "jest", "test automation", "tdd"]),
+    "Agile": ("Practices", ["agile", "scrum", "kanban"]),
+    "Security": ("Practices", ["security", "oauth", "authentication", "owasp"]),
+    "Android": ("Mobile", ["android"]),
+    "iOS": ("Mobile", ["ios"]),
+    "React Native": ("Mobile", ["react native"]),
+    "Flutter": ("Mobile", ["flutter", "dart"]),
+    "SEO": ("Marketing", ["seo", "search engine optimization"]),
+    "Digital Marketing": ("Marketing", ["digital marketing", "google analytics", "sem", "social media marketing"]),
+    "Recruitment": ("Human Resources", ["recruitment", "recruiting", "talent acquisition", "onboarding"]),
+    "Communication": ("Soft Skills", ["communication", "presentation skills", "stakeholder management"]),
+    "Leadership": ("Soft Skills", ["leadership", "mentoring", "team lead", "mentored"]),
+}
+
+# Aliases that are also ordinary words: only counted when written capitalized
+# ("React", "REST") and never fuzzy-matched
+CAPITALIZED_ONLY = {
+    "react", "node", "express", "spring", "rest", "swift", "rust", "ruby", "lambda", "torch", "flask", "excel", "go",
+}
+# ...and these only in exactly this spelling ("GO" is shouting, not Go)
+EXACT_CASE = {"go": "Go"}
+# Capitalized at the start of a sentence and followed by one of these (or a
+# hyphen), the alias is the ordinary word: "Express yourself", "Go to",
+# "Rest assured", "Go-to person"
+VERB_OBJECTS = frozenset(
+    "yourself yourselves your you us ahead beyond above the a an to into through forward further assured in".split()
+)
+NEXT_WORD = re.compile(r"-|\s*([a-z]+)")
+
+SKILLS: List[str] = list(TAXONOMY)
+CATEGORIES: List[str] = [TAXONOMY[skill][0] for skill in SKILLS]
+TOKEN = re.compile(r"[a-z0-9][a-z0-9+#./\-]*")
+
+@dataclass(frozen=True)
+class _Index:
+    exact: "re.Pattern"
+    alias_skill: Dict[str, int]
+    fuzzy_aliases: List[str]
+    fuzzy_skill: "np.ndarray"  # skill index of each fuzzy alias
+    max_phrase_length: int  # longer phrases can't score above the cutoff
+
+@lru_cache(maxsize=1)
+def _index() -> _Index:
+    import numpy as np
+    alias_skill = {}
+    for position, skill in enumerate(SKILLS):
+        for alias in TAXONOMY[skill][1]:
+            alias_skill[alias] = position
+    # Longest first so "react native" wins over "react"
+    aliases = sorted(alias_skill, key=len, reverse=True)
+    exact = re.compile(
+        r"(?<![\w+#.])(" + "|".join(re.escape(a) for a in aliases) + r")(?![\w+#])", re.IGNORECASE
+    )
+    fuzzy_aliases = [a for a in aliases if len(a) >= FUZZY_MIN_LENGTH and a not in CAPITALIZED_ONLY]
+    # ratio = 2 * matches / (len(a) + len(b)) <= 2 * len(a) / (len(a) + len(b))
+    longest = max(len(a) for a in fuzzy_aliases)
+    max_phrase_length = int(longest * (200 - SKILL_FUZZY_CUTOFF) / SKILL_FUZZY_CUTOFF)
+    return _Index(exact, alias_skill, fuzzy_aliases, np.array([alias_skill[a] for a in fuzzy_aliases]), max_phrase_length)
+
+def _used_as_verb(text: str, match: "re.Match") -> bool:
+    """A capitalized-only alias read as the verb at the start of a sentence or heading"""
+    following = NEXT_WORD.match(text, match.end())
+    if following is None or not (following.group(0) == "-" or following.group(1) in VERB_OBJECTS):
+        return False
+    preceding = text[:match.start()].rstrip()
+    # Start of text, after sentence punctuation or a bullet, or after a heading word
+    return not preceding or preceding[-1] in ".!?:;•*|-" or preceding.rsplit(" ", 1)[-1][:1].isupper()
+
+def collapse_whitespace(text: str) -> str:
+    return " ".join(text.split())
+
+def _phrases(text: str, max_length: int) -> List[str]:
+    """Distinct 1-3 word phrases short enough to reach the fuzzy cutoff against some alias"""
+    tokens = [t.rstrip(".-/") for t in TOKEN.findall(text)]
+    phrases = set(t for t in tokens if FUZZY_MIN_LENGTH <= len(t) <= max_length)
+    for n in (2, 3):
+        for i in range(len(tokens) - n + 1):
+            phrase = " ".join(tokens[i:i + n])
+            if len(phrase) <= max_length:
+                phrases.add(phrase)
+    return list(phrases)
+
+def skill_vectors(text: str) -> Tuple["np.ndarray", "np.ndarray"]:
+    """(confidence 0-1, mention count) per taxonomy skill for one text"""
+    import numpy as np
+    from rapidfuzz import fuzz, process
+    index = _index()
+    confidence = np.zeros(len(SKILLS), dtype=np.float32)
+    counts = np.zeros(len(SKILLS), dtype=np.int32)
+    text = collapse_whitespace(text)
+    for match in index.exact.finditer(text):
+        alias = match.group(1).lower()
+        if alias in CAPITALIZED_ONLY:
+            if not match.group(1)[0].isupper() or EXACT_CASE.get(alias, match.group(1)) != match.group(1):
+                continue
+            if _used_as_verb(text, match):
+                continue
+        position = index.alias_skill[alias]
+        confidence[position] = 1.0
+        counts[position] += 1
+
+    phrases = _phrases(text.lower(), index.max_phrase_length)
+    if phrases and index.fuzzy_aliases:
+        scores = process.cdist(
+            phrases, index.fuzzy_aliases, scorer=fuzz.ratio,
+            score_cutoff=SKILL_FUZZY_CUTOFF, dtype=np.uint8, workers=1
+        )
+        best = scores.max(axis=0) / 100.0
+        hits = best > 0
+        np.maximum.at(confidence, index.fuzzy_skill[hits], best[hits].astype(np.float32))
+        counts[index.fuzzy_skill[hits]] = np.maximum(counts[index.fuzzy_skill[hits]], 1)
+    return confidence, counts
+
+def jd_weights(counts: "np.ndarray") -> "np.ndarray":
+    """Skills mentioned more often in the JD weigh more (capped)"""
+    import numpy as np
+    return np.minimum(counts, MAX_JD_WEIGHT).astype(np.float32)
+
+def coverage_scores(resume_confidence: "np.ndarray", weights: "np.ndarray") -> "np.ndarray":
+    """Weighted JD coverage (0-100) for one resume vector or a (resumes x skills) matrix"""
+    import numpy as np
+    total = weights.sum()
+    if total == 0:
+        return np.zeros(resume_confidence.shape[:-1], dtype=np.float32)
+    return np.round(resume_confidence @ weights / total * 100, 1)
+
+@dataclass
+class SkillMatch:
+    coverage: Optional[float]  # None without a job description
+    matches: List[dict] = field(default_factory=list)
+    gaps: List[dict] = field(default_factory=list)
+    other_skills: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return {
+            "coverage": self.coverage,
+            "matches": self.matches,
+            "gaps": self.gaps,
+            "other_skills": self.other_skills,
+        }
+
+    def prompt_summary(self) -> str:
+        """Condensed match for the LLM prompt, in place of the full comparison"""
+        lines = []
+        if self.coverage is not None:
+            lines.append(f"Skill coverage of the job description: {self.coverage:.0f}%")
+            lines.append("Matched: " + (", ".join(m["skill"] for m in self.matches) or "none"))
+            lines.append("Missing: " + (", ".join(g["skill"] for g in self.gaps) or "none"))
+        if self.other_skills:
+            lines.append("Other skills on the resume: " + ", ".join(self.other_skills))
+        return "\n".join(lines)
+
+    def report(self) -> str:
+        """Plain-text report for fast (no-LLM) analysis"""
+        sections = []
+        if self.coverage is not None:
+            sections.append(f"JOB DESCRIPTION COVERAGE: {self.coverage:.0f}%")
+            sections.append("MATCHED SKILLS:\n\n" + ("\n".join(f"• {m['skill']} ({m['category']})" for m in self.matches) or "None found"))
+            sections.append("SKILL GAPS:\n\n" + ("\n".join(f"• {g['skill']} ({g['category']})" for g in self.gaps) or "None found"))
+        if self.other_skills:
+            sections.append("OTHER SKILLS:\n\n" + "\n".join(f"• {skill}" for skill in self.other_skills))
+        return "\n\n\n".join(sections) or "No known skills were found in the resume."
+
+def build_match(confidence: "np.ndarray", weights: Optional["np.ndarray"] = None) -> SkillMatch:
+    import numpy as np
+    if weights is None or not weights.any():
+        found = np.flatnonzero(confidence)
+        return SkillMatch(coverage=None, other_skills=[SKILLS[i] for i in found])
+    # Heaviest JD skills first
+    order = np.argsort(-weights, kind="stable")
+    required = order[weights[order] > 0]
+    matches = [
+        {"skill": SKILLS[i], "category": CATEGORIES[i], "confidence": round(float(confidence[i]), 2)}
+        for i in required if confidence[i] > 0
+    ]
+    gaps = [
+        {"skill": SKILLS[i], "category": CATEGORIES[i], "weight": int(weights[i])}
+        for i in required if confidence[i] == 0
+    ]
+    other = [SKILLS[i] for i in np.flatnonzero((confidence > 0) & (weights == 0))]
+    return SkillMatch(round(float(coverage_scores(confidence, weights)), 1), matches, gaps, other)
+
+def match_skills(resume_text: str, job_description: str = "") -> SkillMatch:
+    confidence, _ = skill_vectors(resume_text)
+    if not job_description.strip():
+        return build_match(confidence)
+    _, jd_counts = skill_vectors(job_description)
+    return build_match(confidence, jd_weights(jd_counts))
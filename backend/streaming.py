@@ -0,0 +1,76 @@
+import json
+import logging
+import time
+from contextlib import aclosing
+from typing import AsyncIterator, List, Optional
+
+from fastapi.responses import StreamingResponse
+
+from formatting import StreamingFormatter
+
+logger = logging.getLogger(__name__)
+
+# Server-sent event helpers for streamed Gemini responses.
+#
+# Event stream protocol used by /chat/stream and /api/recommendations/stream:
+#   event: chunk  data: {"text": "..."}    formatted text, append to the output
+#   event: done   data: {"content": ...}   canonical formatted response (what is
+#                                          stored), replaces the streamed text
+#   event: error  data: {"detail": "..."}
+#
+# Batch endpoints that emit records rather than text stream newline-delimited
+# JSON instead (ndjson_response), one object per line.
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # don't let nginx buffer the stream
+        },
+    )
+
+def ndjson_response(records: AsyncIterator[dict]) -> StreamingResponse:
+    async def lines():
+        async with aclosing(records) as source:
+            async for record in source:
+                yield json.dumps(record) + "\n"
+    return StreamingResponse(
+        lines(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+class LLMStream:
+    """Formats a stream of raw text chunks (see LLMGateway.stream) and keeps the raw text"""
+
+    def __init__(self, source: AsyncIterator[str], label: str):
+        self.source = source
+        self.label = label
+        self.parts: List[str] = []
+        self.first_token_ms: Optional[float] = None
+
+    @property
+    def text(self) -> str:
+        return "".join(self.parts)
+
+    async def chunks(self) -> AsyncIterator[str]:
+        start = time.perf_counter()
+        formatter = StreamingFormatter()
+        async with aclosing(self.source) as source:
+            async for text in source:
+                if self.first_token_ms is None:
+                    self.first_token_ms = round((time.perf_counter() - start) * 1000, 1)
+                    logger.info(f"{self.label}: time to first token {self.first_token_ms}ms")
+                self.parts.append(text)
+                out = formatter.feed(text)
+                if out:
+                    yield out
+        tail = formatter.flush()
+        if tail:
+            yield tail
+        logger.info(f"{self.label}: stream finished in {(time.perf_counter() - start) * 1000:.0f}ms")
@@ -0,0 +1,73 @@
+# Chat search snippets are HTML: matches are wrapped in <mark>, everything the
+# user or the model wrote is escaped. Runs the SQLite fallback path.
+#
+#   python -m pytest -q test_chat_search.py    (or: python test_chat_search.py)
+import asyncio
+import os
+import tempfile
+
+# Always a throwaway file: the tests drop every table
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.gettempdir(), 'codingjourney_test_search.db')}"
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+os.environ.setdefault("CLERK_SECRET_KEY", "test")
+
+import httpx
+
+import main
+from auth import get_current_user_clerk_id
+from chat_search import MARK_START, MARK_STOP, highlight, index_chat_message, snippet_html
+from database import AsyncSessionLocal, Base, engine
+from models import ChatHistory
+
+CLERK_ID = "user_search_test"
+
+async def add_message(user_message: str, ai_response: str):
+    async with AsyncSessionLocal() as db:
+        record = ChatHistory(clerk_id=CLERK_ID, user_message=user_message, ai_response=ai_response, session_id="s1")
+        db.add(record)
+        await db.flush()
+        await index_chat_message(db, record)
+        await db.commit()
+
+async def search(query: str) -> dict:
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/api/chat/search", params={"q": query})
+        assert response.status_code == 200, response.text
+        return response.json()
+
+def setup_function():
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    main.app.dependency_overrides[get_current_user_clerk_id] = lambda: CLERK_ID
+
+def teardown_function():
+    main.app.dependency_overrides.clear()
+
+def test_snippets_escape_message_html():
+    asyncio.run(add_message(
+        "Why does <img src=x onerror=alert(1)> break my python page?",
+        "Escape user input in python templates: <script>alert(1)</script> & friends"
+    ))
+    hit = asyncio.run(search("python"))["results"][0]
+    assert hit["user_snippet"] == "Why does &lt;img src=x onerror=alert(1)&gt; break my <mark>python</mark> page?"
+    assert "<script>" not in hit["ai_snippet"]
+    assert "&lt;script&gt;alert(1)&lt;/script&gt; &amp; friends" in hit["ai_snippet"]
+
+def test_delimiters_in_messages_are_not_marks():
+    assert highlight(f"{MARK_START}<b>python</b>", ["python"]) == "&lt;b&gt;<mark>python</mark>&lt;/b&gt;"
+    assert highlight("<b>bold</b>", []) == "&lt;b&gt;bold&lt;/b&gt;"
+
+def test_headline_snippets_become_marks():
+    # What ts_headline returns on Postgres with HEADLINE_OPTIONS
+    assert snippet_html("a <i> python b") == "a &lt;i&gt; <mark>python</mark> b"
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            setup_function()
+            try:
+                test()
+                print(f"{name}: ok")
+            finally:
+                teardown_function()
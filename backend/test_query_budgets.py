@@ -0,0 +1,132 @@
+# Query budget checks: runs endpoints against a throwaway SQLite database with
+# auth overridden and fails when one executes more SQL statements than its
+# @query_budget declares.
+#
+#   python -m pytest -q test_query_budgets.py    (or: python test_query_budgets.py)
+import asyncio
+import os
+import tempfile
+from datetime import datetime, timezone
+
+DB_PATH = os.path.join(tempfile.gettempdir(), "codingjourney_test_budgets.db")
+# Always a throwaway file: the tests drop every table
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+os.environ.setdefault("CLERK_SECRET_KEY", "test")
+
+import httpx
+
+import main
+import llm_gateway
+from auth import get_current_user_clerk_id
+from routes import chat_routes
+from database import Base, SessionLocal, count_queries, engine
+from models import User, CodingProfile
+from user_context import invalidate_user_context
+
+CLERK_ID = "user_budget_test"
+ORIGINALS = {}
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+class FakeModel:
+    """Stands in for the Gemini model, so /chat runs without network access"""
+
+    def generate_content(self, prompt, **kwargs):
+        return FakeResponse("Practice Two Sum - Problem 1 next.")
+
+    async def generate_content_async(self, prompt, **kwargs):
+        return self.generate_content(prompt)
+
+def reset_database():
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    now = datetime.now(timezone.utc)
+    with SessionLocal() as db:
+        db.add(User(clerk_id=CLERK_ID, email="budget@example.com", username="budget",
+                    leetcode_username="budget", github_username="budget"))
+        db.add(CodingProfile(clerk_id=CLERK_ID, platform="leetcode", username="budget", last_updated=now,
+                             total_problems_solved=120, easy_solved=60, medium_solved=50, hard_solved=10))
+        db.add(CodingProfile(clerk_id=CLERK_ID, platform="github", username="budget", last_updated=now,
+                             total_contributions=300, languages={"Python": 80.0, "Go": 20.0}))
+        db.commit()
+
+def setup_function():
+    main.app.dependency_overrides[get_current_user_clerk_id] = lambda: CLERK_ID
+    ORIGINALS.update(rebuild=main.rebuild_dashboard_document, get_model=llm_gateway.get_model)
+    # Background work (dashboard rebuilds) is not part of an endpoint's budget
+    main.rebuild_dashboard_document = lambda clerk_id: None
+    llm_gateway.get_model = lambda kind: FakeModel()
+    reset_database()
+    invalidate_user_context(CLERK_ID)  # cold per-process prompt context cache
+
+def teardown_function():
+    main.app.dependency_overrides.clear()
+    main.rebuild_dashboard_document = ORIGINALS.pop("rebuild")
+    llm_gateway.get_model = ORIGINALS.pop("get_model")
+
+async def request(method: str, url: str, **kwargs):
+    """(response, statements) for one request"""
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        with count_queries() as queries:
+            response = await client.request(method, url, **kwargs)
+    return response, queries
+
+def assert_within_budget(method: str, url: str, endpoint, budget: int = None, **kwargs):
+    """Run one request and fail if it exceeded endpoint's @query_budget (or an explicit tighter budget)"""
+    response, queries = asyncio.run(request(method, url, **kwargs))
+    assert response.status_code < 400, f"{method} {url} returned {response.status_code}: {response.text}"
+    budget = budget if budget is not None else endpoint.__query_budget__
+    assert queries.count <= budget, (
+        f"{method} {url} ran {queries.count} queries (budget {budget}):\n" + "\n".join(queries.statements)
+    )
+    return response, queries
+
+def test_users_me():
+    response, _ = assert_within_budget("GET", "/api/users/me", main.get_current_db_user)
+    # Revalidation only runs the version query
+    assert_within_budget("GET", "/api/users/me", main.get_current_db_user, budget=1, headers={"If-None-Match": response.headers["etag"]})
+
+def test_analysis_data():
+    response, _ = assert_within_budget("GET", "/api/analysis-data", main.get_analysis_data)
+    assert_within_budget("GET", "/api/analysis-data", main.get_analysis_data, budget=1, headers={"If-None-Match": response.headers["etag"]})
+
+def test_settings():
+    assert_within_budget("PUT", "/api/settings", json={"username": "renamed", "codeforces_username": "budget_cf"}, endpoint=main.update_settings)
+
+def test_chat_cold_first_turn():
+    assert_within_budget("POST", "/chat", json={"content": "What should I practice next?"}, endpoint=main.chat_endpoint)
+
+def test_chat_history_and_sessions():
+    assert_within_budget("POST", "/chat", json={"content": "Hello"}, endpoint=main.chat_endpoint)
+    assert_within_budget("GET", "/api/chat/history", main.get_chat_history)
+    assert_within_budget("GET", "/api/chat/sessions", chat_routes.get_chat_sessions)
+    assert_within_budget("GET", "/api/chat/search?q=hello", chat_routes.search_chat)
+
+def test_field_query():
+    assert_within_budget(
+        "GET", "/api/query?fields[user]=username&fields[profiles]=platform,languages&fields[sessions]=title",
+        main.query_user_data
+    )
+    # Only what is asked for is queried
+    assert_within_budget("GET", "/api/query?fields[user]=username", main.query_user_data, budget=1)
+
+def test_dashboard():
+    assert_within_budget("GET", "/api/dashboard", main.get_dashboard, budget=10)  # first view builds the document
+    assert_within_budget("GET", "/api/dashboard", main.get_dashboard)
+
+def test_profile_history():
+    assert_within_budget("GET", "/api/history/leetcode", main.get_profile_history)
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            setup_function()
+            try:
+                test()
+                print(f"{name}: ok")
+            finally:
+                teardown_function()
@@ -0,0 +1,44 @@
+# Codeforces rating curve downsampling (pure functions, no database needed).
+#
+#   python -m pytest -q test_rating_history.py    (or: python test_rating_history.py)
+import os
+import tempfile
+
+# Always a throwaway file: importing rating_history connects the database module
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.gettempdir(), 'codingjourney_test_ratings.db')}"
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+
+from rating_history import RATING_CHART_MAX_POINTS, RatingPoint, downsample, pack_points, unpack_points
+
+def curve(n: int):
+    # Alternating ups and downs so every bucket has a distinct low and high
+    return [RatingPoint(i + 1, 1_600_000_000 + i * 86400, 1500 + (i % 7) * 37 - (i % 3) * 50) for i in range(n)]
+
+def test_downsample_never_exceeds_max_points():
+    points = curve(500)
+    for max_points in range(1, 60):
+        kept = downsample(points, max_points)
+        assert 1 <= len(kept) <= max_points, (max_points, len(kept))
+        assert kept[-1] == points[-1]
+    assert len(downsample(points, RATING_CHART_MAX_POINTS)) == len(points)
+
+def test_downsample_two_points_keeps_the_ends():
+    points = curve(10)
+    assert downsample(points, 2) == [points[0], points[-1]]
+
+def test_downsample_keeps_order_and_extremes():
+    points = curve(300)
+    kept = downsample(points, 51)
+    assert [p.time for p in kept] == sorted(p.time for p in kept)
+    assert max(p.rating for p in kept) == max(p.rating for p in points)
+    assert min(p.rating for p in kept) == min(p.rating for p in points)
+
+def test_pack_round_trip():
+    points = curve(25)
+    assert unpack_points(pack_points(points)) == points
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name}: ok")
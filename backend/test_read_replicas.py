@@ -0,0 +1,148 @@
+# Read replica routing checks, with two SQLite files standing in for the
+# replicas. Each database holds the same user under a different username, so
+# a response shows which database served it.
+#
+#   python -m pytest -q test_read_replicas.py    (or: python test_read_replicas.py)
+import asyncio
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+TMP_DIR = tempfile.gettempdir()
+# Always throwaway files: the tests drop every table
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TMP_DIR, 'codingjourney_test_primary.db')}"
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+os.environ.setdefault("CLERK_SECRET_KEY", "test")
+
+import httpx
+from sqlalchemy import create_engine
+
+import database
+import main
+from auth import get_current_user_clerk_id
+from database import Base, ReplicaRouter, SessionLocal, engine
+from dependencies import READ_YOUR_WRITES_HEADER
+from models import ChatHistory, User
+
+CLERK_ID = "user_replica_test"
+REPLICA_URLS = [f"sqlite:///{os.path.join(TMP_DIR, f'codingjourney_test_replica_{i}.db')}" for i in (1, 2)]
+ORIGINALS = {}
+
+def seed(bind, username: str):
+    Base.metadata.drop_all(bind)
+    Base.metadata.create_all(bind)
+    with SessionLocal(bind=bind) as db:
+        db.add(User(clerk_id=CLERK_ID, email="replica@example.com", username=username))
+        db.commit()
+
+@contextmanager
+def replica_engine_for(url: str):
+    bind = create_engine(url)
+    try:
+        yield bind
+    finally:
+        bind.dispose()
+
+def setup_function():
+    seed(engine, "primary")
+    for i, url in enumerate(REPLICA_URLS, 1):
+        with replica_engine_for(url) as bind:
+            seed(bind, f"replica-{i}")
+    database.replica_router = ReplicaRouter(REPLICA_URLS)
+    main.app.dependency_overrides[get_current_user_clerk_id] = lambda: CLERK_ID
+    ORIGINALS["rebuild"] = main.rebuild_dashboard_document
+    main.rebuild_dashboard_document = lambda clerk_id: None
+
+def teardown_function():
+    main.app.dependency_overrides.clear()
+    main.rebuild_dashboard_document = ORIGINALS.pop("rebuild")
+    database.replica_router = ReplicaRouter(database.DATABASE_REPLICA_URLS)
+
+async def read_usernames(count: int = 1, headers: dict = None) -> list:
+    """Which database served each of `count` consecutive /api/users/me reads"""
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        usernames = []
+        for _ in range(count):
+            response = await client.get("/api/users/me", headers=headers or {})
+            assert response.status_code == 200, response.text
+            usernames.append(response.json()["username"])
+        return usernames
+
+def test_round_robin_over_replicas():
+    assert asyncio.run(read_usernames(4)) == ["replica-1", "replica-2", "replica-1", "replica-2"]
+
+def test_unhealthy_replica_is_skipped():
+    router = database.replica_router
+    router.mark_unhealthy(router.replicas[0])
+    assert asyncio.run(read_usernames(3)) == ["replica-2"] * 3
+
+def test_falls_back_to_primary_when_no_replica_is_healthy():
+    router = database.replica_router
+    for replica in router.replicas:
+        router.mark_unhealthy(replica)
+    assert asyncio.run(read_usernames(2)) == ["primary"] * 2
+
+def test_failed_health_check_falls_back_to_primary():
+    database.replica_router = ReplicaRouter([f"sqlite:///{os.path.join(TMP_DIR, 'missing-dir', 'replica.db')}"])
+    assert asyncio.run(read_usernames(1)) == ["primary"]
+    assert not database.replica_router.replicas[0].healthy
+
+def test_unreachable_replica_is_retried_on_primary():
+    # Passed its last health check, so the request is the first to find out
+    replica = database.ReplicaRouter([f"sqlite:///{os.path.join(TMP_DIR, 'missing-dir', 'replica.db')}"]).replicas[0]
+    replica.last_checked = time.monotonic()
+    database.replica_router.replicas = [replica]
+    assert asyncio.run(read_usernames(1)) == ["primary"]
+    assert not replica.healthy
+
+def test_query_error_marks_replica_unhealthy_even_when_caught():
+    replica = database.replica_router.replicas[0]
+    with replica_engine_for(REPLICA_URLS[0]) as bind:
+        ChatHistory.__table__.drop(bind)
+
+    async def chat_history():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/api/chat/history")
+
+    # get_chat_history turns the error into a 500, but the replica is out of rotation
+    assert asyncio.run(chat_history()).status_code == 500
+    assert not replica.healthy
+    assert asyncio.run(chat_history()).status_code == 200
+
+def test_writes_pin_reads_to_primary():
+    async def write_then_read():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.put("/api/settings", json={"codeforces_username": "tourist"})
+            assert response.status_code == 200, response.text
+        return await read_usernames(2)
+
+    assert asyncio.run(write_then_read()) == ["primary"] * 2
+    assert database.replica_router.wrote_recently(CLERK_ID)
+
+def test_read_your_writes_window_expires():
+    database.mark_write(CLERK_ID)
+    assert asyncio.run(read_usernames(1)) == ["primary"]
+    original = database.READ_YOUR_WRITES_WINDOW
+    database.READ_YOUR_WRITES_WINDOW = 0
+    try:
+        assert asyncio.run(read_usernames(1)) == ["replica-1"]
+    finally:
+        database.READ_YOUR_WRITES_WINDOW = original
+
+def test_read_your_writes_header_uses_primary():
+    assert asyncio.run(read_usernames(2, headers={READ_YOUR_WRITES_HEADER: "true"})) == ["primary"] * 2
+    assert asyncio.run(read_usernames(1)) == ["replica-1"]
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            setup_function()
+            try:
+                test()
+                print(f"{name}: ok")
+            finally:
+                teardown_function()
@@ -0,0 +1,34 @@
+# Skill matching edge cases: aliases that are also ordinary English words.
+#
+#   python -m pytest -q test_skill_matcher.py    (or: python test_skill_matcher.py)
+from skill_matcher import SKILLS, skill_vectors
+
+def found(text: str) -> set:
+    confidence, _ = skill_vectors(text)
+    return {SKILLS[i] for i in range(len(SKILLS)) if confidence[i] > 0}
+
+def test_bare_go_is_the_language():
+    assert "Go" in found("We build services in Go and Python.")
+    assert "Go" in found("Strong Go developer")
+    assert "Go" in found("Experience with Go, Rust or C++")
+    assert "Go" in found("Golang or Go lang")
+
+def test_go_as_a_word_is_not_the_language():
+    assert "Go" not in found("Go to the office twice a week.")
+    assert "Go" not in found("Requirements Go beyond the ticket")
+    assert "Go" not in found("We are ready to go live soon")
+    assert "Go" not in found("GO TEAM")
+    assert "Go" not in found("Go-to person for the on-call rotation")
+
+def test_sentence_start_verbs():
+    assert "Express" not in found("Express yourself clearly in writing.")
+    assert "Excel" not in found("Nice to have. Excel in a fast-paced team")
+    assert "Express" in found("Express and MongoDB experience")
+    assert "Express" in found("Node.js with Express for APIs")
+    assert "Excel" in found("Advanced Excel skills")
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name}: ok")
@@ -0,0 +1,155 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from loaders import select_user, PROMPT_CONTEXT_LOADERS
+
+logger = logging.getLogger(__name__)
+
+# Per-user profile context for LLM prompts (/chat, /api/recommendations).
+#
+# Snapshots are cached in-process and dropped by invalidate_user_context()
+# whenever profile data or settings change. Each worker process has its own
+# cache, so the TTL bounds how stale another worker's copy can get.
+USER_CONTEXT_TTL = int(os.getenv("USER_CONTEXT_TTL", "300"))
+USER_CONTEXT_CACHE_SIZE = int(os.getenv("USER_CONTEXT_CACHE_SIZE", "1024"))
+
+PLATFORM_LABELS = {
+    "leetcode": "LeetCode",
+    "github": "GitHub",
+    "codechef": "CodeChef",
+    "codeforces": "Codeforces",
+}
+
+@dataclass(frozen=True)
+class UserContext:
+    """Compact, immutable snapshot of what the prompts know about a user"""
+    clerk_id: str
+    username: str
+    handles: Dict[str, Optional[str]]  # platform -> username on that platform
+    platform_stats: Dict[str, Dict[str, Any]]
+    version: str = field(default="")  # content hash, changes whenever the snapshot does
+
+    @property
+    def has_profiles(self) -> bool:
+        return any(self.handles.values())
+
+    def describe_profiles(self, detailed: bool = False) -> str:
+        """One line per linked platform, with its headline stats"""
+        text = ""
+        for platform, label in PLATFORM_LABELS.items():
+            handle = self.handles.get(platform)
+            if not handle:
+                continue
+            text += f"\n- {label}: {handle}"
+            stats = self.platform_stats.get(platform)
+            if stats is None:
+                continue
+            if platform == "leetcode":
+                if detailed:
+                    text += f" (Solved: {stats.get('total_solved', 'N/A')} problems, " + \
+                            f"Easy: {stats.get('easy_solved', 'N/A')}, " + \
+                            f"Medium: {stats.get('medium_solved', 'N/A')}, " + \
+                            f"Hard: {stats.get('hard_solved', 'N/A')})"
+                else:
+                    text += f" (Solved: {stats.get('total_solved', 'N/A')} problems)"
+            elif platform == "github":
+                text += f" (Contributions: {stats.get('total_contributions', 'N/A')})"
+                if stats.get("languages"):
+                    top_languages = ", ".join(list(stats["languages"])[:3])
+                    text += f"\n  Top languages: {top_languages}"
+            elif platform == "codechef":
+                text += f" (Rating: {stats.get('rating', 'N/A')}, Stars: {stats.get('stars', 'N/A')})"
+            elif platform == "codeforces":
+                text += f" (Rating: {stats.get('rating', 'N/A')})"
+        return text
+
+def _platform_stats(profile) -> Optional[Dict[str, Any]]:
+    if profile.platform == "leetcode":
+        return {
+            "total_solved": profile.total_problems_solved,
+            "easy_solved": profile.easy_solved,
+            "medium_solved": profile.medium_solved,
+            "hard_solved": profile.hard_solved
+        }
+    if profile.platform == "github":
+        return {
+            "total_contributions": profile.total_contributions,
+            "languages": profile.languages
+        }
+    if profile.platform == "codechef":
+        return {
+            "rating": profile.current_rating,
+            "stars": profile.stars
+        }
+    if profile.platform == "codeforces":
+        return {
+            "rating": profile.codeforces_rating,
+            "problems_solved": profile.problems_solved_count
+        }
+    return None
+
+def build_user_context(db_user) -> UserContext:
+    """Snapshot a User loaded with PROMPT_CONTEXT_LOADERS"""
+    handles = {
+        "leetcode": db_user.leetcode_username,
+        "github": db_user.github_username,
+        "codechef": db_user.codechef_username,
+        "codeforces": db_user.codeforces_username,
+    }
+    platform_stats = {}
+    for profile in db_user.coding_profiles or []:
+        stats = _platform_stats(profile)
+        if stats is not None:
+            platform_stats[profile.platform] = stats
+    username = db_user.username or "user"
+    payload = json.dumps([username, handles, platform_stats], sort_keys=True, default=str)
+    return UserContext(
+        clerk_id=db_user.clerk_id,
+        username=username,
+        handles=handles,
+        platform_stats=platform_stats,
+        version=hashlib.sha1(payload.encode()).hexdigest()[:12]
+    )
+
+_cache: "OrderedDict[str, tuple]" = OrderedDict()  # clerk_id -> (expires_at, UserContext)
+_generations: Dict[str, int] = {}
+_lock = threading.Lock()  # update_profile_in_db invalidates from a worker thread
+
+def invalidate_user_context(clerk_id: str) -> None:
+    """Drop the cached snapshot; call after committing a change to the user or their profiles"""
+    with _lock:
+        _cache.pop(clerk_id, None)
+        _generations[clerk_id] = _generations.get(clerk_id, 0) + 1
+
+async def get_user_context(db: AsyncSession, clerk_id: str) -> Optional[UserContext]:
+    """Cached UserContext for a user, or None if the user does not exist"""
+    with _lock:
+        cached = _cache.get(clerk_id)
+        if cached and cached[0] > time.monotonic():
+            _cache.move_to_end(clerk_id)
+            return cached[1]
+        generation = _generations.get(clerk_id, 0)
+
+    db_user = (await db.execute(select_user(clerk_id, PROMPT_CONTEXT_LOADERS))).scalar_one_or_none()
+    if not db_user:
+        return None
+    context = build_user_context(db_user)
+
+    with _lock:
+        # Skip caching if the data changed while we were reading it
+        if _generations.get(clerk_id, 0) == generation:
+            _cache[clerk_id] = (time.monotonic() + USER_CONTEXT_TTL, context)
+            _cache.move_to_end(clerk_id)
+            while len(_cache) > USER_CONTEXT_CACHE_SIZE:
+                _cache.popitem(last=False)
+    logger.debug(f"Built user context {context.version} for {clerk_id}")
+    return context